@@ -29,15 +29,32 @@
 from lib.model.smartplugin import SmartPlugin
 from lib.utils import Utils
 from .webif import WebInterface
-
+from .commands import CommandDispatcher
+from .events import EventBuffer, PayloadDecoder, get_metric_type
+from .topology import Topology
+from .metrics import Metrics
+from .recorder import WebhookRecorder
+from .albumart import AlbumArtCache
+from .tts import TtsAnnouncer
+from .snapshot import save_snapshot, load_snapshot
+from .client import ApiClient, get_command
+from .position import PositionEngine, format_position, parse_position
+from .scene import SceneRunner
+from .catalog import Catalog
+from .roomstate import Record, RoomState, Schema, intern
+
+import functools
+import os
+import socket
 import threading
 import queue
+import time
 from http.server import BaseHTTPRequestHandler
 import socketserver
 import urllib.parse as urlparse
 import logging
 import requests
-import json
+import requests.adapters
 
 cmds = ['play',
         'pause',
@@ -82,6 +99,80 @@ cmds = ['play',
         'bass',
         'treble']
 
+# accessor paths into the room state self.sonos[room] (RoomState) for all commands reflecting a state value
+state_accessors = {'volume':                ('state', 'volume'),
+                   'mute':                  ('state', 'mute'),
+                   'groupVolume':           ('groupstate', 'volume'),
+                   'groupMute':             ('groupstate', 'mute'),
+                   'bass':                  ('state', 'equalizer', 'bass'),
+                   'treble':                ('state', 'equalizer', 'treble'),
+                   'loudness':              ('state', 'equalizer', 'loudness'),
+                   'nightmode':             ('state', 'equalizer', 'nightMode'),
+                   'speechenhancement':     ('state', 'equalizer', 'speechEnhancement'),
+                   'sub':                   ('state', 'sub', 'enabled'),
+                   'repeat':                ('state', 'playMode', 'repeat'),
+                   'shuffle':               ('state', 'playMode', 'shuffle'),
+                   'crossfade':             ('state', 'playMode', 'crossfade'),
+                   'trackNo':               ('state', 'trackNo'),
+                   'elapsedTime':           ('state', 'elapsedTime'),
+                   'elapsedTimeFormatted':  ('state', 'elapsedTimeFormatted'),
+                   'playbackState':         ('state', 'playbackState'),
+                   'play':                  ('state', 'playbackState'),
+                   'playpause':             ('state', 'playbackState'),
+                   'uuid':                  ('uuid',),
+                   'coordinator':           ('coordinator',),
+                   'group_coordinator':     ('group', 'coordinator'),
+                   'group_members':         ('group', 'members'),
+                   'is_grouped':            ('group', 'is_grouped'),
+                   'is_coordinator':        ('group', 'is_coordinator')}
+
+# fields of the room state defined by the group coordinator; they are propagated to all members of the group. The
+# elapsed time is reported with every event of a member and is fresher than the last stored state of the coordinator
+group_state_fields = ('currentTrack', 'nextTrack', 'trackNo', 'playbackState', 'playMode')
+
+# commands reflecting the group information of a room, updated on topology changes only
+group_cmds = ('group_coordinator', 'group_members', 'is_grouped', 'is_coordinator')
+
+# prefixes of commands reflecting a field of the current or next track, e.g. 'current_title'
+track_accessor_prefixes = {'current_':  ('state', 'currentTrack'),
+                           'next_':     ('state', 'nextTrack')}
+
+# fields of a track holding the album art uri; items with sonos_albumart_cache use the absolute uri of the speaker
+albumart_fields = ('albumArtUri', 'absoluteAlbumArtUri')
+
+# converters applied to the looked up state value
+state_converters = {'play':         lambda value: value != 'STOPPED',
+                    'playpause':    lambda value: value != 'STOPPED'}
+
+# timeout in seconds for reading the zones; if it fails, it is retried with increasing delay up to zones_retry_max
+zones_timeout = 10
+zones_retry_max = 60
+
+# fields of the room state changing continuously while playing; a reconciliation differing in them does not
+# indicate lost webhooks
+volatile_fields = (('state', 'elapsedTime'), ('state', 'elapsedTimeFormatted'))
+
+# commands of items reflecting the locally interpolated playback position, published by the position engine
+position_cmds = ('position', 'position_formatted', 'progress')
+
+# fields of the room state the playback position is anchored on
+position_fields = (('state', 'elapsedTime'), ('state', 'playbackState'), ('state', 'currentTrack', 'duration'))
+
+# commands of items reflecting the cached favorites and playlists of the system and the queue of the room's group
+catalog_cmds = ('favorites', 'playlists', 'queue')
+
+# commands of items reflecting the health of node-sonos-http-api; these items need no sonos_room
+api_health_cmds = {'api_online': 'online', 'api_state': 'state', 'api_latency': 'latency'}
+
+# commands affecting all rooms; with several api servers, they are sent to each server
+broadcast_cmds = {'pauseall', 'resumeall', 'sayall', 'clipall', 'lockvolumes', 'unlockvolumes'}
+
+# states of the circuit breakers of the api servers, best first; the worst state is reported by items without sonos_api_server
+api_states = ('closed', 'half-open', 'open')
+
+# commands which are only sent to the sonos api and do not reflect a state value
+write_only_cmds = {'volume_up', 'volume_down'}.union(set(cmds).difference(state_accessors))
+
 
 class SonosHttp(SmartPlugin):
 
@@ -106,16 +197,99 @@ class SonosHttp(SmartPlugin):
         # get the parameters for the plugin (as defined in metadata plugin.yaml):
         self._http_server_ip = self.get_parameter_value('Server_IP') if self.get_parameter_value('Server_IP') != '0.0.0.0' else Utils.get_local_ipv4_address()
         self._http_server_port = self.get_parameter_value('Server_Port')
+        self._api_port = self.get_parameter_value('Api_Port')
+        self._coalesce_window = self.get_parameter_value('coalesce_window') / 1000
+        self._webhook_threaded = self.get_parameter_value('webhook_threaded')
+        self._webhook_max_body = self.get_parameter_value('webhook_max_body') * 1024
+        self._event_buffer_size = self.get_parameter_value('event_buffer_size')
+        self._webhook_record_file = self.get_parameter_value('webhook_record_file')
+        self._albumart_cache_size = self.get_parameter_value('albumart_cache') * 1048576
+        self._tts_phrases = self.get_parameter_value('tts_phrases')
+        self._tts_prewarm_room = self.get_parameter_value('tts_prewarm_room')
+        self._state_file = self._get_state_file(self.get_parameter_value('state_file'))
+        self._reconcile_max = self.get_parameter_value('reconcile_interval')
+        self._reconcile_min = min(self.get_parameter_value('reconcile_interval_min'), self._reconcile_max)
+        self._position_interval = self.get_parameter_value('position_interval')
+        self._catalog_ttl = self.get_parameter_value('catalog_ttl')
+        self._queue_page_size = self.get_parameter_value('queue_page_size')
+
+        # init metrics of the hot paths and optional profiling of the event loop
+        self.metrics = Metrics()
+        self.metrics.set_profiling(self.get_parameter_value('profiling'))
 
         # define properties
         self._item_dict = {}                        # dict to hold all items {item1: ('sonos_room', 'sonos_cmd'), item2: ('sonos_room', 'sonos_cmd')...}
-        self.sonos = {}                             # dict to hold state information per room
-        self.sonos_room_uuid = set()                # set of tuples for [(room1, uuid1), (room2, uuid2), ...]
-        self.sonos_topology = {}                    # dict for topology {uuid1 {'coordinator': 'RINCON_', 'members': {'RINCON_7828CAEAC58601400'}}, uuid2....
+        self._item_index = {}                       # dispatch index {room1: {cmd1: [item1, item2], cmd2: [item3]}, room2: ...}
+        self._room_items = {}                       # dispatch index {room1: [item1, item2, item3], room2: ...}
+        self._item_accessor = {}                    # precompiled state accessors {item1: (('state', 'volume'), None), item2: ...}
+        self._always_update_items = set()           # items written on every state event, even if the value did not change
+        self._tts_items = {}                        # tts options of say items {item1: (language, volume, rooms), ...}
+        self._item_writes = 0                       # number of item writes caused by sonos events; event loop only
+        self._position_writes = 0                   # number of item writes of the interpolated position; under the publish lock of the position engine
+        self._catalog_writes = 0                    # number of item writes of changed catalog lists; catalog worker only
+        self._item_writes_suppressed = 0            # number of item writes skipped, because the value did not change
+        self._value_changes = 0                     # item writes of changed state values except volatile_fields; event loop only
+        self.sonos = {}                             # dict to hold state information per room {room name: RoomState}
+        self._schema = Schema()                     # fields of the room states required by the items
+        self.sonos_topology = Topology()            # rooms, uuids and groups of the sonos system
+        self._state_version = 0                     # incremented on every change of the room states; used by the web interface
+        self._room_versions = {}                    # {room1: state version of the last change of room1, ...}
+        self._topology_version = 0                  # state version of the last topology change
         self.alive = None
-        
+        self._stopped = threading.Event()
+        self._event_thread = None                   # thread processing the webhook events (get_webhook_data)
+        self._zones_thread = None                   # thread reading the zones at startup
+        self._run_started = None                    # time run() has been called
+        self._startup_times = {}                    # {'restored': s, 'first_valid_item': s} after run() has been called
+        self._last_webhook = None                   # time the last webhook event has been processed
+        self._reconcile_interval = self._reconcile_max
+        self._reconcile_stats = {'polls': 0, 'changes': 0, 'errors': 0}
+        self._api_items = {}                        # items reflecting the api health {(api server or None, 'api_online'): [item1, ...], ...}
+
+        # init persistent http session with a connection pool shared by all command workers
+        self._session = requests.Session()
+        api_servers = self._get_api_servers(self.get_parameter_value('api_servers'))
+        self._session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=len(api_servers), pool_maxsize=16))
+
+        # init a client per api server sending the requests with timeouts, retries and circuit breaker
+        self._backends = {}                         # {api server: ApiClient}; the rooms of each server are learned from its zones
+        for name in api_servers:
+            self._backends[name] = ApiClient(self, self._session, f"http://{name}", self.get_parameter_value('api_timeout'), self.get_parameter_value('api_timeout_slow'),
+                                             self.get_parameter_value('api_retries'), self.metrics, self._update_api_items, name=name)
+        self._default_backend = api_servers[0]
+        self._backend_addresses = self._resolve_api_servers(api_servers) if len(api_servers) > 1 else {}
+
+        # init command dispatcher sending commands to the sonos api in the background
+        self._dispatcher = CommandDispatcher(self, self.get_request, self._coalesce_window, self.metrics)
+
+        # init optional recorder of the raw webhook traffic
+        if self._webhook_record_file:
+            self._recorder = WebhookRecorder(self, self._webhook_record_file, self.get_parameter_value('webhook_record_size') * 1024, self.get_parameter_value('webhook_record_files'))
+        else:
+            self._recorder = None
+
+        # init optional cache for album art served by the web interface
+        if self._albumart_cache_size:
+            self._albumart = AlbumArtCache(self, f"{self.get_parameter_value('albumart_base_url')}/plugin/{self.get_fullname()}/albumart?id=", self._albumart_cache_size,
+                                           self.get_parameter_value('albumart_cache_dir') or None, self.get_parameter_value('albumart_disk_cache') * 1048576)
+        else:
+            self._albumart = None
+
+        # init text-to-speech announcements
+        self._tts = TtsAnnouncer(self, self.get_request, self.get_parameter_value('tts_language'), self.get_parameter_value('tts_voice'),
+                                 self.get_parameter_value('tts_volume'), self.get_parameter_value('tts_clips'), self.metrics)
+
+        # init cache of favorites, playlists and queues
+        self._catalog = Catalog(self, self.get_request, self._catalog_ttl, self._queue_page_size, self._catalog_changed)
+
+        # init scenes applied to several rooms in parallel
+        self._scene = SceneRunner(self, self.get_request, self.metrics, resolve=self._resolve_catalog_name)
+
+        # init interpolation of the playback position
+        self._position = PositionEngine(self._publish_position)
+
         # init HttpServer
-        self.client = HttpServer(self._http_server_ip, self._http_server_port, self)
+        self.client = HttpServer(self._http_server_ip, self._http_server_port, self, threaded=self._webhook_threaded, max_body=self._webhook_max_body, buffer_size=self._event_buffer_size, recorder=self._recorder)
         
         # start HttpServer
         self.client.startup()
@@ -132,25 +306,66 @@ class SonosHttp(SmartPlugin):
         Run method for the plugin
         """
         self.logger.debug(f"{self.get_shortname()}: Run method called")
-        # setup scheduler for device poll loop   (disable the following line, if you don't need to poll the device. Rember to comment the self_cycle statement in __init__ as well)
-        # self.scheduler_add('poll_device', self.perform, cycle=self._cycle)
+        # setup scheduler reconciling the item values with the zones, in case webhooks have been lost
+        if self._reconcile_max:
+            self._reconcile_interval = self._reconcile_max
+            self.scheduler_add('reconcile', self._reconcile, cycle=self._reconcile_interval)
+        # setup a single timer publishing the interpolated playback position of all playing rooms
+        if self._position_interval and self._has_items(*position_cmds):
+            self.scheduler_add('position', self._position.tick, cycle=self._position_interval)
+        # setup refresh of the favorites and playlists written to items
+        if self._catalog_ttl and self._has_items('favorites', 'playlists'):
+            self.scheduler_add('catalog', self._refresh_catalog, cycle=self._catalog_ttl)
         self.alive = True
-
-        # read sonos config
-        response = self.get_request('zones')
-        self.logger.debug(f"run: response={response}")
-        self._decode_zones(response)
-
-        # finally run 'get_webhook_data' in an endless loop
-        self.get_webhook_data()
+        for backend in self._backends.values():
+            self._update_api_items(backend.get_health())
+        self._dispatcher.start()
+        if self._albumart is not None:
+            self._albumart.start()
+        self._tts.start()
+        self._scene.start()
+        self._catalog.start()
+        if self._tts_prewarm_room and self._tts_phrases:
+            self._tts.prewarm(self._tts_prewarm_room, self._tts_phrases)
+
+        self._run_started = time.monotonic()
+        self._stopped.clear()
+
+        # warm start: write the last known state to the items, until it is reconciled with the zones
+        self._restore_state()
+
+        # process webhook events and read the sonos config in the background; run() returns immediately
+        self._event_thread = threading.Thread(target=self.get_webhook_data, daemon=True, name=f"plugins.{self.get_fullname()}.EventLoop")
+        self._event_thread.start()
+        self._zones_thread = threading.Thread(target=self._read_zones, daemon=True, name=f"plugins.{self.get_fullname()}.Zones")
+        self._zones_thread.start()
 
     def stop(self):
         """
         Stop method for the plugin
         """
         self.logger.debug(f"{self.get_shortname()}: Stop method called")
-        # self.scheduler_remove('poll_device')
+        if self._reconcile_max:
+            self.scheduler_remove('reconcile')
+        if self._position_interval and self._has_items(*position_cmds):
+            self.scheduler_remove('position')
+        if self._catalog_ttl and self._has_items('favorites', 'playlists'):
+            self.scheduler_remove('catalog')
         self.alive = False
+        self._stopped.set()
+        if self._event_thread is not None:
+            self._event_thread.join(5.0)
+            if self._event_thread.is_alive():
+                self.logger.error("Unable to shut down event loop thread")
+            self._event_thread = None
+        self._save_state()
+        self._dispatcher.stop()
+        if self._albumart is not None:
+            self._albumart.stop()
+        self._tts.stop()
+        self._scene.stop()
+        self._catalog.stop()
+        self._session.close()
         self.client.stop_server()
         self.client.shutdown()
     
@@ -171,6 +386,15 @@ class SonosHttp(SmartPlugin):
             # self.logger.debug(f"parse item: {item}")
 
             _sonos_cmd = str(self.get_iattr_value(item.conf, 'sonos_cmd'))
+            if _sonos_cmd in api_health_cmds:
+                backend = self.get_iattr_value(item.conf, 'sonos_api_server') if self.has_iattr(item.conf, 'sonos_api_server') else None
+                if backend is not None and backend not in self._backends:
+                    self.logger.warning(f"Item {item.property.path}: sonos_api_server '{backend}' is not configured in api_servers")
+                    return
+                self._itemlist.append(item)
+                self._api_items.setdefault((backend, _sonos_cmd), []).append(item)
+                return
+
             _sonos_room = None
             lookup_item = item
             for i in range(3):
@@ -185,8 +409,81 @@ class SonosHttp(SmartPlugin):
                 self._itemlist.append(item)
                 # self.logger.debug(f"Item {item.id()} with sonos_cmd attribut and defined 'sonos_room' found; append to list")
                 self._item_dict[item] = (_sonos_room, _sonos_cmd)
+                self._add_item_to_index(item, _sonos_room, _sonos_cmd)
+
+                accessor = self._compile_accessor(_sonos_cmd)
+                if accessor is not None and self.has_iattr(item.conf, 'sonos_albumart_cache') and self.get_iattr_value(item.conf, 'sonos_albumart_cache'):
+                    if self._albumart is not None and accessor[0][-1] in albumart_fields:
+                        # point the item at the album art cache instead of the speaker
+                        accessor = (accessor[0][:-1] + ('absoluteAlbumArtUri',), self._albumart.get_url)
+                    else:
+                        self.logger.warning(f"Item {item.property.path}: sonos_albumart_cache is ignored; it requires a sonos_cmd like current_absoluteAlbumArtUri and an enabled album art cache")
+                if accessor is not None:
+                    if not RoomState.has_path(accessor[0]):
+                        self.logger.warning(f"Item {item.property.path}: sonos_cmd '{_sonos_cmd}' refers to an unknown field of the room state. Item will not be updated by the plugin.")
+                    self._item_accessor[item] = accessor
+                    self._schema.add_required_path(accessor[0])
+                elif _sonos_cmd in position_cmds:
+                    for path in position_fields:
+                        self._schema.add_required_path(path)
+                elif _sonos_cmd in catalog_cmds:
+                    if _sonos_cmd == 'queue':
+                        # the cached queue is validated against the current track of the transport-state events
+                        self._schema.add_required_path(('state', 'trackNo'))
+                        self._schema.add_required_path(('state', 'currentTrack', 'type'))
+                elif _sonos_cmd not in write_only_cmds:
+                    self.logger.warning(f"Item {item.property.path}: sonos_cmd '{_sonos_cmd}' is unknown. Item will not be updated by the plugin.")
+
+                if self.has_iattr(item.conf, 'sonos_always_update') and self.get_iattr_value(item.conf, 'sonos_always_update'):
+                    self._always_update_items.add(item)
+
+                if _sonos_cmd in ('say', 'sayall'):
+                    self._tts_items[item] = (self.get_iattr_value(item.conf, 'sonos_tts_language') if self.has_iattr(item.conf, 'sonos_tts_language') else None,
+                                             self.get_iattr_value(item.conf, 'sonos_tts_volume') if self.has_iattr(item.conf, 'sonos_tts_volume') else None,
+                                             self.get_iattr_value(item.conf, 'sonos_tts_rooms') if self.has_iattr(item.conf, 'sonos_tts_rooms') else None)
+
                 return self.update_item
 
+    def unparse_item(self, item):
+        """
+        Remove an item from the plugin's internal structures, e.g. if the item has been removed or reloaded.
+
+        :param item:    The item to remove.
+        """
+        if item in self._item_dict:
+            _sonos_room, _sonos_cmd = self._item_dict.pop(item)
+            self._remove_item_from_index(item, _sonos_room, _sonos_cmd)
+        self._item_accessor.pop(item, None)
+        self._always_update_items.discard(item)
+        self._tts_items.pop(item, None)
+        for items in self._api_items.values():
+            if item in items:
+                items.remove(item)
+        if item in self._itemlist:
+            self._itemlist.remove(item)
+
+    def _add_item_to_index(self, item, room, cmd):
+        """Register item in the dispatch index, so that events are dispatched to matching items only"""
+        self._item_index.setdefault(room, {}).setdefault(cmd, []).append(item)
+        self._room_items.setdefault(room, []).append(item)
+
+    def _remove_item_from_index(self, item, room, cmd):
+        """Remove item from the dispatch index and drop empty entries"""
+        room_index = self._item_index.get(room, {})
+        cmd_items = room_index.get(cmd, [])
+        if item in cmd_items:
+            cmd_items.remove(item)
+        if not cmd_items:
+            room_index.pop(cmd, None)
+        if not room_index:
+            self._item_index.pop(room, None)
+
+        room_items = self._room_items.get(room, [])
+        if item in room_items:
+            room_items.remove(item)
+        if not room_items:
+            self._room_items.pop(room, None)
+
     def update_item(self, item, caller=None, source=None, dest=None):
         """
         Item has been updated
@@ -217,188 +514,781 @@ class SonosHttp(SmartPlugin):
                     request = f"{_sonos_room}/volume/-1"
                 elif _sonos_cmd in ['play', 'pause', 'playpause', 'mute', 'unmute', 'groupMute', 'groupUnmute', 'togglemute', 'next', 'previous', 'state']:
                     request = f"{_sonos_room}/{_sonos_cmd}"
+                elif _sonos_cmd in ('say', 'sayall'):
+                    # announcements bypass the room queue, so their latency does not depend on pending commands
+                    language, volume, rooms = self._tts_items.get(item, (None, None, None))
+                    if _sonos_cmd == 'sayall':
+                        rooms = None
+                    elif not rooms:
+                        rooms = [_sonos_room]
+                    self._tts.announce(item(), rooms, language=language, volume=volume, all_rooms=list(self.sonos_topology.room_to_uuid))
+                    return
                 elif 'say' in _sonos_cmd:
-                    request = f"{_sonos_room}/{_sonos_cmd}/{urlparse.quote(item())}/de"
+                    request = f"{_sonos_room}/{_sonos_cmd}/{urlparse.quote(item())}/{self.get_parameter_value('tts_language')}"
+                elif _sonos_cmd in ('favorite', 'playlist'):
+                    # the name is matched by the room worker, as matching may have to fetch the list first
+                    request = functools.partial(self._get_catalog_request, _sonos_room, _sonos_cmd, item())
+                elif _sonos_cmd in catalog_cmds:
+                    # writing a catalog item refreshes it
+                    self._catalog.refresh(('queue', self.sonos_topology.get_coordinator(_sonos_room) or _sonos_room) if _sonos_cmd == 'queue' else _sonos_cmd)
+                    return
                 else:
                     request = f"{_sonos_room}/{_sonos_cmd}/{item()}"
 
-                response = self.get_request(request)
-                self.logger.debug(f"update_item: response={response}")
+                self._dispatcher.submit(_sonos_room, _sonos_cmd, request)
 
-    def get_request(self, request):
+                # re-anchor the playback position of the group right away instead of waiting for the event
+                if _sonos_cmd in ('timeseek', 'trackseek', 'next', 'previous'):
+                    seconds = parse_position(item()) if _sonos_cmd == 'timeseek' else 0
+                    if seconds is not None:
+                        for roomname in self.sonos_topology.get_members(_sonos_room) or [_sonos_room]:
+                            self._position.seek(roomname, seconds)
 
-        self.logger.debug(f"get_request: request={request}")
-
-        protocol = 'http'
-        ip = self._http_server_ip
-        port = 5005
-        url_base = f"{protocol}://{ip}:{port}"
+    def get_request(self, request, timeout=None, backend=None):
+        """
+        Send a request to the sonos api
 
-        request = f"{url_base}/{request}"
+        With several api servers, the request is sent to the server of the room it addresses; commands affecting
+        all rooms (pauseall, sayall, ...) are sent to every server.
 
-        try:
-            r = requests.get(request, verify=False)
-        except Exception as e:
-            self.logger.error(f"get_request: request={request} failed with Error {e}")
+        :param request: request path like 'Esszimmer/volume/20'
+        :param timeout: read timeout in seconds; default depends on the command
+        :param backend: api server to send the request to instead of the server of the room
+        :return:        parsed json response or None, if the request failed or the api is unavailable
+        """
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"get_request: request={request}")
+        if backend is not None:
+            return self._backends[backend].get(request, timeout)
+        if len(self._backends) == 1:
+            return self._backends[self._default_backend].get(request, timeout)
+
+        if get_command(request) in broadcast_cmds:
+            response = None
+            for client in self._backends.values():
+                response = client.get(request, timeout) or response
+            return response
+        room = request.split('/', 1)[0]
+        return self._backends[self.sonos_topology.get_source(room) or self._default_backend].get(request, timeout)
+
+    def get_backend_by_address(self, address):
+        """:return: api server sending webhooks from the address or None, if unknown or there is a single server"""
+        return self._backend_addresses.get(address)
+
+    def _get_api_servers(self, api_servers):
+        """:return: list of api servers as host:port; Server_IP:Api_Port, if none are configured"""
+        servers = []
+        for server in api_servers or ():
+            server = str(server).strip()
+            if '://' in server:
+                server = urlparse.urlsplit(server).netloc
+            if server and ':' not in server:
+                server = f"{server}:{self._api_port}"
+            if server and server not in servers:
+                servers.append(server)
+        return servers or [f"{self._http_server_ip}:{self._api_port}"]
+
+    def _resolve_api_servers(self, api_servers):
+        """:return: dict {ip address: api server} of the servers with an unambiguous address to attribute webhooks"""
+        addresses = {}
+        for name in api_servers:
+            host = name.rsplit(':', 1)[0]
+            try:
+                address = socket.gethostbyname(host)
+            except OSError as e:
+                self.logger.warning(f"Unable to resolve api server {name}: {e}; its webhooks are attributed by the rooms they contain")
+                continue
+            addresses.setdefault(address, []).append(name)
+        return {address: names[0] for address, names in addresses.items() if len(names) == 1}
+
+    def _tag_event(self, event, backend):
+        """Tag an event with the api server it originates from, if there are several servers"""
+        if len(self._backends) > 1:
+            event['backend'] = backend
+        return event
+
+    def _has_items(self, *cmds):
+        """:return: True, if there are items with one of the commands in any room"""
+        return any(cmd in room_index for room_index in self._item_index.values() for cmd in cmds)
+
+    def _get_catalog_request(self, roomname, cmd, name):
+        """:return: request playing the favorite or playlist best matching name; called by the room worker"""
+        match = self._resolve_catalog_name(cmd, name)
+        if match != name:
+            self.logger.info(f"{cmd} '{name}' of room {roomname} matched to '{match}'")
+        return f"{roomname}/{cmd}/{urlparse.quote(str(match), safe='')}"
+
+    def _resolve_catalog_name(self, cmd, name):
+        """:return: name of the favorite or playlist best matching the name or the name itself, if there is no match"""
+        match = self._catalog.resolve(f"{cmd}s", name)
+        if match is None:
+            self.logger.warning(f"{cmd} '{name}' not found in the {cmd}s of the sonos system")
+            return name
+        return match
+
+    def _refresh_catalog(self):
+        """Scheduler: refresh favorites and playlists in the background; changed lists are written to the items"""
+        for kind in ('favorites', 'playlists'):
+            if self._has_items(kind):
+                self._catalog.refresh(kind)
+
+    def _fill_catalog(self):
+        """Fill the catalog items after the zones have been read"""
+        self._refresh_catalog()
+        for roomname, room_index in list(self._item_index.items()):
+            if 'queue' in room_index:
+                self._catalog.refresh(('queue', self.sonos_topology.get_coordinator(roomname) or roomname))
+
+    def _catalog_changed(self, kind, roomname):
+        """Write a changed list to the favorites or playlists items or a changed queue to the queue items of the group"""
+        if kind == 'queue':
+            tracks = self._catalog.get_queue(roomname, 0, self._queue_page_size)
+            targets = [(member, tracks) for member in self.sonos_topology.get_members(roomname) or [roomname]]
         else:
-            if r.status_code == requests.codes.ok:
-                # self.logger.error(f"get_request: request={request} sucessful")
-                response = json.loads(r.text)
-                # self.logger.error(f"json={response}")
-                # self.logger.debug(f"json={json.dumps(d, indent=4, sort_keys=True)}")
-                return response
-            else:
-                self.logger.error(f"get_request: request={request} failed")
-                return
+            names = self._catalog.get_cached_list(kind)
+            targets = [(member, names) for member in list(self._item_index)]
+        for member, value in targets:
+            for item in self._item_index.get(member, {}).get(kind, ()):
+                self._catalog_writes += 1
+                item(value, self.get_shortname())
+
+    def _check_queue(self, roomname):
+        """
+        Validate the cached queue of a coordinator against its current track; a changed queue is refetched
+
+        Only queues written to queue items of the group are validated. The current track of a stream (radio,
+        line-in, tv) is not an entry of the queue, so its title changing with every song does not invalidate it.
+        """
+        if self.sonos_topology.get_coordinator(roomname) not in (None, roomname):
+            return
+        if not any('queue' in self._item_index.get(member, {}) for member in self.sonos_topology.get_members(roomname) or [roomname]):
+            return
+        state = self.sonos[roomname].get('state') or {}
+        track = state.get('currentTrack') or {}
+        if track.get('type') != 'track':
+            return
+        self._catalog.check_queue(roomname, state.get('trackNo'), track.get('title'))
+
+    def get_catalog(self, room=None, offset=0, limit=None, cached=False):
+        """
+        :param room:    room whose queue is returned; None returns the favorites and playlists only
+        :param cached:  return the cached favorites and playlists only, without fetching and without queue
+        :return:        dict with the version of the catalog, the favorites, playlists and the queue of the room's group
+        """
+        if cached:
+            return {'favorites': self._catalog.get_cached_list('favorites'),
+                    'playlists': self._catalog.get_cached_list('playlists'),
+                    'version': self._catalog.version}
+        data = {'favorites': self._catalog.get_list('favorites') or [],
+                'playlists': self._catalog.get_list('playlists') or []}
+        if room:
+            data['queue'] = self._catalog.get_queue(self.sonos_topology.get_coordinator(room) or room, offset, limit)
+        data['version'] = self._catalog.version
+        return data
+
+    def get_catalog_version(self):
+        return self._catalog.version
+
+    def _update_api_items(self, health):
+        """write the health of an api server to its api_* items and the overall health to the api_* items without sonos_api_server"""
+        self._write_api_items(health['name'], health)
+        self._write_api_items(None, self._get_api_health() if len(self._backends) > 1 else health)
+
+    def _write_api_items(self, backend, health):
+        for cmd, field in api_health_cmds.items():
+            value = health[field]
+            if value is None:
+                continue
+            for item in self._api_items.get((backend, cmd), ()):
+                if item() != value:
+                    item(value, self.get_shortname())
+
+    def _get_api_health(self):
+        """:return: overall health of all api servers: online, if all are online, the worst state and the maximum latency"""
+        healths = [backend.get_health() for backend in self._backends.values()]
+        latencies = [health['latency'] for health in healths if health['latency'] is not None]
+        return {'name': None,
+                'online': all(health['online'] for health in healths),
+                'state': max((health['state'] for health in healths), key=api_states.index),
+                'failures': sum(health['failures'] for health in healths),
+                'latency': max(latencies) if latencies else None}
 
     def get_webhook_data(self):
         while self.alive:
             try:
-                queue_data = self.client.get_queue().get(True, 10)
-                # self.logger.debug(f"get_webhook_data: queue_data={queue_data}")
+                response, enqueued = self.client.get_queue().get(True, 1)
+                # self.logger.debug(f"get_webhook_data: response={response}")
             except queue.Empty:
                 # self.logger.debug("get_webhook_data: there was nothing in the queue so continue")
                 # there was nothing in the queue so continue
                 pass
             else:
-                response = json.loads(queue_data)
-                self.logger.debug(f"get_webhook_data: response={response}")
-
-                response_type = response['type']
+                start = time.monotonic()
+                self.metrics.observe_time('event.wait', start - enqueued)
+                writes = self._item_writes
+                changes = self._value_changes
+
+                try:
+                    self.metrics.run_profiled(self._handle_webhook_event, response)
+                except Exception:
+                    # a single bad event must not stop the event loop; the bookkeeping below is still done
+                    self.metrics.inc('webhook.failed')
+                    self.logger.exception(f"get_webhook_data: processing of {response.get('type')} event failed")
+
+                response_type = response.get('type')
+                self.metrics.observe_time(f'event.process.{get_metric_type(response)}', time.monotonic() - start)
+                self.metrics.observe_count('event.item_writes', self._item_writes - writes)
+
+                source = response.get('source')
+                if source is None:
+                    self._last_webhook = time.monotonic()
+                elif source == 'reconcile':
+                    # the zones of all api servers of a reconciliation are evaluated together
+                    reconciliation = response['reconciliation']
+                    reconciliation['changes'] += self._value_changes - changes
+                    reconciliation['pending'] -= 1
+                    if reconciliation['pending'] == 0:
+                        self._reconciled(reconciliation)
+
+                if 'first_valid_item' not in self._startup_times and self._run_started is not None and (self._item_writes > writes or response_type == 'topology-change'):
+                    self._startup_times['first_valid_item'] = time.monotonic() - self._run_started
+                    self.metrics.observe_time('startup.first_valid_item', self._startup_times['first_valid_item'])
+                    self.logger.info(f"First live sonos state applied {self._startup_times['first_valid_item'] * 1000:.0f} ms after start")
+
+    def _read_zones(self):
+        """Read the zones of all api servers until successful and feed them to the event loop like topology-change webhooks"""
+        pending = list(self._backends)
+        delay = 1
+        while self.alive:
+            for backend in list(pending):
+                response = self.get_request('zones', timeout=zones_timeout, backend=backend)
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(f"_read_zones: response={response}")
+                if isinstance(response, list):
+                    try:
+                        event = self.client.get_decoder().validate_event(self._tag_event({'type': 'topology-change', 'data': response, 'source': 'zones'}, backend))
+                    except ValueError as e:
+                        self.logger.error(f"_read_zones: {e}")
+                    else:
+                        self.client.get_queue().put(event)
+                        pending.remove(backend)
+            if not pending:
+                self._fill_catalog()
+                return
+            self.logger.warning(f"Reading zones from node-sonos-http-api {', '.join(pending)} failed; retry in {delay} s")
+            if self._stopped.wait(delay):
+                return
+            delay = min(delay * 2, zones_retry_max)
+
+    def _reconcile(self):
+        """Scheduler: read the zones of all api servers and feed them to the event loop; only values differing from the items are written"""
+        if not self.alive:
+            return
+        self._reconcile_stats['polls'] += 1
+        events = []
+        for backend in self._backends:
+            response = self.get_request('zones', timeout=zones_timeout, backend=backend)
+            if isinstance(response, list):
+                try:
+                    events.append(self.client.get_decoder().validate_event(self._tag_event({'type': 'topology-change', 'data': response, 'source': 'reconcile'}, backend)))
+                    continue
+                except ValueError as e:
+                    self.logger.error(f"_reconcile: {e}")
+        failed = len(events) < len(self._backends)
+        if failed:
+            self._reconcile_stats['errors'] += 1
+        if not events:
+            self._set_reconcile_interval(self._reconcile_min)
+            return
+        # state of this reconciliation, shared by its events; updated by the event loop only
+        reconciliation = {'pending': len(events), 'changes': 0, 'failed': failed}
+        for event in events:
+            event['reconciliation'] = reconciliation
+            self.client.get_queue().put(event)
+
+    def _reconciled(self, reconciliation):
+        """
+        Adapt the reconcile interval to the result of a reconciliation
 
-                if response_type == "transport-state":
-                    # response={'type': 'transport-state', 'data': {'uuid': 'RINCON_7828CAEB625E01400', 'coordinator': 'RINCON_7828CAEB625E01400', 'roomName': 'Esszimmer', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 8, 'loudness': True}, 'currentTrack': {'artist': 'Antenne Bayern', 'albumArtUri': '/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8', 'duration': 0, 'uri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'trackUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'type': 'radio', 'stationName': 'Antenne Bayern', 'absoluteAlbumArtUri': 'http://192.168.2.130:1400/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'avTransportUriMetadata': '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"><item id="-1" parentID="-1" restricted="true"><dc:title>Antenne Bayern</dc:title><upnp:class>object.item.audioItem.audioBroadcast</upnp:class><desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">SA_RINCON68871_</desc></item></DIDL-Lite>'}}
-                    self._decode_state(response['data'])
+        - values differed (webhooks have been lost) or an api server failed: poll with the minimum interval
+        - no webhook since the last reconciliation: halve the interval, the webhooks may not arrive anymore
+        - webhooks are flowing and values matched: double the interval up to the maximum
+        """
+        if reconciliation['changes']:
+            self._reconcile_stats['changes'] += 1
+            self.metrics.inc('reconcile.changes')
+            self.logger.info(f"Reconciliation with zones changed {reconciliation['changes']} item values; webhooks may have been lost")
+            interval = self._reconcile_min
+        elif reconciliation['failed']:
+            interval = self._reconcile_min
+        elif self._last_webhook is None or time.monotonic() - self._last_webhook > self._reconcile_interval:
+            interval = self._reconcile_interval // 2
+        else:
+            interval = self._reconcile_interval * 2
+        self._set_reconcile_interval(interval)
+
+    def _set_reconcile_interval(self, interval):
+        interval = max(self._reconcile_min, min(interval, self._reconcile_max))
+        if interval != self._reconcile_interval:
+            self._reconcile_interval = interval
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"Reconcile interval changed to {interval} s")
+            self.scheduler_change('reconcile', cycle=interval)
+
+    def _get_state_file(self, state_file):
+        """:return: name of the warm start snapshot file or None, if disabled"""
+        if state_file == 'none':
+            return None
+        if state_file:
+            return state_file
+        sh = self.get_sh()
+        if sh is None:
+            return None
+        return os.path.join(sh.get_basedir(), 'var', 'sonos_http', f"{self.get_fullname()}.json")
+
+    def _restore_state(self):
+        """Restore topology and room states of the last run and write them to the items"""
+        if not self._state_file:
+            return
+        try:
+            snapshot = load_snapshot(self._state_file)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Warm start: unable to read {self._state_file}: {e}")
+            return
+        if not snapshot:
+            return
+
+        self.sonos_topology.update(snapshot['zones'])
+        self.sonos = {intern(roomname): RoomState.from_dict(data, self._schema) for roomname, data in snapshot['rooms'].items()}
+        for roomname in self.sonos:
+            self._touch_room(roomname)
+            self.update_item_value_state(roomname)
+        self._startup_times['restored'] = time.monotonic() - self._run_started
+        self.metrics.observe_time('startup.restored', self._startup_times['restored'])
+        self.logger.info(f"Warm start: state of {len(self.sonos)} rooms restored in {self._startup_times['restored'] * 1000:.1f} ms")
+
+    def _save_state(self):
+        """Persist topology and room states for the warm start"""
+        if not self._state_file or not self.sonos:
+            return
+        try:
+            save_snapshot(self._state_file, self.sonos_topology.to_zones(), {roomname: room.to_dict() for roomname, room in list(self.sonos.items())})
+        except (OSError, TypeError, ValueError) as e:
+            self.logger.warning(f"Warm start: unable to write {self._state_file}: {e}")
+
+    def get_metrics(self):
+        """:return: dict with metrics, buffer and queue states for the web interface"""
+        data = self.metrics.to_dict()
+        data['gauges'] = {'event_buffer': self.client.get_queue().get_stats(),
+                          'command_queue': self._dispatcher.get_queue_depth(),
+                          'item_writes': self._item_writes + self._position_writes + self._catalog_writes,
+                          'item_writes_suppressed': self._item_writes_suppressed}
+        if self._recorder is not None:
+            data['gauges']['recorder'] = self._recorder.get_stats()
+        if self._albumart is not None:
+            data['gauges']['albumart'] = self._albumart.get_stats()
+        data['gauges']['tts_clips'] = self._tts.get_stats()
+        data['gauges']['reconcile'] = dict(self._reconcile_stats, interval=self._reconcile_interval)
+        data['gauges']['position'] = self._position.get_stats()
+        data['gauges']['catalog'] = self._catalog.get_stats()
+        data['gauges']['api'] = {name: backend.get_health() for name, backend in self._backends.items()}
+        data['gauges']['startup'] = {name: round(value * 1000, 1) for name, value in self._startup_times.items()}
+        data['commands'] = self._dispatcher.get_stats()
+        return data
+
+    def _handle_webhook_event(self, response):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"get_webhook_data: response={response}")
+
+        response_type = response.get('type')
+
+        if response_type == "transport-state":
+            # response={'type': 'transport-state', 'data': {'uuid': 'RINCON_7828CAEB625E01400', 'coordinator': 'RINCON_7828CAEB625E01400', 'roomName': 'Esszimmer', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 8, 'loudness': True}, 'currentTrack': {'artist': 'Antenne Bayern', 'albumArtUri': '/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8', 'duration': 0, 'uri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'trackUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'type': 'radio', 'stationName': 'Antenne Bayern', 'absoluteAlbumArtUri': 'http://192.168.2.130:1400/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'avTransportUriMetadata': '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"><item id="-1" parentID="-1" restricted="true"><dc:title>Antenne Bayern</dc:title><upnp:class>object.item.audioItem.audioBroadcast</upnp:class><desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">SA_RINCON68871_</desc></item></DIDL-Lite>'}}
+            self._decode_state(response['data'])
+
+        elif response_type == "topology-change":
+            # response={'type': 'topology-change', 'data': [{'coordinator': {'uuid': 'RINCON_7828CA59548701400', 'coordinator': 'RINCON_7828CA59548701400', 'roomName': 'TV', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 6, 'loudness': True, 'speechEnhancement': True, 'nightMode': False}, 'currentTrack': {'title': 'google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'duration': 2, 'uri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'trackUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'type': 'track', 'stationName': '', 'absoluteAlbumArtUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}, 'sub': {'gain': 7, 'crossover': 0, 'polarity': 0, 'enabled': True}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'avTransportUriMetadata': ''}, 'members': [{'uuid': 'RINCON_7828CA59548701400', 'coordinator': 'RINCON_7828CA59548701400', 'roomName': 'TV', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 6, 'loudness': True, 'speechEnhancement': True, 'nightMode': False}, 'currentTrack': {'title': 'google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'duration': 2, 'uri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'trackUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'type': 'track', 'stationName': '', 'absoluteAlbumArtUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}, 'sub': {'gain': 7, 'crossover': 0, 'polarity': 0, 'enabled': True}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'avTransportUriMetadata': ''}], 'uuid': 'RINCON_7828CA59548701400', 'id': 'RINCON_7828CAEB625E01400:1640192871'}, {'coordinator': {'uuid': 'RINCON_7828CAEAC58601400', 'coordinator': 'RINCON_7828CAEAC58601400', 'roomName': 'Büronos', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 3, 'loudness': True}, 'currentTrack': {'artist': 'BR Schlager', 'title': 'BR Schlager', 'albumArtUri': '/getaa?s=1&u=x-sonosapi-stream%3atunein%253a15544%3fsid%3d303%26flags%3d8224%26sn%3d9', 'duration': 0, 'uri': 'x-sonosapi-stream:tunein%3a15544?sid=303&flags=8224&sn=9', 'trackUri': 'x-sonosapi-stream:tunein%3a15544?sid=303&flags=8224&sn=9', 'type': 'radio', 'stationName': 'BR Schlager', 'absoluteAlbumArtUri': 'http://192.168.2.123:1400/getaa?s=1&u=x-sonosapi-stream%3atunein%253a15544%3fsid%3d303%26flags%3d8224%26sn%3d9'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'x-sonosapi-stream:tunein%3a15544?sid=303&flags=8224&sn=9', 'avTransportUriMetadata': '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"><item id="-1" parentID="-1" restricted="true"><dc:title>BR Schlager</dc:title><upnp:class>object.item.audioItem.audioBroadcast</upnp:class><desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">SA_RINCON77575_X_#Svc77575-644c3615-Token</desc></item></DIDL-Lite>'}, 'members': [{'uuid': 'RINCON_7828CAEAC58601400', 'coordinator': 'RINCON_7828CAEAC58601400', 'roomName': 'Büronos', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 3, 'loudness': True}, 'currentTrack': {'artist': 'BR Schlager', 'title': 'BR Schlager', 'albumArtUri': '/getaa?s=1&u=x-sonosapi-stream%3atunein%253a15544%3fsid%3d303%26flags%3d8224%26sn%3d9', 'duration': 0, 'uri': 'x-sonosapi-stream:tunein%3a15544?sid=303&flags=8224&sn=9', 'trackUri': 'x-sonosapi-stream:tunein%3a15544?sid=303&flags=8224&sn=9', 'type': 'radio', 'stationName': 'BR Schlager', 'absoluteAlbumArtUri': 'http://192.168.2.123:1400/getaa?s=1&u=x-sonosapi-stream%3atunein%253a15544%3fsid%3d303%26flags%3d8224%26sn%3d9'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'x-sonosapi-stream:tunein%3a15544?sid=303&flags=8224&sn=9', 'avTransportUriMetadata': '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"><item id="-1" parentID="-1" restricted="true"><dc:title>BR Schlager</dc:title><upnp:class>object.item.audioItem.audioBroadcast</upnp:class><desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">SA_RINCON77575_X_#Svc77575-644c3615-Token</desc></item></DIDL-Lite>'}], 'uuid': 'RINCON_7828CAEAC58601400', 'id': 'RINCON_7828CAEAC58601400:3457120174'}, {'coordinator': {'uuid': 'RINCON_7828CA060F5401400', 'coordinator': 'RINCON_7828CA060F5401400', 'roomName': 'Carlisonos', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 4, 'treble': 4, 'loudness': True}, 'currentTrack': {'title': 'google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'duration': 2, 'uri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'trackUri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'type': 'track', 'stationName': '', 'absoluteAlbumArtUri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'avTransportUriMetadata': ''}, 'members': [{'uuid': 'RINCON_7828CA060F5401400', 'coordinator': 'RINCON_7828CA060F5401400', 'roomName': 'Carlisonos', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 4, 'treble': 4, 'loudness': True}, 'currentTrack': {'title': 'google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'duration': 2, 'uri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'trackUri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'type': 'track', 'stationName': '', 'absoluteAlbumArtUri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'avTransportUriMetadata': ''}], 'uuid': 'RINCON_7828CA060F5401400', 'id': 'RINCON_7828CA060F5401400:2557459617'}, {'coordinator': {'uuid': 'RINCON_7828CAEB625E01400', 'coordinator': 'RINCON_7828CAEB625E01400', 'roomName': 'Esszimmer', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 8, 'loudness': True}, 'currentTrack': {'artist': 'Antenne Bayern', 'title': 'ZPSTR_BUFFERING', 'albumArtUri': '/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8', 'duration': 0, 'uri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'trackUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'type': 'radio', 'stationName': 'Antenne Bayern', 'absoluteAlbumArtUri': 'http://192.168.2.130:1400/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'TRANSITIONING', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'avTransportUriMetadata': '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"><item id="-1" parentID="-1" restricted="true"><dc:title>Antenne Bayern</dc:title><upnp:class>object.item.audioItem.audioBroadcast</upnp:class><desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">SA_RINCON68871_</desc></item></DIDL-Lite>'}, 'members': [{'uuid': 'RINCON_7828CAEB625E01400', 'coordinator': 'RINCON_7828CAEB625E01400', 'roomName': 'Esszimmer', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 8, 'loudness': True}, 'currentTrack': {'artist': 'Antenne Bayern', 'title': 'ZPSTR_BUFFERING', 'albumArtUri': '/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8', 'duration': 0, 'uri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'trackUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'type': 'radio', 'stationName': 'Antenne Bayern', 'absoluteAlbumArtUri': 'http://192.168.2.130:1400/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'TRANSITIONING', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'avTransportUriMetadata': '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"><item id="-1" parentID="-1" restricted="true"><dc:title>Antenne Bayern</dc:title><upnp:class>object.item.audioItem.audioBroadcast</upnp:class><desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">SA_RINCON68871_</desc></item></DIDL-Lite>'}], 'uuid': 'RINCON_7828CAEB625E01400', 'id': 'RINCON_7828CAEB625E01400:1640192896'}]}
+            self._decode_zones(response['data'], response.get('backend'))
+
+        elif response_type == "volume-change":
+            # response={'type': 'volume-change', 'data': {'uuid': 'RINCON_7828CAEB625E01400', 'previousVolume': 8, 'newVolume': 8, 'roomName': 'Esszimmer'}}
+            data = response['data']
+            roomname = data.get('roomName', None)
+            volume = int(data.get('newVolume', None))
+            self.update_item_value_change(roomname, 'volume', volume)
+
+        elif response_type == "mute-change":
+            # response={'type': 'mute-change', 'data': {'uuid': 'RINCON_7828CAEB625E01400', 'previousMute': True, 'newMute': True, 'roomName': 'Esszimmer'}}
+            data = response['data']
+            roomname = data.get('roomName', None)
+            mute = bool(data.get('newMute', None))
+            self.update_item_value_change(roomname, 'mute', mute)
 
-                elif response_type == "topology-change":
-                    # response={'type': 'topology-change', 'data': [{'coordinator': {'uuid': 'RINCON_7828CA59548701400', 'coordinator': 'RINCON_7828CA59548701400', 'roomName': 'TV', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 6, 'loudness': True, 'speechEnhancement': True, 'nightMode': False}, 'currentTrack': {'title': 'google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'duration': 2, 'uri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'trackUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'type': 'track', 'stationName': '', 'absoluteAlbumArtUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}, 'sub': {'gain': 7, 'crossover': 0, 'polarity': 0, 'enabled': True}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'avTransportUriMetadata': ''}, 'members': [{'uuid': 'RINCON_7828CA59548701400', 'coordinator': 'RINCON_7828CA59548701400', 'roomName': 'TV', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 6, 'loudness': True, 'speechEnhancement': True, 'nightMode': False}, 'currentTrack': {'title': 'google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'duration': 2, 'uri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'trackUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'type': 'track', 'stationName': '', 'absoluteAlbumArtUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}, 'sub': {'gain': 7, 'crossover': 0, 'polarity': 0, 'enabled': True}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3', 'avTransportUriMetadata': ''}], 'uuid': 'RINCON_7828CA59548701400', 'id': 'RINCON_7828CAEB625E01400:1640192871'}, {'coordinator': {'uuid': 'RINCON_7828CAEAC58601400', 'coordinator': 'RINCON_7828CAEAC58601400', 'roomName': 'Büronos', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 3, 'loudness': True}, 'currentTrack': {'artist': 'BR Schlager', 'title': 'BR Schlager', 'albumArtUri': '/getaa?s=1&u=x-sonosapi-stream%3atunein%253a15544%3fsid%3d303%26flags%3d8224%26sn%3d9', 'duration': 0, 'uri': 'x-sonosapi-stream:tunein%3a15544?sid=303&flags=8224&sn=9', 'trackUri': 'x-sonosapi-stream:tunein%3a15544?sid=303&flags=8224&sn=9', 'type': 'radio', 'stationName': 'BR Schlager', 'absoluteAlbumArtUri': 'http://192.168.2.123:1400/getaa?s=1&u=x-sonosapi-stream%3atunein%253a15544%3fsid%3d303%26flags%3d8224%26sn%3d9'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'x-sonosapi-stream:tunein%3a15544?sid=303&flags=8224&sn=9', 'avTransportUriMetadata': '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"><item id="-1" parentID="-1" restricted="true"><dc:title>BR Schlager</dc:title><upnp:class>object.item.audioItem.audioBroadcast</upnp:class><desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">SA_RINCON77575_X_#Svc77575-644c3615-Token</desc></item></DIDL-Lite>'}, 'members': [{'uuid': 'RINCON_7828CAEAC58601400', 'coordinator': 'RINCON_7828CAEAC58601400', 'roomName': 'Büronos', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 3, 'loudness': True}, 'currentTrack': {'artist': 'BR Schlager', 'title': 'BR Schlager', 'albumArtUri': '/getaa?s=1&u=x-sonosapi-stream%3atunein%253a15544%3fsid%3d303%26flags%3d8224%26sn%3d9', 'duration': 0, 'uri': 'x-sonosapi-stream:tunein%3a15544?sid=303&flags=8224&sn=9', 'trackUri': 'x-sonosapi-stream:tunein%3a15544?sid=303&flags=8224&sn=9', 'type': 'radio', 'stationName': 'BR Schlager', 'absoluteAlbumArtUri': 'http://192.168.2.123:1400/getaa?s=1&u=x-sonosapi-stream%3atunein%253a15544%3fsid%3d303%26flags%3d8224%26sn%3d9'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'x-sonosapi-stream:tunein%3a15544?sid=303&flags=8224&sn=9', 'avTransportUriMetadata': '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"><item id="-1" parentID="-1" restricted="true"><dc:title>BR Schlager</dc:title><upnp:class>object.item.audioItem.audioBroadcast</upnp:class><desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">SA_RINCON77575_X_#Svc77575-644c3615-Token</desc></item></DIDL-Lite>'}], 'uuid': 'RINCON_7828CAEAC58601400', 'id': 'RINCON_7828CAEAC58601400:3457120174'}, {'coordinator': {'uuid': 'RINCON_7828CA060F5401400', 'coordinator': 'RINCON_7828CA060F5401400', 'roomName': 'Carlisonos', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 4, 'treble': 4, 'loudness': True}, 'currentTrack': {'title': 'google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'duration': 2, 'uri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'trackUri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'type': 'track', 'stationName': '', 'absoluteAlbumArtUri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'avTransportUriMetadata': ''}, 'members': [{'uuid': 'RINCON_7828CA060F5401400', 'coordinator': 'RINCON_7828CA060F5401400', 'roomName': 'Carlisonos', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 4, 'treble': 4, 'loudness': True}, 'currentTrack': {'title': 'google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'duration': 2, 'uri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'trackUri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'type': 'track', 'stationName': '', 'absoluteAlbumArtUri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'STOPPED', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'http://192.168.2.12:5005/tts/google-d49ec1435dbe5f9d4e1fc04a3cab8e61749d85be-de.mp3', 'avTransportUriMetadata': ''}], 'uuid': 'RINCON_7828CA060F5401400', 'id': 'RINCON_7828CA060F5401400:2557459617'}, {'coordinator': {'uuid': 'RINCON_7828CAEB625E01400', 'coordinator': 'RINCON_7828CAEB625E01400', 'roomName': 'Esszimmer', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 8, 'loudness': True}, 'currentTrack': {'artist': 'Antenne Bayern', 'title': 'ZPSTR_BUFFERING', 'albumArtUri': '/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8', 'duration': 0, 'uri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'trackUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'type': 'radio', 'stationName': 'Antenne Bayern', 'absoluteAlbumArtUri': 'http://192.168.2.130:1400/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'TRANSITIONING', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'avTransportUriMetadata': '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"><item id="-1" parentID="-1" restricted="true"><dc:title>Antenne Bayern</dc:title><upnp:class>object.item.audioItem.audioBroadcast</upnp:class><desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">SA_RINCON68871_</desc></item></DIDL-Lite>'}, 'members': [{'uuid': 'RINCON_7828CAEB625E01400', 'coordinator': 'RINCON_7828CAEB625E01400', 'roomName': 'Esszimmer', 'state': {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 8, 'loudness': True}, 'currentTrack': {'artist': 'Antenne Bayern', 'title': 'ZPSTR_BUFFERING', 'albumArtUri': '/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8', 'duration': 0, 'uri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'trackUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'type': 'radio', 'stationName': 'Antenne Bayern', 'absoluteAlbumArtUri': 'http://192.168.2.130:1400/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8'}, 'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''}, 'trackNo': 1, 'elapsedTime': 0, 'elapsedTimeFormatted': '00:00:00', 'playbackState': 'TRANSITIONING', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}, 'groupState': {'volume': 10, 'mute': False}, 'avTransportUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8', 'avTransportUriMetadata': '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"><item id="-1" parentID="-1" restricted="true"><dc:title>Antenne Bayern</dc:title><upnp:class>object.item.audioItem.audioBroadcast</upnp:class><desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">SA_RINCON68871_</desc></item></DIDL-Lite>'}], 'uuid': 'RINCON_7828CAEB625E01400', 'id': 'RINCON_7828CAEB625E01400:1640192896'}]}
-                    self._decode_zones(response['data'])
+    def update_item_value_change(self, device, cmd, value):
+        # keep the room snapshot in sync, so that following state events are compared against the written value
+        sonos_room_data = self.sonos.get(device, None)
+        unchanged = False
+        if sonos_room_data and cmd in state_accessors:
+            path = state_accessors[cmd]
+            unchanged = self._read_state_value(sonos_room_data, (path, None)) == value
+            self._write_state_value(sonos_room_data, path, value)
+            if not unchanged:
+                self._touch_room(device)
+
+        for item in self._item_index.get(device, {}).get(cmd, ()):
+            if unchanged and item not in self._always_update_items:
+                self._item_writes_suppressed += 1
+                continue
+            self._item_writes += 1
+            item(value, self.get_shortname())
+
+    def update_item_value_state(self, device, changed=None):
+        """
+        Write the state of a room to its items
 
-                elif response_type == "volume-change":
-                    # response={'type': 'volume-change', 'data': {'uuid': 'RINCON_7828CAEB625E01400', 'previousVolume': 8, 'newVolume': 8, 'roomName': 'Esszimmer'}}
-                    data = response['data']
-                    roomname = data.get('roomName', None)
-                    volume = int(data.get('newVolume', None))
-                    self.update_item_value_change(roomname, 'volume', volume)
+        :param device:      room name
+        :param changed:     dict {accessor path: previous value} of the changed fields as returned by RoomState.update;
+                            if given, only items whose value changed are written
+        """
+        sonos_room_data = self.sonos.get(device, None)
+        if not sonos_room_data:
+            return
+
+        for item in self._room_items.get(device, ()):
+            accessor = self._item_accessor.get(item)
+            if accessor is None:
+                continue
+
+            # fields not touched by the update are skipped without reading the value
+            check = changed is not None and item not in self._always_update_items
+            if check and accessor[0] not in changed:
+                self._item_writes_suppressed += 1
+                continue
+            _value = self._read_state_value(sonos_room_data, accessor)
+            if _value is None:
+                continue
+            differs = changed is None or (accessor[0] in changed and self._convert_value(changed[accessor[0]], accessor) != _value)
+            if check and not differs:
+                self._item_writes_suppressed += 1
+                continue
+            if differs and accessor[0] not in volatile_fields:
+                self._value_changes += 1
+            self._item_writes += 1
+            item(_value, self.get_shortname())
+
+    @staticmethod
+    def _compile_accessor(sonos_cmd):
+        """
+        Resolve a sonos_cmd to a fixed accessor into the room data dict
 
-                elif response_type == "mute-change":
-                    # response={'type': 'mute-change', 'data': {'uuid': 'RINCON_7828CAEB625E01400', 'previousMute': True, 'newMute': True, 'roomName': 'Esszimmer'}}
-                    data = response['data']
-                    roomname = data.get('roomName', None)
-                    mute = bool(data.get('newMute', None))
-                    self.update_item_value_change(roomname, 'mute', mute)
+        :param sonos_cmd:   sonos_cmd of the item
+        :return:            tuple of (path, converter) or None, if the command does not reflect a state value
+        """
+        if sonos_cmd in state_accessors:
+            return state_accessors[sonos_cmd], state_converters.get(sonos_cmd)
 
-    def update_item_value_change(self, device, cmd, value):
-        for item in self._item_dict:
-            _sonos_room = self._item_dict[item][0]
-            _sonos_cmd = self._item_dict[item][1]
+        for prefix, path in track_accessor_prefixes.items():
+            if sonos_cmd.startswith(prefix) and len(sonos_cmd) > len(prefix):
+                return path + (sonos_cmd[len(prefix):],), None
 
-            if _sonos_room == device and _sonos_cmd == cmd:
-                item(value, self.get_shortname())
+    def _convert_value(self, value, accessor):
+        """
+        :return:    value converted like _read_state_value does, e.g. a previous value of the room state; album art
+                    uris are converted without registering them at the album art cache
+        """
+        converter = accessor[1]
+        if value is not None and converter is not None:
+            if self._albumart is not None and converter == self._albumart.get_url:
+                converter = self._albumart.format_url
+            value = converter(value)
+        return value
+
+    @staticmethod
+    def _read_state_value(data, accessor):
+        """
+        Read a value from the room state using a precompiled accessor
 
-    def update_item_value_state(self, device):
-        for item in self._item_dict:
-            _sonos_room = self._item_dict[item][0]
-            _sonos_cmd = self._item_dict[item][1]
-            _value = None
-
-            if _sonos_room == device:
-                sonos_room_data = self.sonos.get(_sonos_room, None)
-                if sonos_room_data:
-                    sonos_room_data_state = sonos_room_data.get('state', None)
-                    if sonos_room_data_state:
-                        if _sonos_cmd.startswith('current_'):
-                            current_track = sonos_room_data_state.get('currentTrack', None)
-                            if current_track:
-                                cmd = _sonos_cmd.split('_')[1]
-                                try:
-                                    _value = current_track[cmd]
-                                except:
-                                    pass
-                        elif _sonos_cmd.startswith('next_'):
-                            next_track = sonos_room_data_state.get('nextTrack', None)
-                            if next_track:
-                                cmd = _sonos_cmd.split('_')[1]
-                                try:
-                                    _value = next_track[cmd]
-                                except:
-                                    pass
-                        elif _sonos_cmd in ['play', 'playpause']:
-                            playback_state = sonos_room_data_state.get('playbackState', None)
-                            if playback_state == 'STOPPED':
-                                _value = False
-                            else:
-                                _value = True
-                        else:
-                            _value = self._recursive_lookup(_sonos_cmd, sonos_room_data)
-                if _value is not None:
-                    item(_value, self.get_shortname())
-
-    def _recursive_lookup(self, k, d):
-        """ """
-        if k in d: return d[k]
-        for v in d.values():
-            if isinstance(v, dict):
-                a = self._recursive_lookup(k, v)
-                if a is not None: return a
-        return None
+        :return:    value or None, if the path is not present
+        """
+        path, converter = accessor
+        value = data
+        for key in path:
+            if not isinstance(value, (dict, Record)):
+                return None
+            value = value.get(key)
+        if value is not None and converter is not None:
+            value = converter(value)
+        return value
+
+    @staticmethod
+    def _write_state_value(data, path, value):
+        """Set a value in the room state, if the parent of the path is present"""
+        for key in path[:-1]:
+            data = data.get(key)
+            if not isinstance(data, (dict, Record)):
+                return
+        data[path[-1]] = value
 
     def _get_uuid_from_room(self, room):
-        # list of tuples for [(room1, uuid1), (room2, uuid2), ...]
+        return self.sonos_topology.get_uuid(room)
+
+    def _decode_zones(self, zones, backend=None):
+        # update topology and get the rooms whose group changed; with several api servers, only the rooms of the sending server are replaced
+        if len(self._backends) > 1:
+            backend = backend or self.sonos_topology.find_source(zones) or self._default_backend
+        events, changed_rooms = self.sonos_topology.update(zones, source=backend)
+        for event in events:
+            self.logger.info(f"Topology: {event.kind} room={event.room}, coordinator={self.sonos_topology.get_room(event.coordinator)}, previous={self.sonos_topology.get_room(event.previous) or event.previous}")
+
+        # forget the state of rooms which have been removed or renamed
+        for roomname in list(self.sonos):
+            if self.sonos_topology.get_uuid(roomname) is None:
+                del self.sonos[roomname]
+                self._position.remove(roomname)
+                self._touch_room(roomname)
+        if events:
+            self._state_version += 1
+            self._topology_version = self._state_version
+
+        # decode state; coordinators first, so that members get the current state of their coordinator
+        for entry in zones:
+            self._decode_state(entry['coordinator'], propagate=False)
+        for entry in zones:
+            for member in entry.get('members', ()):
+                if member.get('uuid') != entry['coordinator'].get('uuid'):
+                    self._decode_state(member, propagate=False)
+
+        # update group information; the queue items of rooms with a new group reflect the queue of the new coordinator
+        for roomname in changed_rooms:
+            self._update_group_state(roomname)
+            if 'queue' in self._item_index.get(roomname, ()):
+                self._catalog.refresh(('queue', self.sonos_topology.get_coordinator(roomname) or roomname))
+
+    def _update_group_state(self, roomname):
+        """Write the group information of a room to its group items"""
+        room_data = self.sonos.get(roomname)
+        if room_data is None:
+            room_data = self.sonos[intern(roomname)] = self._schema.new_room()
+        previous = room_data.group
+        room_data.group = self.sonos_topology.get_group_info(roomname)
+        if room_data.group != previous:
+            self._touch_room(roomname)
+
+        room_index = self._item_index.get(roomname, {})
+        for cmd in group_cmds:
+            for item in room_index.get(cmd, ()):
+                accessor = self._item_accessor[item]
+                _value = self._read_state_value(room_data, accessor)
+                differs = previous is None or _value != self._read_state_value({'group': previous}, accessor)
+                if not differs and item not in self._always_update_items:
+                    self._item_writes_suppressed += 1
+                    continue
+                if differs:
+                    self._value_changes += 1
+                self._item_writes += 1
+                item(_value, self.get_shortname())
+
+    def _decode_state(self, data, propagate=True):
+        """
+        Decode the state of a room and write it to the items
 
-        for index, data in enumerate(self.sonos_room_uuid):
-            device = data[0]
-            uuid = data[1]
-            # if room == device:
-                # return uuid
+        :param data:        room data of a transport-state or topology-change payload
+        :param propagate:   if the room is the coordinator of a group, propagate its state to the group members
+        """
+        roomname = data.get('roomName', None)
 
-        return dict(self.sonos_room_uuid).get(room, None)
+        # update the room state in place; the changed fields are collected to write changed values only
+        room = self.sonos.get(roomname)
+        known = room is not None
+        if not known:
+            room = self.sonos[intern(roomname)] = self._schema.new_room()
+        changed = {}
+        room.update(data, changed)
+        self._apply_group_state(roomname, room, changed)
+
+        if changed or not known:
+            self._touch_room(roomname)
+        self.update_item_value_state(roomname, changed if known else None)
+        self._anchor_position(roomname)
+        self._check_queue(roomname)
+
+        if propagate:
+            members = [member for member in self.sonos_topology.get_members(roomname)[1:] if self.sonos_topology.get_coordinator(member) == roomname]
+            if members:
+                # changed coordinator defined fields, relative to the room state and the player state
+                paths = ([path for path in changed if path[0] == 'groupstate'],
+                         [path[1:] for path in changed if path[0] == 'state' and path[1] in group_state_fields])
+                for member in members:
+                    self._propagate_group_state(member, paths)
+
+    def _apply_group_state(self, roomname, room, changed):
+        """
+        Overlay the coordinator defined fields of the room state with the state of the group coordinator; the room
+        state is left unchanged, if the room is not a group member or the coordinator state is unknown
 
-    def _decode_zones(self, zones):
-        # get all rooms and uuids
-        for entry in zones:
-            members = entry['members']
-            for member in members:
-                self.sonos_room_uuid.update([(member['roomName'], member['uuid'])])
+        :param changed:     dict {accessor path: previous value}, extended by the changed fields
+        """
+        coordinator = self.sonos_topology.get_coordinator(roomname)
+        if coordinator is None or coordinator == roomname:
+            return
+        coordinator_data = self.sonos.get(coordinator)
+        if coordinator_data is None or coordinator_data.state is None:
+            return
 
-        # get topology
-        for entry in zones:
-            uuid = entry['uuid']
-            if entry['uuid'] not in self.sonos_topology:
-                self.sonos_topology[uuid] = {}
-            self.sonos_topology[uuid]['coordinator'] = entry['coordinator']['uuid']
-            if self.sonos_topology[uuid].get('members', None) is None:
-                self.sonos_topology[uuid]['members'] = set()
-            for member in entry['members']:
-                self.sonos_topology[uuid]['members'].update([(member['uuid'])])
-            # decode state
-            self._decode_state(entry['coordinator'])
-
-    def _decode_state(self, data):
+        room.ensure('state').copy_fields(coordinator_data.state, group_state_fields, changed)
+        room.copy_fields(coordinator_data, ('groupstate',), changed, False)
 
-        roomname = data.get('roomName', None)
+    def _propagate_group_state(self, roomname, paths):
+        """
+        Update a group member with the state of its coordinator without waiting for an event of the member
 
-        if roomname not in self.sonos:
-            self.sonos[roomname] = {}
+        :param paths:   tuple of the paths of the changed coordinator defined fields relative to the room state
+                        (groupstate) and the player state (state) of the coordinator
+        """
+        room = self.sonos.get(roomname)
+        known = room is not None
+        changed = {}
+        if known and room.state is not None:
+            # the member already has the overlay of the coordinator state, only the changed fields are copied
+            coordinator_data = self.sonos[self.sonos_topology.get_coordinator(roomname)]
+            room.copy_paths(coordinator_data, paths[0], changed)
+            if coordinator_data.state is not None:
+                room.state.copy_paths(coordinator_data.state, paths[1], changed)
+        else:
+            if not known:
+                room = self.sonos[intern(roomname)] = self._schema.new_room()
+                room.set('uuid', intern(self.sonos_topology.get_uuid(roomname)), {})
+            self._apply_group_state(roomname, room, changed)
+        if changed or not known:
+            self._touch_room(roomname)
+        self.update_item_value_state(roomname, changed)
+        # the member plays in sync with the coordinator, whose state has just been received
+        self._anchor_position(roomname, self.sonos_topology.get_coordinator(roomname))
+
+    def _anchor_position(self, roomname, source=None):
+        """
+        Re-anchor the interpolated playback position of a room with position items on its current state
 
-        self.sonos[roomname]['uuid'] = data.get('uuid', None)
-        self.sonos[roomname]['coordinator'] = data.get('coordinator', None)
-        self.sonos[roomname]['state'] = data.get('state', None)
-        self.sonos[roomname]['groupstate'] = data.get('groupState', None)
+        :param source:  room whose state is used instead, e.g. the coordinator of a group member
+        """
+        room_index = self._item_index.get(roomname)
+        if not room_index or not any(cmd in room_index for cmd in position_cmds):
+            return
+        state = self.sonos[source or roomname].get('state') or {}
+        track = state.get('currentTrack') or {}
+        self._position.anchor(roomname, state.get('elapsedTime'), track.get('duration'), state.get('playbackState'))
+
+    def _publish_position(self, roomname, position, duration):
+        """Write the interpolated playback position of a room to its position items"""
+        room_index = self._item_index.get(roomname, {})
+        values = {'position': position,
+                  'position_formatted': format_position(position),
+                  'progress': round(position * 100 / duration, 1) if duration else None}
+        for cmd in position_cmds:
+            if values[cmd] is None:
+                continue
+            for item in room_index.get(cmd, ()):
+                self._position_writes += 1
+                item(values[cmd], self.get_shortname())
+
+    def _touch_room(self, roomname):
+        """Mark the state of a room as changed for the web interface"""
+        self._state_version += 1
+        self._room_versions[roomname] = self._state_version
+
+    def announce(self, text, rooms=None, language=None, volume=None, voice=None):
+        """
+        Announce a phrase via text-to-speech in several rooms in parallel
+
+        :param text:        phrase to announce
+        :param rooms:       list of room names; None announces in all rooms using sayall
+        :param language:    language of the phrase; default is parameter tts_language
+        :param volume:      announce volume; default is parameter tts_volume
+        :param voice:       voice used instead of the language; default is parameter tts_voice
+        :return:            dict {room or 'all': response of node-sonos-http-api}
+        """
+        if isinstance(rooms, str):
+            rooms = [rooms]
+        return self._tts.announce(text, rooms, language=language, voice=voice, volume=volume,
+                                  all_rooms=list(self.sonos_topology.room_to_uuid), wait=True)
 
-        self.update_item_value_state(roomname)
+    def scene(self, scene):
+        """
+        Apply a scene: grouping first, then the settings of all rooms in parallel, then source and playback of the coordinators
+
+        :param scene:   dict like {'groups': [['Wohnzimmer', 'Kueche']], 'rooms': {'Wohnzimmer': {'volume': 30, 'favorite': 'Bayern 3'}}, 'play': True}
+        :return:        dict with success and duration of the scene and the results and durations of every step and request
+        :raises ValueError: if the scene is invalid; no request has been sent then
+        """
+        return self._scene.run(scene, self.sonos_topology)
+
+    def get_albumart(self, art_id):
+        """:return: tuple of (data, content type, etag) of a cached album art image or None"""
+        if self._albumart is None:
+            return None
+        return self._albumart.get(art_id)
+
+    def get_state_version(self):
+        return self._state_version
+
+    def get_room_states(self, since=0):
+        """
+        Get the state of the rooms changed after a given state version
+
+        :param since:   state version known to the caller; 0 returns all rooms
+        :return:        dict {'version': ..., 'rooms': {room: summary or None, if removed}, 'topology': ...}; the
+                        topology is only included, if it changed after version since
+        """
+        version = self._state_version
+        if since > version:
+            # the plugin has been restarted since the caller's last update
+            since = 0
+        rooms = {}
+        for roomname, room_version in list(self._room_versions.items()):
+            if room_version > since:
+                rooms[roomname] = self._get_room_summary(roomname)
+        if since == 0:
+            for roomname in list(self._room_items):
+                rooms.setdefault(roomname, self._get_room_summary(roomname))
+        data = {'version': version, 'rooms': rooms}
+        if since == 0 or self._topology_version > since:
+            data['topology'] = self.sonos_topology.to_dict()
+        return data
+
+    def _get_room_summary(self, roomname):
+        """
+        :return:    dict with the values of a room shown in the web interface or None, if the room is unknown; only
+                    the items written by the event loop are included, as other writes (position, catalog, api
+                    health) do not change the state version the summary is cached by
+        """
+        room_data = self.sonos.get(roomname)
+        items = {item.property.path: item() for item in self._room_items.get(roomname, ())
+                 if item in self._item_accessor or self._item_dict[item][1] in group_cmds}
+        if room_data is None and not items:
+            return None
+        room_data = room_data or {}
+        state = room_data.get('state') or {}
+        track = state.get('currentTrack') or {}
+        return {'playbackState': state.get('playbackState'),
+                'volume': state.get('volume'),
+                'mute': state.get('mute'),
+                'title': track.get('title'),
+                'artist': track.get('artist'),
+                'stationName': track.get('stationName'),
+                'group': room_data.get('group'),
+                'items': items}
 
 
 class Consumer(object):
     """The Consumer contains two primary parts - a Server and a Parser."""
 
-    queue = queue.Queue()
-
-    def __init__(self, plugin_instance):
+    def __init__(self, plugin_instance, buffer_size=500):
 
         # init instance
         self._plugin_instance = plugin_instance
-        
+        self._queue = EventBuffer(buffer_size)
+        self._decoder = PayloadDecoder()
+
         # do logging
         self._plugin_instance.logger.debug("Starting Collector Object")
 
@@ -409,27 +1299,38 @@ class Consumer(object):
         pass
 
     def get_queue(self):
-        return Consumer.queue
+        return self._queue
+
+    def get_decoder(self):
+        return self._decoder
 
 
 class HttpServer(Consumer):
-    """Use the ecowitt protocol (not WU protocol) to capture data"""
+    """Receive the webhook POSTs of node-sonos-http-api"""
 
-    def __init__(self, tcp_server_address, tcp_server_port, plugin_instance):
+    def __init__(self, tcp_server_address, tcp_server_port, plugin_instance, threaded=True, max_body=2097152, buffer_size=500, recorder=None):
 
         # now initialize my superclasses
-        super(HttpServer, self).__init__(plugin_instance)
+        super(HttpServer, self).__init__(plugin_instance, buffer_size)
 
         # init instance
         self._plugin_instance = plugin_instance
+        self._recorder = recorder
 
         self._server_thread = None
 
         # log the relevant settings/parameters we are using
         self._plugin_instance.logger.debug("Starting HttpServer")
 
-        # init tcp server
-        self._server = HttpServer.TCPServer(tcp_server_address, tcp_server_port, HttpServer.Handler, plugin_instance)
+        # init tcp server; the threaded server handles connections concurrently and keeps them open (HTTP/1.1)
+        if threaded:
+            self._server = HttpServer.ThreadingTCPServer(tcp_server_address, tcp_server_port, HttpServer.KeepAliveHandler, plugin_instance, max_body)
+        else:
+            self._server = HttpServer.TCPServer(tcp_server_address, tcp_server_port, HttpServer.Handler, plugin_instance, max_body)
+        self._server.consumer = self
+
+    def get_recorder(self):
+        return self._recorder
 
     def run_server(self):
         self._server.run()
@@ -441,6 +1342,8 @@ class HttpServer(Consumer):
     def startup(self):
         """Start a thread that collects data from the GW1000/GW1100 TCP."""
 
+        if self._recorder is not None:
+            self._recorder.start()
         try:
             self._server_thread = threading.Thread(target=self.run_server)
             self._server_thread.setDaemon(True)
@@ -463,6 +1366,8 @@ class HttpServer(Consumer):
             else:
                 self._plugin_instance.logger.info("SonosHttpServer thread has been terminated")
         self._server_thread = None
+        if self._recorder is not None:
+            self._recorder.stop()
         
     class Server(object):
 
@@ -473,15 +1378,16 @@ class HttpServer(Consumer):
             pass
 
     class TCPServer(Server, socketserver.TCPServer):
-    
-        daemon_threads = True
+
         allow_reuse_address = True
+        request_queue_size = 64
 
-        def __init__(self, address, port, handler, plugin_instance):
+        def __init__(self, address, port, handler, plugin_instance, max_body):
 
             # init instance
             self._plugin_instance = plugin_instance
-            
+            self.max_body = max_body
+
             # init TCP Server
             self._plugin_instance.logger.info(f"start tcp server at {address}:{port}")
             socketserver.TCPServer.__init__(self, (address, int(port)), handler)
@@ -495,8 +1401,17 @@ class HttpServer(Consumer):
             self.shutdown()
             self.server_close()
 
+    class ThreadingTCPServer(socketserver.ThreadingMixIn, TCPServer):
+
+        daemon_threads = True
+        block_on_close = False
+
     class Handler(BaseHTTPRequestHandler):
 
+        def log_message(self, format, *args):
+            # route the access log to the plugin logger instead of stderr
+            self.server._plugin_instance.logger.debug(f"HttpServer: {self.address_string()} {format % args}")
+
         def reply(self):
             # standard reply is HTTP code of 200 and the response string
             ok_answer = "OK\n"
@@ -509,11 +1424,44 @@ class HttpServer(Consumer):
             # get the payload from an HTTP POST
             # logger = logging.getLogger(__name__)
             # logger.debug(f"POST: client_address={client_ip}")
-            length = int(self.headers["Content-Length"])
+            length = self.headers.get("Content-Length")
+            if length is None:
+                self.close_connection = True
+                self.send_error(411)
+                return
+            try:
+                length = int(length)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self.close_connection = True
+                self.send_error(400, "Malformed Content-Length")
+                return
+            if length > self.server.max_body:
+                # do not read the body; the connection is closed after the error reply
+                self.close_connection = True
+                self.send_error(413)
+                return
             data = self.rfile.read(length)
             # logger.debug(f"POST: data={str(data)}")
+            recorder = self.server.consumer.get_recorder()
+            if recorder is not None:
+                recorder.record(data)
+            metrics = self.server._plugin_instance.metrics
+            start = time.monotonic()
+            try:
+                event = self.server.consumer.get_decoder().decode(data)
+            except ValueError:
+                metrics.inc('webhook.malformed')
+                self.send_error(400, "Malformed payload")
+                return
+            metrics.observe_time('webhook.decode', time.monotonic() - start)
+            metrics.inc(f"webhook.{get_metric_type(event)}")
+            backend = self.server._plugin_instance.get_backend_by_address(self.client_address[0])
+            if backend is not None:
+                event['backend'] = backend
             self.reply()
-            Consumer.queue.put(data)
+            self.server.consumer.get_queue().put(event)
 
         def do_PUT(self):
             pass
@@ -523,5 +1471,13 @@ class HttpServer(Consumer):
             # get the query string from an HTTP GET
             data = urlparse.urlparse(self.path).query
             logger.debug(f"GET: {str(data)}")
+            # node-sonos-http-api only sends POST requests; GET requests are answered but not processed
             self.reply()
-            Consumer.queue.put(data)
+
+    class KeepAliveHandler(Handler):
+
+        # persistent connections; idle connections are closed after timeout seconds
+        protocol_version = 'HTTP/1.1'
+        timeout = 60
+        # header and body of the reply are written separately; avoid waiting for the delayed ACK of the client
+        disable_nagle_algorithm = True
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import collections
+import hashlib
+import os
+import queue
+import threading
+
+import requests
+
+
+class AlbumArtCache(object):
+    """
+    Fetches album art from the speakers once per unique uri and keeps it in a size bounded LRU cache.
+
+    Album art is addressed by a short id derived from the uri. get_url() registers a uri and returns the url of
+    the cached image served by the web interface; the image is prefetched in the background by a single worker,
+    so the weak speaker hardware sees at most one request at a time. A request for an image which is not cached
+    yet waits for the worker. The registered uris are kept in an LRU of max_uris entries; a uri and its image are
+    dropped together. Identical images of different uris (e.g. the
+    logo of a radio station shown by several speakers) are stored once, keyed by the hash of their content, which
+    also serves as ETag.
+
+    If a directory is given, images are additionally stored on disk (bounded by disk_bytes) and survive restarts.
+    """
+
+    def __init__(self, plugin_instance, url_prefix, max_bytes=16777216, directory=None, disk_bytes=104857600, timeout=5.0, max_uris=1000):
+        """
+        :param plugin_instance: instance of the plugin
+        :param url_prefix:      url of the album art endpoint of the web interface, the id is appended
+        :param max_bytes:       maximum size of the images kept in memory
+        :param directory:       directory to store images on disk or None
+        :param disk_bytes:      maximum size of the images stored on disk
+        :param timeout:         timeout for fetching an image from a speaker in seconds
+        :param max_uris:        maximum number of registered uris
+        """
+
+        # init instance
+        self._plugin_instance = plugin_instance
+        self._url_prefix = url_prefix
+        self._max_bytes = max_bytes
+        self._directory = directory
+        self._disk_bytes = disk_bytes
+        self._timeout = timeout
+        self._max_uris = max_uris
+
+        self._lock = threading.Lock()
+        self._loaded = threading.Condition(self._lock)  # notified by the worker after loading an image
+        self._uris = collections.OrderedDict()      # LRU of registered uris {id: uri}
+        self._entries = collections.OrderedDict()   # LRU of cached images {id: content hash}
+        self._blobs = {}                            # {content hash: [data, content type, reference count]}
+        self._size = 0                              # size of all blobs in memory
+        self._pending = set()                       # ids queued for prefetching
+        self._queue = queue.Queue()
+        self._session = requests.Session()
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.fetched = 0
+        self.failed = 0
+        self.deduplicated = 0
+
+        if self._directory:
+            os.makedirs(self._directory, exist_ok=True)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._worker, daemon=True,
+                                        name=f"plugins.{self._plugin_instance.get_fullname()}.AlbumArt")
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(self._timeout + 1)
+        self._thread = None
+        self._session.close()
+
+    @staticmethod
+    def get_id(uri):
+        return hashlib.sha1(uri.encode()).hexdigest()[:20]
+
+    def get_url(self, uri):
+        """
+        Register a uri and return the url of the cached image; usable as converter of an item accessor
+
+        :param uri:     absolute album art uri of a speaker
+        :return:        url of the cached image or the uri itself, if it is not a http uri
+        """
+        if not uri or not uri.startswith('http'):
+            return uri
+        art_id = self.get_id(uri)
+        with self._lock:
+            if art_id in self._uris:
+                self._uris.move_to_end(art_id)
+            else:
+                self._uris[art_id] = uri
+                while len(self._uris) > self._max_uris:
+                    self._forget(next(iter(self._uris)))
+            if art_id not in self._entries:
+                self._prefetch(art_id)
+        return f"{self._url_prefix}{art_id}"
+
+    def format_url(self, uri):
+        """:return: url of the cached image like get_url, without registering the uri"""
+        if not uri or not uri.startswith('http'):
+            return uri
+        return f"{self._url_prefix}{self.get_id(uri)}"
+
+    def get(self, art_id):
+        """
+        Get a cached image; if it is registered but not cached yet, waits until the worker has fetched it
+
+        :return:    tuple of (data, content type, etag) or None, if the id is unknown or fetching failed
+        """
+        with self._lock:
+            digest = self._entries.get(art_id)
+            if digest is not None:
+                self._entries.move_to_end(art_id)
+                self.hits += 1
+            else:
+                self.misses += 1
+                if art_id not in self._uris or self._thread is None:
+                    return None
+                self._prefetch(art_id)
+                self._loaded.wait_for(lambda: art_id not in self._pending, self._timeout * 2)
+                digest = self._entries.get(art_id)
+                if digest is None:
+                    return None
+            data, content_type, _ = self._blobs[digest]
+            return data, content_type, digest
+
+    def _prefetch(self, art_id):
+        """Queue an image for the worker, if it is not queued yet; called with the lock held"""
+        if art_id not in self._pending:
+            self._pending.add(art_id)
+            self._queue.put(art_id)
+
+    def _worker(self):
+        while True:
+            art_id = self._queue.get()
+            if art_id is None:
+                break
+            with self._lock:
+                uri = self._uris.get(art_id)
+                cached = art_id in self._entries
+            if uri is not None and not cached:
+                self._load(art_id, uri)
+            with self._lock:
+                self._pending.discard(art_id)
+                self._loaded.notify_all()
+
+    def _load(self, art_id, uri):
+        """Load an image from disk or from the speaker into the memory cache; :return: True on success"""
+        image = self._read_disk(art_id)
+        if image is None:
+            image = self._fetch(uri)
+            if image is None:
+                return False
+            self._write_disk(art_id, *image)
+        self._add(art_id, *image)
+        return True
+
+    def _fetch(self, uri):
+        try:
+            r = self._session.get(uri, timeout=self._timeout)
+        except requests.RequestException as e:
+            self.failed += 1
+            self._plugin_instance.logger.warning(f"Album art: fetching {uri} failed with Error {e}")
+            return None
+        content_type = r.headers.get('Content-Type', 'image/jpeg')
+        if r.status_code != requests.codes.ok or not content_type.startswith('image/'):
+            self.failed += 1
+            self._plugin_instance.logger.warning(f"Album art: fetching {uri} failed with status {r.status_code}, content type {content_type}")
+            return None
+        self.fetched += 1
+        return r.content, content_type
+
+    def _add(self, art_id, data, content_type):
+        digest = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            if art_id in self._entries or art_id not in self._uris:
+                return
+            blob = self._blobs.get(digest)
+            if blob is None:
+                self._blobs[digest] = [data, content_type, 1]
+                self._size += len(data)
+            else:
+                blob[2] += 1
+                self.deduplicated += 1
+            self._entries[art_id] = digest
+            while self._size > self._max_bytes and len(self._entries) > 1:
+                self._evict()
+
+    def _evict(self):
+        art_id, digest = self._entries.popitem(last=False)
+        del self._uris[art_id]
+        self._release(digest)
+
+    def _forget(self, art_id):
+        """Drop a registered uri and its image"""
+        del self._uris[art_id]
+        digest = self._entries.pop(art_id, None)
+        if digest is not None:
+            self._release(digest)
+
+    def _release(self, digest):
+        blob = self._blobs[digest]
+        blob[2] -= 1
+        if blob[2] == 0:
+            del self._blobs[digest]
+            self._size -= len(blob[0])
+
+    # disk cache: <directory>/<id>.ref contains content hash and content type, <directory>/<content hash> the image
+
+    def _read_disk(self, art_id):
+        if not self._directory:
+            return None
+        try:
+            with open(os.path.join(self._directory, f"{art_id}.ref")) as f:
+                digest, content_type = f.read().split()
+            with open(os.path.join(self._directory, digest), 'rb') as f:
+                return f.read(), content_type
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, art_id, data, content_type):
+        if not self._directory:
+            return
+        digest = hashlib.sha1(data).hexdigest()
+        try:
+            path = os.path.join(self._directory, digest)
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(data)
+            with open(os.path.join(self._directory, f"{art_id}.ref"), 'w') as f:
+                f.write(f"{digest} {content_type}")
+            self._cleanup_disk()
+        except OSError as e:
+            self._plugin_instance.logger.warning(f"Album art: writing to {self._directory} failed with Error {e}")
+
+    def _cleanup_disk(self):
+        """Remove the least recently written images, if the disk cache exceeds its size, and their references"""
+        files = []
+        refs = []
+        total = 0
+        with os.scandir(self._directory) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith('.ref'):
+                    refs.append(entry.name)
+                else:
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+                    total += stat.st_size
+        if total <= self._disk_bytes:
+            return
+        removed = set()
+        for _, name, size in sorted(files):
+            os.remove(os.path.join(self._directory, name))
+            removed.add(name)
+            total -= size
+            if total <= self._disk_bytes:
+                break
+        # images are only removed here, so removing the references to them leaves no dangling references
+        for name in refs:
+            path = os.path.join(self._directory, name)
+            try:
+                with open(path) as f:
+                    digest = f.read().split()[0]
+            except (OSError, IndexError):
+                digest = None
+            if digest is None or digest in removed:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def get_stats(self):
+        """:return: dict with the number of cached images, their size and hit/miss counters"""
+        with self._lock:
+            return {'uris': len(self._uris),
+                    'images': len(self._entries),
+                    'unique': len(self._blobs),
+                    'bytes': self._size,
+                    'max_bytes': self._max_bytes,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'fetched': self.fetched,
+                    'failed': self.failed,
+                    'deduplicated': self.deduplicated,
+                    'pending': len(self._pending)}
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import difflib
+import queue
+import threading
+import time
+import unicodedata
+
+# kinds of catalog lists and the request reading them
+catalog_requests = {'favorites': 'favorites', 'playlists': 'playlists'}
+
+# minimum similarity of a name to a favorite or playlist name for fuzzy matching
+match_cutoff = 0.75
+
+# fields of the queue entries kept in the cache
+queue_fields = ('title', 'artist', 'album')
+
+# minimum time in seconds between two refreshes of a list caused by an unknown name
+refresh_on_miss_interval = 30
+
+
+def normalize_name(name):
+    """:return: name reduced for fuzzy matching: case folded, without accents and punctuation, single spaces"""
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(c if c.isalnum() else ' ' for c in name if not unicodedata.combining(c))
+    return ' '.join(name.casefold().split())
+
+
+class CatalogList(object):
+    """Cached favorites or playlists with the index for fuzzy matching of their names"""
+
+    __slots__ = ('names', 'index', 'keys', 'fetched')
+
+    def __init__(self, names):
+        self.names = names
+        self.index = {}                             # {normalized name: name}
+        for name in names:
+            self.index.setdefault(normalize_name(name), name)
+        self.keys = list(self.index)
+        self.fetched = time.monotonic()
+
+    def match(self, name):
+        """:return: name of the list best matching the given name or None"""
+        if name in self.names:
+            return name
+        key = normalize_name(name)
+        if key in self.index:
+            return self.index[key]
+        # a unique list entry containing the name, e.g. 'bayern 3' for 'BAYERN 3 - Live'
+        containing = [candidate for candidate in self.keys if key and key in candidate]
+        if len(containing) == 1:
+            return self.index[containing[0]]
+        matches = difflib.get_close_matches(key, self.keys, n=1, cutoff=match_cutoff)
+        return self.index[matches[0]] if matches else None
+
+
+class QueueCache(object):
+    """Cached entries of the queue of a group coordinator, fetched page by page"""
+
+    __slots__ = ('tracks', 'complete', 'fetched', 'fetching')
+
+    def __init__(self):
+        self.tracks = []
+        self.complete = False
+        self.fetched = time.monotonic()
+        self.fetching = threading.Lock()            # held while pages are fetched, so a page is fetched once
+
+
+class Catalog(object):
+    """
+    Cache of the favorites and playlists of the sonos system and of the queues of the group coordinators.
+
+    Lists are fetched once and served from memory until the ttl expires or they are invalidated. Queues are
+    fetched incrementally in pages of page_size entries as far as requested. Transport-state events validate
+    the cached queue: if the current track differs from the cached entry at its position, the queue has been
+    replaced or changed and is refetched in the background. Names of favorites and playlists are matched
+    fuzzy using a precomputed index of normalized names.
+    """
+
+    def __init__(self, plugin_instance, send, ttl=3600, page_size=100, listener=None):
+        """
+        :param plugin_instance: instance of the plugin
+        :param send:            callable(request) sending a request to the sonos api; returns the response or None
+        :param ttl:             time in seconds lists and queues are served from the cache; 0: until invalidated
+        :param page_size:       number of queue entries fetched per request
+        :param listener:        callable(kind, room) called by the worker after a list (room None) or a queue changed
+        """
+
+        # init instance
+        self._plugin_instance = plugin_instance
+        self._send = send
+        self._ttl = ttl
+        self._page_size = page_size
+        self._listener = listener
+
+        self._lock = threading.Lock()
+        self._lists = {}                            # {'favorites': CatalogList, 'playlists': CatalogList}
+        self._queues = {}                           # {coordinator room: QueueCache}
+        self._pending = set()                       # refreshes queued for the worker {('favorites', None), ('queue', room), ...}
+        self._queue = queue.Queue()
+        self._thread = None
+        self.version = 0                            # incremented on every change of a list or queue
+
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.invalidations = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._worker, daemon=True,
+                                        name=f"plugins.{self._plugin_instance.get_fullname()}.Catalog")
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(5)
+        self._thread = None
+
+    def _expired(self, entry):
+        return self._ttl and time.monotonic() - entry.fetched > self._ttl
+
+    def get_list(self, kind):
+        """:return: names of the favorites or playlists; fetched, if not cached or expired. None, if fetching failed"""
+        with self._lock:
+            entry = self._lists.get(kind)
+            if entry is not None and not self._expired(entry):
+                self.hits += 1
+                return entry.names
+            self.misses += 1
+        entry = self._fetch_list(kind)
+        return entry.names if entry is not None else None
+
+    def get_cached_list(self, kind):
+        """:return: cached names of the favorites or playlists without fetching; empty list, if not cached"""
+        with self._lock:
+            entry = self._lists.get(kind)
+            return entry.names if entry is not None else []
+
+    def resolve(self, kind, name):
+        """
+        Match a name against the favorites or playlists
+
+        :param kind:    'favorites' or 'playlists'
+        :param name:    name as given by the user, e.g. 'bayern3'
+        :return:        name of the favorite or playlist or None, if there is no match
+        """
+        if self.get_list(kind) is None:
+            return None
+        with self._lock:
+            entry = self._lists[kind]
+        match = entry.match(name)
+        if match is None and time.monotonic() - entry.fetched > refresh_on_miss_interval:
+            # the favorite may have been added after the list has been cached
+            entry = self._fetch_list(kind)
+            match = entry.match(name) if entry is not None else None
+        return match
+
+    def get_queue(self, room, offset=0, limit=None):
+        """
+        :param room:    room name of the group coordinator
+        :param offset:  index of the first entry
+        :param limit:   maximum number of entries; None for all entries
+        :return:        list of queue entries {'title', 'artist', 'album'}; fetches missing pages
+        """
+        end = None if limit is None else offset + limit
+        with self._lock:
+            entry = self._queues.get(room)
+            if entry is None or self._expired(entry):
+                entry = self._queues[room] = QueueCache()
+            elif entry.complete or (end is not None and len(entry.tracks) >= end):
+                self.hits += 1
+                return entry.tracks[offset:end]
+            self.misses += 1
+
+        with entry.fetching:
+            # pages fetched by a concurrent caller in the meantime are not fetched again
+            while not entry.complete and (end is None or len(entry.tracks) < end):
+                page = self._send(f"{room}/queue/{self._page_size}/{len(entry.tracks)}")
+                self.fetches += 1
+                if not isinstance(page, list):
+                    break
+                with self._lock:
+                    if self._queues.get(room) is not entry:
+                        # invalidated while fetching
+                        break
+                    entry.tracks.extend({field: track.get(field) for field in queue_fields} for track in page if isinstance(track, dict))
+                    entry.complete = len(page) < self._page_size
+                    self.version += 1
+        return entry.tracks[offset:end]
+
+    def check_queue(self, room, track_no, title):
+        """
+        Validate the cached queue of a coordinator against the current track of a transport-state event
+
+        :param track_no:    number of the current track in the queue; None, if unknown (no validation)
+        :return:            True, if the cached queue has been invalidated; a refresh is queued for the worker
+        """
+        if track_no is None:
+            return False
+        with self._lock:
+            entry = self._queues.get(room)
+            if entry is None or not entry.tracks:
+                return False
+            if not isinstance(track_no, int) or track_no < 1:
+                changed = True
+            elif track_no <= len(entry.tracks):
+                changed = entry.tracks[track_no - 1]['title'] != title
+            else:
+                changed = entry.complete
+            if not changed:
+                return False
+        self.invalidate_queue(room)
+        self.refresh(('queue', room))
+        return True
+
+    def invalidate(self, kind=None):
+        """Drop a cached list or all lists"""
+        with self._lock:
+            for name in ([kind] if kind else list(self._lists)):
+                if self._lists.pop(name, None) is not None:
+                    self.invalidations += 1
+
+    def invalidate_queue(self, room):
+        with self._lock:
+            if self._queues.pop(room, None) is not None:
+                self.invalidations += 1
+                self.version += 1
+
+    def refresh(self, key):
+        """Queue a refresh for the worker; key is 'favorites', 'playlists' or ('queue', room)"""
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._queue.put(key)
+
+    def _fetch_list(self, kind):
+        response = self._send(catalog_requests[kind])
+        self.fetches += 1
+        if not isinstance(response, list):
+            return None
+        entry = CatalogList([str(name) for name in response])
+        with self._lock:
+            previous = self._lists.get(kind)
+            self._lists[kind] = entry
+            if previous is None or previous.names != entry.names:
+                self.version += 1
+        return entry
+
+    def _worker(self):
+        while True:
+            key = self._queue.get()
+            if key is None:
+                break
+            with self._lock:
+                self._pending.discard(key)
+            if isinstance(key, tuple):
+                room = key[1]
+                self.invalidate_queue(room)
+                self.get_queue(room, 0, self._page_size)
+                kind = 'queue'
+            else:
+                room = None
+                with self._lock:
+                    previous = self._lists.get(key)
+                entry = self._fetch_list(key)
+                if entry is None or (previous is not None and previous.names == entry.names):
+                    continue
+                kind = key
+            if self._listener is not None:
+                self._listener(kind, room)
+
+    def get_stats(self):
+        with self._lock:
+            return {'favorites': len(self._lists['favorites'].names) if 'favorites' in self._lists else None,
+                    'playlists': len(self._lists['playlists'].names) if 'playlists' in self._lists else None,
+                    'queues': {room: len(entry.tracks) for room, entry in self._queues.items()},
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'fetches': self.fetches,
+                    'invalidations': self.invalidations}
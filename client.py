@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import json
+import logging
+import random
+import threading
+import time
+
+import requests
+
+# commands without room in the request path
+global_cmds = {'zones', 'pauseall', 'resumeall', 'sayall', 'clipall', 'lockvolumes', 'unlockvolumes', 'favorites', 'playlists', 'reindex'}
+
+# commands taking long to complete in node-sonos-http-api (text-to-speech rendering, loading of favorites and playlists)
+slow_cmds = {'say', 'sayall', 'saypreset', 'clip', 'clipall', 'clippreset', 'favorite', 'playlist', 'join', 'leave', 'linein', 'reindex'}
+
+# commands which have the same effect if sent twice; only these are retried. Relative values (volume/+1) are excluded.
+idempotent_cmds = {'zones', 'state', 'volume', 'groupVolume', 'mute', 'unmute', 'groupMute', 'groupUnmute', 'play', 'pause',
+                   'bass', 'treble', 'timeseek', 'trackseek', 'repeat', 'shuffle', 'crossfade', 'sub', 'nightmode',
+                   'speechenhancement', 'favorites', 'playlists', 'queue', 'sleep', 'lockvolumes', 'unlockvolumes',
+                   'pauseall', 'join', 'leave'}
+
+# timeout in seconds for establishing a connection to the api
+connect_timeout = 2.0
+
+# delay in seconds before the first retry; doubled for every further retry
+retry_delay = 0.2
+
+# consecutive connection failures opening the circuit breaker and time in seconds until the next probe request
+breaker_threshold = 5
+breaker_reset = 30.0
+
+# states of the circuit breaker
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+# minimum interval in seconds between two health updates without state change
+health_interval = 10.0
+
+
+def get_command(request):
+    """:return: command of a request path like 'Esszimmer/volume/+1' or 'zones'"""
+    parts = request.split('/', 2)
+    if parts[0] in global_cmds or len(parts) < 2:
+        return parts[0]
+    return parts[1]
+
+
+def is_idempotent(request):
+    parts = request.split('/')
+    cmd = get_command(request)
+    if cmd not in idempotent_cmds:
+        return False
+    # relative volume changes are not idempotent
+    return not (cmd in ('volume', 'groupVolume') and parts[-1][:1] in ('+', '-'))
+
+
+class ApiClient(object):
+    """
+    Sends requests to node-sonos-http-api.
+
+    - connect and read timeouts depend on the command class: slow commands (say, favorite, ...) get timeout_slow
+    - idempotent commands are retried with exponential backoff after connection failures, timeouts and 5xx errors
+    - a circuit breaker opens after breaker_threshold consecutive connection failures or timeouts; while it is
+      open, requests fail immediately. After breaker_reset seconds, a single probe request is let through.
+    - the health (breaker state, average latency) is reported to a listener on every state change and at most
+      every health_interval seconds otherwise
+    """
+
+    def __init__(self, plugin_instance, session, base_url, timeout=5.0, timeout_slow=60.0, retries=2, metrics=None, health_listener=None, name=None):
+        """
+        :param plugin_instance: instance of the plugin
+        :param session:         requests.Session used for all requests
+        :param base_url:        base url of the api like http://192.168.2.12:5005
+        :param timeout:         read timeout in seconds
+        :param timeout_slow:    read timeout in seconds for slow commands
+        :param retries:         number of retries of idempotent commands
+        :param metrics:         Metrics instance
+        :param health_listener: callable(dict) called with the health of the api
+        :param name:            name of the api server like 192.168.2.12:5005
+        """
+
+        # init instance
+        self._plugin_instance = plugin_instance
+        self._session = session
+        self._base_url = base_url
+        self._timeout = timeout
+        self._timeout_slow = timeout_slow
+        self._retries = retries
+        self._metrics = metrics
+        self._health_listener = health_listener
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0                          # consecutive connection failures
+        self._opened = 0.0                          # time the breaker has been opened
+        self._probing = False                       # a probe request is running in state HALF_OPEN
+        self._latency = None                        # exponentially weighted average latency in seconds
+        self._last_health = 0.0
+
+    def get(self, request, timeout=None):
+        """
+        Send a request
+
+        :param request: request path relative to the base url
+        :param timeout: read timeout overriding the timeout of the command class
+        :return:        parsed json response or None on failure
+        """
+        cmd = get_command(request)
+        if not self._allow():
+            if self._metrics is not None:
+                self._metrics.inc('api.rejected')
+            if self._plugin_instance.logger.isEnabledFor(logging.DEBUG):
+                self._plugin_instance.logger.debug(f"get_request: request={request} rejected, node-sonos-http-api is unavailable")
+            return None
+
+        if timeout is None:
+            timeout = self._timeout_slow if cmd in slow_cmds else self._timeout
+        attempts = 1 + (self._retries if is_idempotent(request) else 0)
+        url = f"{self._base_url}/{request}"
+
+        for attempt in range(attempts):
+            if attempt:
+                if self._metrics is not None:
+                    self._metrics.inc('api.retries')
+                time.sleep(retry_delay * 2 ** (attempt - 1) * random.uniform(0.8, 1.2))
+                if not self._allow():
+                    return None
+            start = time.monotonic()
+            try:
+                r = self._session.get(url, verify=False, timeout=(connect_timeout, timeout))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._plugin_instance.logger.error(f"get_request: request={request} failed with Error {e}")
+                self._record_failure()
+                continue
+            except requests.RequestException as e:
+                self._plugin_instance.logger.error(f"get_request: request={request} failed with Error {e}")
+                self._record_success(time.monotonic() - start)
+                return None
+
+            # the api answered; it is available, even if the command failed
+            self._record_success(time.monotonic() - start)
+            if r.status_code == requests.codes.ok:
+                try:
+                    return json.loads(r.text)
+                except ValueError:
+                    self._plugin_instance.logger.error(f"get_request: request={request} returned no valid json")
+                    return None
+            self._plugin_instance.logger.error(f"get_request: request={request} failed with status {r.status_code}")
+            if r.status_code < 500:
+                return None
+        return None
+
+    def _allow(self):
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened >= breaker_reset:
+                self._state = HALF_OPEN
+                self._probing = False
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                allow = True
+            else:
+                allow = False
+        if allow:
+            self._publish_health(True)
+        return allow
+
+    def _record_success(self, latency):
+        with self._lock:
+            changed = self._state != CLOSED
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        if self._metrics is not None:
+            self._metrics.observe_time('api.latency', latency)
+        if changed:
+            self._plugin_instance.logger.info(f"node-sonos-http-api {self.name} is available again")
+        self._publish_health(changed)
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            changed = False
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= breaker_threshold):
+                changed = self._state != OPEN
+                self._state = OPEN
+                self._opened = time.monotonic()
+        if self._metrics is not None:
+            self._metrics.inc('api.failures')
+        if changed:
+            self._plugin_instance.logger.warning(f"node-sonos-http-api {self.name} is unavailable; requests are rejected for {breaker_reset:.0f} s")
+        self._publish_health(changed)
+
+    def _publish_health(self, changed):
+        if self._health_listener is None:
+            return
+        now = time.monotonic()
+        if not changed and now - self._last_health < health_interval:
+            return
+        self._last_health = now
+        self._health_listener(self.get_health())
+
+    def get_health(self):
+        """:return: dict with name, online state, breaker state, consecutive failures and average latency in ms"""
+        with self._lock:
+            return {'name': self.name,
+                    'online': self._state == CLOSED,
+                    'state': self._state,
+                    'failures': self._failures,
+                    'latency': round(self._latency * 1000, 1) if self._latency is not None else None}
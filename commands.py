@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import collections
+import logging
+import threading
+import time
+
+# idempotent setters; if a newer value is submitted while an older one is still pending, only the newest one is sent
+coalescing_cmds = {'volume', 'groupVolume', 'bass', 'treble', 'timeseek'}
+
+
+class Command(object):
+    """A single request to the sonos api waiting in a room queue"""
+
+    __slots__ = ('room', 'cmd', 'request', 'submitted', 'not_before')
+
+    def __init__(self, room, cmd, request, not_before=0.0):
+        self.room = room
+        self.cmd = cmd
+        self.request = request
+        self.submitted = time.monotonic()
+        self.not_before = not_before
+
+
+class CommandDispatcher(object):
+    """
+    Sends commands to the sonos api in the background.
+
+    Every room has its own ordered queue and worker thread, so commands for one room keep their order,
+    while commands for different rooms are sent in parallel. The caller returns immediately. A coalescing command
+    replaced by a newer value takes the position of the newer value in the queue.
+    """
+
+    def __init__(self, plugin_instance, send, coalesce_window=0.0, metrics=None):
+        """
+        :param plugin_instance: instance of the plugin
+        :param send:            callable sending a request to the sonos api, returning the response or None on failure
+        :param coalesce_window: time in seconds a coalescing command is held back to wait for newer values
+        :param metrics:         Metrics instance to record latency and failures per room
+        """
+
+        # init instance
+        self._plugin_instance = plugin_instance
+        self._send = send
+        self._coalesce_window = coalesce_window
+        self._metrics = metrics
+
+        self._lock = threading.Lock()
+        self._alive = False
+        self._queues = {}                           # {room: deque of Command}
+        self._conditions = {}                       # {room: threading.Condition}
+        self._workers = {}                          # {room: threading.Thread}
+        self._pending = {}                          # pending coalescing commands {room: {cmd: Command}}
+        self._stats = {}                            # {cmd: {'count': 0, 'failed': 0, 'latency_total': 0.0, ...}}
+
+    def start(self):
+        self._alive = True
+
+    def stop(self):
+        """Stop all room workers; commands still queued are discarded"""
+        self._alive = False
+        with self._lock:
+            conditions = list(self._conditions.values())
+            workers = list(self._workers.values())
+        for condition in conditions:
+            with condition:
+                condition.notify_all()
+        for worker in workers:
+            worker.join(5.0)
+            if worker.is_alive():
+                self._plugin_instance.logger.error(f"Unable to shut down command worker {worker.name}")
+        with self._lock:
+            self._queues.clear()
+            self._conditions.clear()
+            self._workers.clear()
+            self._pending.clear()
+
+    def submit(self, room, cmd, request):
+        """
+        Queue a request for a room and return immediately
+
+        :param room:    room the command is sent for
+        :param cmd:     sonos_cmd of the command (used for statistics)
+        :param request: request path relative to the api base url or a callable returning it; a callable is called
+                        by the room worker right before sending, so it may block, e.g. to look up a name
+        """
+        if not self._alive:
+            self._plugin_instance.logger.warning(f"Command dispatcher not running; request={request} discarded")
+            return
+
+        condition = self._get_room_condition(room)
+        with condition:
+            if cmd in coalescing_cmds:
+                pending = self._pending[room].get(cmd)
+                if pending is not None:
+                    # latest wins: replace the value of the pending command and move it behind the commands
+                    # submitted in the meantime, so they are not overtaken by an older value; the hold back time
+                    # of its first submission is kept, so a continuously changing value is still sent
+                    pending.request = request
+                    self._count_coalesced(cmd)
+                    queue = self._queues[room]
+                    if queue[-1] is not pending:
+                        queue.remove(pending)
+                        queue.append(pending)
+                        condition.notify()
+                    return
+                command = Command(room, cmd, request, time.monotonic() + self._coalesce_window)
+                self._pending[room][cmd] = command
+            else:
+                command = Command(room, cmd, request)
+            self._queues[room].append(command)
+            condition.notify()
+
+    def _get_room_condition(self, room):
+        with self._lock:
+            if room not in self._conditions:
+                self._queues[room] = collections.deque()
+                self._pending[room] = {}
+                self._conditions[room] = threading.Condition()
+                worker = threading.Thread(target=self._worker, args=(room,), daemon=True,
+                                          name=f"plugins.{self._plugin_instance.get_fullname()}.Command.{room}")
+                self._workers[room] = worker
+                worker.start()
+            return self._conditions[room]
+
+    def _worker(self, room):
+        queue = self._queues[room]
+        pending = self._pending[room]
+        condition = self._conditions[room]
+
+        while self._alive:
+            with condition:
+                while self._alive:
+                    if not queue:
+                        condition.wait(10)
+                        continue
+                    delay = queue[0].not_before - time.monotonic()
+                    if delay <= 0:
+                        break
+                    # hold back a coalescing command to give newer values the chance to replace it
+                    condition.wait(delay)
+                if not self._alive:
+                    break
+                command = queue.popleft()
+                if pending.get(command.cmd) is command:
+                    del pending[command.cmd]
+
+            start = time.monotonic()
+            try:
+                if callable(command.request):
+                    command.request = command.request()
+                response = self._send(command.request)
+            except Exception as e:
+                self._plugin_instance.logger.error(f"Command worker for room {room}: request={command.request} failed with Error {e}")
+                response = None
+            self._update_stats(command, start, time.monotonic(), response is not None)
+            if self._plugin_instance.logger.isEnabledFor(logging.DEBUG):
+                self._plugin_instance.logger.debug(f"command worker {room}: request={command.request}, response={response}")
+
+    def _get_cmd_stats(self, cmd):
+        return self._stats.setdefault(cmd, {'count': 0, 'failed': 0, 'coalesced': 0, 'latency_total': 0.0, 'latency_max': 0.0, 'latency_last': 0.0, 'wait_total': 0.0})
+
+    def _count_coalesced(self, cmd):
+        with self._lock:
+            self._get_cmd_stats(cmd)['coalesced'] += 1
+
+    def _update_stats(self, command, start, end, success):
+        latency = end - start
+        if self._metrics is not None:
+            self._metrics.observe_time(f'command.{command.room}', latency)
+            if not success:
+                self._metrics.inc(f'command.failed.{command.room}')
+        with self._lock:
+            stats = self._get_cmd_stats(command.cmd)
+            stats['count'] += 1
+            if not success:
+                stats['failed'] += 1
+            stats['latency_total'] += latency
+            stats['latency_max'] = max(stats['latency_max'], latency)
+            stats['latency_last'] = latency
+            stats['wait_total'] += start - command.submitted
+
+    def get_queue_depth(self):
+        """:return: dict with the number of pending commands per room"""
+        with self._lock:
+            return {room: len(queue) for room, queue in self._queues.items()}
+
+    def get_stats(self):
+        """:return: dict with count, failures, coalesced commands and latencies (in ms) per command"""
+        with self._lock:
+            result = {}
+            for cmd, stats in self._stats.items():
+                count = stats['count'] or 1
+                result[cmd] = {'count': stats['count'],
+                               'failed': stats['failed'],
+                               'coalesced': stats['coalesced'],
+                               'latency_avg': round(stats['latency_total'] / count * 1000, 1),
+                               'latency_max': round(stats['latency_max'] * 1000, 1),
+                               'latency_last': round(stats['latency_last'] * 1000, 1),
+                               'wait_avg': round(stats['wait_total'] / count * 1000, 1)}
+            return result
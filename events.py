@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import collections
+import itertools
+import json
+import queue
+import threading
+import time
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+
+# webhook event types of node-sonos-http-api; metrics of other types are counted as 'other', as the type is
+# taken from the unauthenticated payload
+event_types = frozenset(('transport-state', 'topology-change', 'volume-change', 'mute-change'))
+
+
+def get_metric_type(event):
+    """:return: event type used in metric names: the type of the event, if known, otherwise 'other'"""
+    event_type = event.get('type')
+    return event_type if event_type in event_types else 'other'
+
+
+class PayloadDecoder(object):
+    """
+    Decodes webhook payloads and validates the fields the event loop relies on.
+
+    The payloads are parsed entirely (orjson is used, if installed); the room data are not reduced here, the
+    records of the room states take over the fields required by the configured items only (see roomstate.Schema),
+    so the large unused fields are released together with the payload.
+    """
+
+    def decode(self, raw):
+        """
+        :param raw:     raw webhook payload
+        :return:        decoded payload
+        :raises ValueError: if the payload is not valid json or does not have the expected structure
+        """
+        event = json_loads(raw)
+        if not isinstance(event, dict):
+            raise ValueError("payload is not a json object")
+        return self.validate_event(event)
+
+    def validate_event(self, event):
+        """
+        Check the fields of the payload which the event loop relies on
+
+        :param event:   parsed payload {'type': ..., 'data': ...}
+        :return:        payload unchanged
+        :raises ValueError: if the room data does not have the expected structure
+        """
+        event_type = event.get('type')
+        data = event.get('data')
+        if event_type == 'transport-state':
+            _check_room(data, event_type, 'room data')
+        elif event_type == 'topology-change':
+            if data.__class__ is not list:
+                raise ValueError(f"unexpected structure of {event_type} payload: zones are not a list")
+            for zone in data:
+                if zone.__class__ is not dict:
+                    raise ValueError(f"unexpected structure of {event_type} payload: zone is not an object")
+                _check_room(zone.get('coordinator'), event_type, 'coordinator')
+                members = zone.get('members', ())
+                if members.__class__ is not list:
+                    raise ValueError(f"unexpected structure of {event_type} payload: members are not a list")
+                for member in members:
+                    _check_room(member, event_type, 'member')
+        elif event_type == 'volume-change':
+            _check_room(data, event_type, 'room data', uuid=False)
+            if data.get('newVolume').__class__ not in (int, float):
+                raise ValueError(f"unexpected structure of {event_type} payload: newVolume is not a number")
+        elif event_type == 'mute-change':
+            _check_room(data, event_type, 'room data', uuid=False)
+            if data.get('newMute').__class__ is not bool:
+                raise ValueError(f"unexpected structure of {event_type} payload: newMute is not a boolean")
+        return event
+
+
+def _check_room(data, event_type, what, uuid=True):
+    """:raises ValueError: if data is not an object with the room name (and uuid) of a room"""
+    if data.__class__ is not dict:
+        raise ValueError(f"unexpected structure of {event_type} payload: {what} is not an object")
+    if data.get('roomName').__class__ is not str or (uuid and data.get('uuid').__class__ is not str):
+        raise ValueError(f"unexpected structure of {event_type} payload: {what} without roomName or uuid")
+
+
+class EventBuffer(object):
+    """
+    Bounded buffer for decoded webhook events.
+
+    Only the newest pending transport-state per room uuid and the newest pending topology-change per api server and
+    source (webhook, zones read at startup, reconciliation) are kept; a newer event replaces the pending one and moves to the end of the buffer, so it is processed after all
+    events received before it. All other events (volume-change, mute-change, ...) are kept in strict order.
+
+    If the buffer is full, put blocks up to put_timeout seconds (backpressure towards the webhook sender) and
+    then drops the oldest pending event.
+    """
+
+    def __init__(self, maxsize=500, put_timeout=1.0):
+        self._maxsize = maxsize
+        self._put_timeout = put_timeout
+        self._events = collections.OrderedDict()    # {key: (event, enqueue time)}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+        self.received = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def _get_key(self, event):
+        event_type = event.get('type')
+        if event_type == 'transport-state':
+            data = event.get('data')
+            if isinstance(data, dict):
+                return event_type, data.get('uuid')
+        elif event_type == 'topology-change':
+            # zones read by the plugin are tracked until processed and must not be replaced by a webhook
+            return event_type, event.get('backend'), event.get('source')
+        return event_type, None, next(self._seq)
+
+    def put(self, event):
+        """
+        Add a decoded event to the buffer
+
+        :param event:   decoded webhook payload {'type': ..., 'data': ...}
+        """
+        key = self._get_key(event)
+        with self._lock:
+            self.received += 1
+            if key in self._events:
+                del self._events[key]
+                self.coalesced += 1
+            else:
+                if len(self._events) >= self._maxsize:
+                    self._not_full.wait_for(lambda: len(self._events) < self._maxsize, self._put_timeout)
+                while len(self._events) >= self._maxsize:
+                    self._events.popitem(last=False)
+                    self.dropped += 1
+            self._events[key] = (event, time.monotonic())
+            self.max_depth = max(self.max_depth, len(self._events))
+            self._not_empty.notify()
+
+    def get(self, block=True, timeout=None):
+        """
+        Remove and return the oldest pending event
+
+        :return:    tuple of (event, enqueue time)
+        :raises queue.Empty: if no event is available within timeout
+        """
+        with self._lock:
+            if not self._events:
+                if not block or not self._not_empty.wait_for(lambda: self._events, timeout):
+                    raise queue.Empty
+            _, entry = self._events.popitem(last=False)
+            self._not_full.notify()
+            return entry
+
+    def qsize(self):
+        return len(self._events)
+
+    def empty(self):
+        return not self._events
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_stats(self):
+        """:return: dict with received, coalesced and dropped events and the buffer depth"""
+        with self._lock:
+            return {'received': self.received,
+                    'coalesced': self.coalesced,
+                    'dropped': self.dropped,
+                    'depth': len(self._events),
+                    'max_depth': self.max_depth,
+                    'maxsize': self._maxsize}
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import bisect
+import cProfile
+import io
+import pstats
+import threading
+
+# upper bounds of the histogram buckets for durations in ms
+latency_buckets = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# upper bounds of the histogram buckets for counts
+count_buckets = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram(object):
+    """Histogram with fixed buckets; cheap to update and small, independent of the number of observations"""
+
+    __slots__ = ('bounds', 'buckets', 'count', 'total', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        """:return: upper bound of the bucket containing the given fraction of observations"""
+        if not self.count:
+            return 0
+        rank = fraction * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count,
+                'avg': round(self.total / self.count, 3) if self.count else 0,
+                'max': round(self.max, 3),
+                'p50': self.percentile(0.5),
+                'p90': self.percentile(0.9),
+                'p99': self.percentile(0.99)}
+
+
+class Metrics(object):
+    """
+    Counters and histograms of the plugin's hot paths.
+
+    Names are plain strings like 'webhook.transport-state' or 'command.Esszimmer'. Durations are recorded in
+    seconds and reported in ms.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._profiler = None
+        self._profile_lock = threading.Lock()
+
+    def inc(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe_time(self, name, seconds):
+        self._observe(name, seconds * 1000, latency_buckets)
+
+    def observe_count(self, name, count):
+        self._observe(name, count, count_buckets)
+
+    def _observe(self, name, value, bounds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(bounds)
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_dict(self):
+        """:return: dict with all counters and histograms"""
+        with self._lock:
+            return {'counters': dict(sorted(self._counters.items())),
+                    'histograms': {name: histogram.to_dict() for name, histogram in sorted(self._histograms.items())},
+                    'profiling': self._profiler is not None}
+
+    # profiling of the event loop thread
+
+    @property
+    def profiler(self):
+        """cProfile.Profile instance, if profiling is enabled, otherwise None"""
+        return self._profiler
+
+    def set_profiling(self, enabled):
+        if enabled and self._profiler is None:
+            self._profiler = cProfile.Profile()
+        elif not enabled:
+            self._profiler = None
+
+    def run_profiled(self, func, *args):
+        """Call func with profiling, if profiling is enabled"""
+        profiler = self._profiler
+        if profiler is None:
+            return func(*args)
+        with self._profile_lock:
+            profiler.enable()
+            try:
+                return func(*args)
+            finally:
+                profiler.disable()
+
+    def get_profile_stats(self, limit=25):
+        """:return: text of the top functions by cumulative time, or an empty string if profiling is disabled"""
+        profiler = self._profiler
+        if profiler is None:
+            return ''
+        stream = io.StringIO()
+        with self._profile_lock:
+            try:
+                pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+            except TypeError:
+                # no data collected yet
+                return ''
+        return stream.getvalue()
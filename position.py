@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import threading
+import time
+
+# playback state in which the position advances
+PLAYING = 'PLAYING'
+
+
+def format_position(seconds):
+    """:return: position formatted like elapsedTimeFormatted of node-sonos-http-api, e.g. '00:03:25'"""
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def parse_position(value):
+    """:return: seconds of a timeseek value like 205 or '00:03:25' or None, if invalid"""
+    try:
+        seconds = 0
+        for part in str(value).split(':'):
+            seconds = seconds * 60 + int(part)
+    except ValueError:
+        return None
+    return seconds
+
+
+class PositionEngine(object):
+    """
+    Interpolates the playback position of the rooms locally.
+
+    node-sonos-http-api reports elapsedTime only with transport-state events. Every event re-anchors the position
+    of a room to elapsedTime and duration of the current track; while the room is PLAYING, the position advances
+    with the local clock. tick() is called by a single shared timer for all rooms and publishes the positions
+    which changed by at least a second. Positions are published one at a time, so the timer, the event loop and
+    seeks never write the position items concurrently or out of order.
+    """
+
+    def __init__(self, publish):
+        """
+        :param publish: callable(room, position, duration) writing the position in seconds to the items of the room
+        """
+        self._publish = publish
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()      # held while comparing and publishing a position
+        self._anchors = {}                          # {room: (elapsed, duration, playing, monotonic time of the anchor)}
+        self._published = {}                        # {room: last published position}
+
+    def anchor(self, room, elapsed, duration, playback_state):
+        """
+        Set the position of a room from the state of a transport-state event or a seek
+
+        :param room:            room name
+        :param elapsed:         elapsed time of the current track in seconds
+        :param duration:        duration of the current track in seconds; 0 for streams
+        :param playback_state:  PLAYING, PAUSED_PLAYBACK, STOPPED or TRANSITIONING
+        """
+        if elapsed is None:
+            return
+        duration = duration or 0
+        with self._lock:
+            self._anchors[room] = (elapsed, duration, playback_state == PLAYING, time.monotonic())
+        self._update(room, elapsed, duration)
+
+    def seek(self, room, elapsed):
+        """Re-anchor the position of a room after a seek sent by the plugin, before the event confirms it"""
+        with self._lock:
+            anchor = self._anchors.get(room)
+            if anchor is None:
+                return
+            self._anchors[room] = (elapsed, anchor[1], anchor[2], time.monotonic())
+        self._update(room, elapsed, anchor[1])
+
+    def remove(self, room):
+        with self._lock:
+            self._anchors.pop(room, None)
+            self._published.pop(room, None)
+
+    def get_position(self, room):
+        """:return: interpolated position of a room in seconds or None, if unknown"""
+        with self._lock:
+            anchor = self._anchors.get(room)
+        if anchor is None:
+            return None
+        return self._interpolate(anchor, time.monotonic())
+
+    @staticmethod
+    def _interpolate(anchor, now):
+        elapsed, duration, playing, anchored = anchor
+        position = elapsed + (now - anchored) if playing else elapsed
+        if duration:
+            position = min(position, duration)
+        return int(position)
+
+    def tick(self):
+        """Publish the positions of all playing rooms; called by the shared timer"""
+        now = time.monotonic()
+        with self._lock:
+            playing = [(room, anchor) for room, anchor in self._anchors.items() if anchor[2]]
+        for room, anchor in playing:
+            self._update(room, self._interpolate(anchor, now), anchor[1])
+
+    def _update(self, room, position, duration):
+        position = int(position)
+        with self._publish_lock:
+            with self._lock:
+                if self._published.get(room) == position:
+                    return
+                self._published[room] = position
+            self._publish(room, position, duration)
+
+    def get_stats(self):
+        with self._lock:
+            return {'rooms': len(self._anchors), 'playing': sum(1 for anchor in self._anchors.values() if anchor[2])}
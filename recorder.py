@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import collections
+import gzip
+import os
+import struct
+import threading
+import time
+
+# every recording file starts with the magic and the wall clock and monotonic time of its creation, so the
+# monotonic timestamps of the records can be mapped to wall clock time
+FILE_MAGIC = b'SONOSWH1'
+file_header = struct.Struct('>8sdd')
+
+# every record is the monotonic receive time in seconds and the length of the raw webhook body, followed by the body
+record_header = struct.Struct('>dI')
+
+# interval in seconds the buffered records are written
+write_interval = 0.2
+
+# maximum time in seconds a written record stays in the buffers of the compressed stream
+flush_interval = 1.0
+
+
+class WebhookRecorder(object):
+    """
+    Records the raw bodies of received webhooks to a rotating set of gzip compressed files.
+
+    record() only appends to a bounded buffer and never blocks the receive path; a background thread writes the
+    buffered records in batches every write_interval seconds. If the writer falls behind and the buffer is full,
+    records are dropped and counted. If the current file exceeds max_bytes (uncompressed), it is rotated to
+    <filename>.1, <filename>.2, ... keeping backup_count old files.
+    """
+
+    def __init__(self, plugin_instance, filename, max_bytes=10485760, backup_count=5, buffer_size=1000):
+        """
+        :param plugin_instance: instance of the plugin
+        :param filename:        name of the current recording file
+        :param max_bytes:       uncompressed size of the recorded data after which the file is rotated
+        :param backup_count:    number of rotated files kept
+        :param buffer_size:     maximum number of records waiting to be written
+        """
+
+        # init instance
+        self._plugin_instance = plugin_instance
+        self._filename = filename
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._buffer_size = buffer_size
+        self._buffer = collections.deque()         # records waiting to be written [(timestamp, body), ...]
+        self._stopped = threading.Event()
+        self._thread = None
+        self._file = None
+        self._file_bytes = 0
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written_bytes = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._writer, daemon=True,
+                                        name=f"plugins.{self._plugin_instance.get_fullname()}.WebhookRecorder")
+        self._thread.start()
+
+    def stop(self):
+        """Write all pending records and close the file"""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join(10.0)
+        if self._thread.is_alive():
+            self._plugin_instance.logger.error("Unable to shut down webhook recorder thread")
+        self._thread = None
+
+    def record(self, body, timestamp=None):
+        """
+        Buffer a raw webhook body for recording; returns immediately
+
+        :param body:        raw webhook body (bytes)
+        :param timestamp:   monotonic receive time; defaults to now
+        """
+        # deque.append is thread safe; no lock and no wakeup of the writer on the receive path
+        if len(self._buffer) >= self._buffer_size:
+            self.dropped += 1
+            return
+        self._buffer.append((time.monotonic() if timestamp is None else timestamp, body))
+
+    def _writer(self):
+        last_flush = time.monotonic()
+        dirty = False
+        while True:
+            stopped = self._stopped.wait(write_interval)
+            try:
+                while self._buffer:
+                    self._write(*self._buffer.popleft())
+                    dirty = True
+                # flushing the compressed stream is expensive; flush at most every flush_interval
+                if dirty and (stopped or time.monotonic() - last_flush >= flush_interval):
+                    self._file.flush()
+                    dirty = False
+                    last_flush = time.monotonic()
+            except OSError as e:
+                self._plugin_instance.logger.error(f"Webhook recorder: writing to {self._filename} failed with Error {e}")
+                self._close()
+                dirty = False
+            if stopped:
+                break
+        self._close()
+
+    def _write(self, timestamp, body):
+        if self._file is None:
+            self._open()
+        elif self._file_bytes >= self._max_bytes:
+            self._close()
+            self._rotate()
+            self._open()
+        record = record_header.pack(timestamp, len(body)) + body
+        self._file.write(record)
+        self._file_bytes += len(record)
+        self.written_bytes += len(record)
+        self.recorded += 1
+
+    def _open(self):
+        directory = os.path.dirname(self._filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self._filename):
+            # never append to the recording of a previous run; its timestamps belong to another clock epoch
+            self._rotate()
+        self._file = gzip.open(self._filename, 'wb', compresslevel=6)
+        self._file.write(file_header.pack(FILE_MAGIC, time.time(), time.monotonic()))
+        self._file_bytes = file_header.size
+
+    def _close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError as e:
+                self._plugin_instance.logger.error(f"Webhook recorder: closing {self._filename} failed with Error {e}")
+            self._file = None
+
+    def _rotate(self):
+        for index in range(self._backup_count - 1, 0, -1):
+            source = f"{self._filename}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self._filename}.{index + 1}")
+        if self._backup_count > 0:
+            os.replace(self._filename, f"{self._filename}.1")
+        else:
+            os.remove(self._filename)
+
+    def get_stats(self):
+        """:return: dict with recorded and dropped records, pending records and written bytes"""
+        return {'filename': self._filename,
+                'recorded': self.recorded,
+                'dropped': self.dropped,
+                'pending': len(self._buffer),
+                'written_bytes': self.written_bytes}
+
+
+def get_recording_files(filename):
+    """:return: names of the existing recording files, oldest first"""
+    files = []
+    index = 1
+    while os.path.exists(f"{filename}.{index}"):
+        files.insert(0, f"{filename}.{index}")
+        index += 1
+    if os.path.exists(filename):
+        files.append(filename)
+    return files
+
+
+def read_records(filename):
+    """
+    Read a recording file
+
+    :param filename:    name of a single recording file
+    :return:            generator of (monotonic receive time, raw body); a truncated last record is skipped
+    :raises ValueError: if the file is not a webhook recording
+    """
+    with gzip.open(filename, 'rb') as f:
+        header = f.read(file_header.size)
+        if len(header) < file_header.size or file_header.unpack(header)[0] != FILE_MAGIC:
+            raise ValueError(f"{filename} is not a webhook recording")
+        while True:
+            try:
+                header = f.read(record_header.size)
+                if len(header) < record_header.size:
+                    return
+                timestamp, length = record_header.unpack(header)
+                body = f.read(length)
+            except EOFError:
+                # recording was not closed properly
+                return
+            if len(body) < length:
+                return
+            yield timestamp, body
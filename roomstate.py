@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import sys
+
+# fields of the room data which are always kept, independent of the configured items (shown in the web interface)
+room_fields = (('uuid',), ('coordinator',), ('state', 'playbackState'), ('state', 'volume'), ('state', 'mute'),
+               ('state', 'currentTrack', 'title'), ('state', 'currentTrack', 'artist'), ('state', 'currentTrack', 'stationName'))
+
+# names of the room data fields in the payload differing from the names used in the room state
+payload_field_names = {'groupstate': 'groupState'}
+
+
+def intern(value):
+    """:return: interned string or value unchanged, if it is not a string"""
+    return sys.intern(value) if value.__class__ is str else value
+
+
+class Record(object):
+    """
+    Base of the room state records, a fixed set of fields stored in __slots__.
+
+    Records are updated in place from the payload dicts, so an event only replaces the values which actually
+    changed instead of allocating a new dict tree. Only the fields required by the Schema of the plugin are taken
+    over. Every update records the accessor paths of the changed fields with their previous values, which is all
+    that is needed to write the changed items only.
+
+    Subclasses define
+    - _fields:      payload fields of the record
+    - _records:     {field: Record subclass} of nested records
+    - _interned:    fields whose string values repeat across rooms and events and are interned
+    """
+
+    __slots__ = ('_layout', '_size')
+    _fields = ()
+    _records = {}
+    _interned = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # precompiled lookups: {payload key: (field, record class, interned)} and (field, payload key, record class)
+        keys = {field: payload_field_names.get(field, field) for field in cls._fields}
+        cls._specs = {keys[field]: (field, cls._records.get(field), field in cls._interned) for field in cls._fields}
+        cls._keys = tuple((field, keys[field], cls._records.get(field)) for field in cls._fields)
+        cls._names = frozenset(cls.__slots__)
+
+    def __init__(self, layout):
+        self._layout = layout
+        self._size = 0                              # number of fields of _fields which are set
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+    def get(self, key, default=None):
+        """dict like read access, used by the accessor paths"""
+        if key in self._names:
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+
+    def __setitem__(self, key, value):
+        if key not in self._names or key in self._records:
+            raise KeyError(key)
+        self.set(key, intern(value), {})
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def update(self, data, changed):
+        """
+        Update the record in place; fields missing in data are cleared
+
+        :param data:        payload dict like {'volume': 10, 'equalizer': {...}, ...}
+        :param changed:     dict {accessor path: previous value}, extended by the changed fields
+        """
+        layout = self._layout
+        paths = layout.paths
+        specs = layout.specs
+        seen = 0
+        for key, value in data.items():
+            spec = specs.get(key)
+            if spec is None or value is None:
+                continue
+            field, record_cls, interned = spec
+            current = getattr(self, field)
+            if record_cls is not None:
+                if value.__class__ is not dict:
+                    continue
+                if current is None:
+                    current = record_cls(layout.schema.get_layout(record_cls, paths[field]))
+                    setattr(self, field, current)
+                    self._size += 1
+                current.update(value, changed)
+            else:
+                if interned and value.__class__ is str:
+                    value = sys.intern(value)
+                if current != value:
+                    changed.setdefault(paths[field], current)
+                    setattr(self, field, value)
+                    if current is None:
+                        self._size += 1
+            seen += 1
+
+        if self._size > seen:
+            for field, key, record_cls in self._keys:
+                if getattr(self, field) is None:
+                    continue
+                value = data.get(key)
+                if value is None or (record_cls is not None and value.__class__ is not dict):
+                    self.set(field, None, changed)
+
+    def set(self, field, value, changed):
+        """
+        Set a field; a nested record is cleared by value None
+
+        :param changed:     dict {accessor path: previous value}, extended by the changed fields
+        """
+        current = getattr(self, field)
+        if current is None:
+            if value is not None:
+                self._size += 1
+        elif value is None:
+            self._size -= 1
+            if isinstance(current, Record):
+                current.update(_empty, changed)
+                setattr(self, field, None)
+                return
+        if current != value:
+            changed.setdefault(self._layout.paths[field], current)
+            setattr(self, field, value)
+
+    def copy_fields(self, source, fields, changed, keep_missing=True):
+        """
+        Set fields of the record to the values of another record of the same type, e.g. for the group overlay;
+        nested records are copied entirely
+
+        :param source:          record to copy from
+        :param fields:          names of the copied fields
+        :param changed:         dict {accessor path: previous value}, extended by the changed fields
+        :param keep_missing:    fields which are not set in source are left unchanged instead of being cleared
+        """
+        records = self._records
+        for field in fields:
+            value = getattr(source, field)
+            if value is None:
+                if not keep_missing:
+                    self.set(field, None, changed)
+            elif field in records:
+                self.ensure(field).copy_fields(value, value._fields, changed, False)
+            else:
+                self.set(field, value, changed)
+
+    def copy_paths(self, source, paths, changed):
+        """
+        Set the fields at paths relative to the record to the values of another record of the same type, e.g. the
+        changed fields of the group coordinator; like copy_fields, fields and nested records which are not set in
+        source are left unchanged, but fields of a nested record set in source are copied, even if not set
+
+        :param source:      record to copy from
+        :param paths:       paths of leaf fields like ('currentTrack', 'title')
+        :param changed:     dict {accessor path: previous value}, extended by the changed fields
+        """
+        for path in paths:
+            target = self
+            origin = source
+            for key in path[:-1]:
+                origin = getattr(origin, key)
+                if origin is None:
+                    break
+                target = target.ensure(key)
+            else:
+                value = getattr(origin, path[-1])
+                if value is not None or len(path) > 1:
+                    target.set(path[-1], value, changed)
+
+    def ensure(self, field):
+        """:return: nested record of a field, created if missing"""
+        record = getattr(self, field)
+        if record is None:
+            record_cls = self._records[field]
+            record = record_cls(self._layout.schema.get_layout(record_cls, self._layout.paths[field]))
+            setattr(self, field, record)
+            self._size += 1
+        return record
+
+    def to_dict(self):
+        """:return: dict of the fields which are set, nested records as dicts"""
+        result = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is not None:
+                result[name] = value.to_dict() if isinstance(value, Record) else value
+        return result
+
+    @classmethod
+    def has_path(cls, path):
+        """:return: True, if an accessor path like ('state', 'equalizer', 'bass') ends in a field of the record"""
+        record_cls = cls
+        for depth, key in enumerate(path):
+            if record_cls is None:
+                # plain dict field like group
+                return True
+            if key not in record_cls._names:
+                return False
+            record_cls = record_cls._records.get(key)
+            if record_cls is not None and depth == len(path) - 1:
+                return False
+        return True
+
+
+class Layout(object):
+    """Lookups shared by all records of a class at the same path of the room state"""
+
+    __slots__ = ('schema', 'path', 'paths', 'specs')
+
+    def __init__(self, schema, cls, path):
+        self.schema = schema
+        self.path = path
+        self.paths = {name: path + (name,) for name in cls._names}     # {field: accessor path of the field}
+        self.specs = {}                                                 # required subset of cls._specs
+
+
+class Schema(object):
+    """
+    Fields kept in the room states of a plugin instance.
+
+    The payloads repeat the full state of a room including large fields like the DIDL-Lite metadata in
+    avTransportUriMetadata and the album art uris. Only the fields reachable by the accessor paths of the
+    configured items and room_fields are taken over by the records; all other fields are skipped while updating,
+    so they are released together with the payload.
+    """
+
+    def __init__(self):
+        self._required = {}                         # trie of required room data fields {'state': {'volume': True}, ...}
+        self._layouts = {}                          # {(record class, path): Layout}
+        for path in room_fields:
+            self.add_required_path(path)
+
+    def add_required_path(self, path):
+        """
+        Register a path into the room state needed by an item
+
+        :param path:    accessor path like ('state', 'equalizer', 'bass')
+        """
+        node = self._required
+        for key in path[:-1]:
+            child = node.get(key)
+            if child is True:
+                return
+            if child is None:
+                child = node[key] = {}
+            node = child
+        node[path[-1]] = True
+        for (cls, layout_path), layout in self._layouts.items():
+            layout.specs = self._get_specs(cls, layout_path)
+
+    def get_layout(self, cls, path=()):
+        """:return: Layout of the records of a class at a path"""
+        layout = self._layouts.get((cls, path))
+        if layout is None:
+            layout = self._layouts[(cls, path)] = Layout(self, cls, path)
+            layout.specs = self._get_specs(cls, path)
+        return layout
+
+    def _get_specs(self, cls, path):
+        node = self._required
+        for key in path:
+            node = node.get(key) if node is not True else True
+            if node is None:
+                return {}
+        return {key: spec for key, spec in cls._specs.items() if node is True or spec[0] in node}
+
+    def new_room(self):
+        """:return: empty RoomState"""
+        return RoomState(self.get_layout(RoomState))
+
+
+_empty = {}
+
+
+class TrackInfo(Record):
+    __slots__ = ('artist', 'title', 'album', 'albumArtUri', 'absoluteAlbumArtUri', 'duration', 'uri', 'trackUri', 'type', 'stationName')
+    _fields = __slots__
+    _interned = ('type',)
+
+
+class Equalizer(Record):
+    __slots__ = ('bass', 'treble', 'loudness', 'speechEnhancement', 'nightMode')
+    _fields = __slots__
+
+
+class PlayMode(Record):
+    __slots__ = ('repeat', 'shuffle', 'crossfade')
+    _fields = __slots__
+    _interned = ('repeat',)
+
+
+class SubState(Record):
+    __slots__ = ('gain', 'crossover', 'polarity', 'enabled')
+    _fields = __slots__
+
+
+class GroupState(Record):
+    __slots__ = ('volume', 'mute')
+    _fields = __slots__
+
+
+class PlayerState(Record):
+    __slots__ = ('volume', 'mute', 'equalizer', 'currentTrack', 'nextTrack', 'trackNo', 'elapsedTime', 'elapsedTimeFormatted',
+                 'playbackState', 'playMode', 'sub')
+    _fields = __slots__
+    _records = {'equalizer': Equalizer, 'currentTrack': TrackInfo, 'nextTrack': TrackInfo, 'playMode': PlayMode, 'sub': SubState}
+    _interned = ('playbackState',)
+
+
+class RoomState(Record):
+    """
+    State of a room as kept in SonosHttp.sonos
+
+    uuid, coordinator, state and groupstate are updated from the room data of the transport-state and
+    topology-change payloads; group holds the group information of the topology (dict) and is set separately.
+    """
+
+    __slots__ = ('uuid', 'coordinator', 'state', 'groupstate', 'group')
+    _fields = ('uuid', 'coordinator', 'state', 'groupstate')
+    _records = {'state': PlayerState, 'groupstate': GroupState}
+    _interned = ('uuid', 'coordinator')
+
+    @classmethod
+    def from_dict(cls, data, schema):
+        """:return: room state of a dict written by to_dict, e.g. of the warm start snapshot"""
+        room = cls(schema.get_layout(cls))
+        room.update({payload_field_names.get(key, key): value for key, value in data.items()}, {})
+        room.group = data.get('group')
+        return room
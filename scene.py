@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import concurrent.futures
+import threading
+import time
+import urllib.parse
+
+# scene settings of a room and the command they are sent with; booleans are sent as on/off
+setting_cmds = ('volume', 'groupVolume', 'mute', 'bass', 'treble', 'nightmode', 'speechenhancement', 'sub', 'repeat', 'shuffle', 'crossfade', 'sleep')
+
+# scene settings selecting the source of a room; they are sent to the group coordinator and start playback
+source_cmds = ('favorite', 'playlist', 'linein')
+
+
+class SceneRunner(object):
+    """
+    Applies a declarative scene to several rooms.
+
+    A scene is a dict like
+
+        {'groups': [['Wohnzimmer', 'Kueche', 'Bad'], ['Buero']],
+         'rooms': {'Wohnzimmer': {'volume': 30, 'bass': 2, 'favorite': 'Bayern 3'},
+                   'Kueche': {'volume': 20, 'mute': False}},
+         'play': True}
+
+    - groups: the first room of each group becomes its coordinator; a single room leaves its group. Current
+      members of a coordinator's group which are not part of any group of the scene leave it.
+    - rooms: settings per room (setting_cmds) and the source of its group (source_cmds)
+    - play: start playback on the coordinators of the groups and the rooms with a source (default True)
+
+    The steps are run in dependency order: coordinators leave their groups, the members join, the settings are
+    applied to all rooms in parallel (sequentially within a room) and finally the sources are selected and
+    playback is started on the coordinators in parallel. A failed request does not stop the scene; the result
+    reports success, response and duration of every request.
+    """
+
+    def __init__(self, plugin_instance, send, metrics=None, max_workers=8, resolve=None):
+        """
+        :param plugin_instance: instance of the plugin
+        :param send:            callable(request) sending a request to the sonos api; returns the response or None
+        :param metrics:         Metrics instance
+        :param max_workers:     maximum number of rooms handled in parallel
+        :param resolve:         callable(cmd, name) returning the name of the favorite or playlist matching name
+        """
+
+        # init instance
+        self._plugin_instance = plugin_instance
+        self._send = send
+        self._metrics = metrics
+        self._max_workers = max_workers
+        self._resolve = resolve
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(self._max_workers, thread_name_prefix=f"plugins.{self._plugin_instance.get_fullname()}.Scene")
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def plan(self, scene, topology):
+        """
+        Translate a scene into steps of requests
+
+        :param scene:       scene dict
+        :param topology:    current Topology, used to skip rooms which are already grouped as requested
+        :return:            list of (step name, {room: [request, ...]})
+        :raises ValueError: if the scene is invalid; nothing has been sent yet
+        """
+        if not isinstance(scene, dict):
+            raise ValueError("scene must be a dict")
+        unknown = set(scene).difference(('groups', 'rooms', 'play'))
+        if unknown:
+            raise ValueError(f"unknown scene keys {sorted(unknown)}")
+        groups = [list(group) if isinstance(group, (list, tuple)) else [group] for group in scene.get('groups') or ()]
+        rooms = scene.get('rooms') or {}
+        if not isinstance(rooms, dict):
+            raise ValueError("rooms must be a dict {room: {setting: value}}")
+
+        known_rooms = topology.room_to_uuid
+        coordinator_of = {}
+        for group in groups:
+            if not group:
+                raise ValueError("empty group")
+            for room in group:
+                if room in coordinator_of:
+                    raise ValueError(f"room {room} is part of several groups")
+                coordinator_of[room] = group[0]
+        for room, settings in rooms.items():
+            if not isinstance(settings, dict):
+                raise ValueError(f"settings of room {room} must be a dict")
+            unknown = set(settings).difference(setting_cmds + source_cmds)
+            if unknown:
+                raise ValueError(f"unknown settings {sorted(unknown)} of room {room}")
+            if len(set(settings).intersection(source_cmds)) > 1:
+                raise ValueError(f"several sources for room {room}")
+        if known_rooms:
+            unknown = set(coordinator_of).union(rooms).difference(known_rooms)
+            if unknown:
+                raise ValueError(f"unknown rooms {sorted(unknown)}")
+
+        ungroup, join = {}, {}
+        for group in groups:
+            coordinator = group[0]
+            members = topology.get_members(coordinator)
+            if topology.get_coordinator(coordinator) not in (None, coordinator) or (len(group) == 1 and len(members) > 1):
+                ungroup[coordinator] = [f"{coordinator}/leave"]
+            elif topology.get_coordinator(coordinator) == coordinator:
+                # the groups are declarative: current members not placed in any group of the scene leave
+                for member in members:
+                    if member not in coordinator_of:
+                        ungroup[member] = [f"{member}/leave"]
+            for member in group[1:]:
+                if topology.get_coordinator(member) != coordinator or coordinator in ungroup:
+                    join[member] = [f"{member}/join/{coordinator}"]
+
+        settings_step, play_step = {}, {}
+        for room, settings in rooms.items():
+            requests = []
+            for cmd in setting_cmds:
+                if cmd not in settings:
+                    continue
+                value = settings[cmd]
+                if cmd == 'mute':
+                    requests.append(f"{room}/{'mute' if value else 'unmute'}")
+                else:
+                    if isinstance(value, bool):
+                        value = 'on' if value else 'off'
+                    requests.append(f"{room}/{cmd}/{urllib.parse.quote(str(value), safe='')}")
+            if requests:
+                settings_step[room] = requests
+            for cmd in source_cmds:
+                if cmd in settings:
+                    coordinator = coordinator_of.get(room) or topology.get_coordinator(room) or room
+                    value = settings[cmd]
+                    if cmd != 'linein' and self._resolve is not None:
+                        value = self._resolve(cmd, value)
+                    request = f"{coordinator}/{cmd}" if value is True else f"{coordinator}/{cmd}/{urllib.parse.quote(str(value), safe='')}"
+                    play_step[coordinator] = [request]
+
+        if scene.get('play', True):
+            for group in groups:
+                play_step.setdefault(group[0], [f"{group[0]}/play"])
+            for room, requests in play_step.items():
+                if requests[-1] != f"{room}/play":
+                    requests.append(f"{room}/play")
+
+        steps = [('ungroup', ungroup), ('group', join), ('settings', settings_step), ('play', play_step)]
+        return [(name, requests) for name, requests in steps if requests]
+
+    def run(self, scene, topology):
+        """
+        Apply a scene
+
+        :return:    dict {'success': bool, 'duration': ms, 'steps': [{'step': name, 'success': bool, 'duration': ms,
+                    'results': [{'room', 'request', 'success', 'duration', 'response'}, ...]}, ...]}; success is False
+                    and the remaining steps are skipped, if the runner is stopped
+        :raises ValueError: if the scene is invalid
+        """
+        steps = self.plan(scene, topology)
+        with self._lock:
+            executor = self._executor
+        start = time.monotonic()
+        result = {'success': executor is not None, 'steps': []}
+        if executor is None:
+            self._plugin_instance.logger.warning("Scene runner not running; scene discarded")
+            steps = []
+        for name, requests in steps:
+            step_start = time.monotonic()
+            try:
+                futures = [executor.submit(self._run_room, room, room_requests) for room, room_requests in requests.items()]
+            except RuntimeError:
+                # the executor has been shut down by stop() while the scene is running
+                self._plugin_instance.logger.warning(f"Scene runner stopped; step {name} and the following steps are skipped")
+                result['success'] = False
+                break
+            results = [entry for future in futures for entry in future.result()]
+            success = all(entry['success'] for entry in results)
+            result['steps'].append({'step': name, 'success': success, 'duration': round((time.monotonic() - step_start) * 1000, 1), 'results': results})
+            result['success'] = result['success'] and success
+        duration = time.monotonic() - start
+        result['duration'] = round(duration * 1000, 1)
+        if self._metrics is not None:
+            self._metrics.observe_time('scene.duration', duration)
+        return result
+
+    def _run_room(self, room, requests):
+        """send the requests of a room one after another"""
+        results = []
+        for request in requests:
+            start = time.monotonic()
+            response = self._send(request)
+            results.append({'room': room,
+                            'request': request,
+                            'success': response is not None,
+                            'duration': round((time.monotonic() - start) * 1000, 1),
+                            'response': response})
+        return results
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import json
+import os
+import time
+
+from .events import json_loads
+
+# version of the file format; snapshots of other versions are ignored
+SNAPSHOT_FORMAT = 1
+
+# snapshots older than this (in seconds) are not restored
+max_snapshot_age = 7 * 86400
+
+
+def save_snapshot(filename, zones, rooms):
+    """
+    Write the topology and the room states to a file, replacing it atomically
+
+    :param zones:   topology as minimal zones list (Topology.to_zones())
+    :param rooms:   room states {room name: room data}, as kept in SonosHttp.sonos
+    :raises OSError: if the file cannot be written
+    """
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = {'format': SNAPSHOT_FORMAT, 'saved': time.time(), 'zones': zones, 'rooms': rooms}
+    temp = f"{filename}.tmp"
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(temp, filename)
+
+
+def load_snapshot(filename):
+    """
+    Read a snapshot written by save_snapshot
+
+    :return:    dict {'saved': ..., 'zones': [...], 'rooms': {...}} or None, if there is no usable snapshot
+    :raises ValueError: if the file is corrupt
+    """
+    try:
+        with open(filename, 'rb') as f:
+            data = json_loads(f.read())
+    except FileNotFoundError:
+        return None
+    if not isinstance(data, dict) or data.get('format') != SNAPSHOT_FORMAT:
+        return None
+    if time.time() - data.get('saved', 0) > max_snapshot_age:
+        return None
+    if not isinstance(data.get('zones'), list) or not isinstance(data.get('rooms'), dict):
+        raise ValueError(f"unexpected structure of snapshot {filename}")
+    return data
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import logging
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools'))
+
+from shng_stub import load_plugin_module
+
+load_plugin_module()
+from sonos_http.commands import CommandDispatcher
+
+
+class PluginStub(object):
+    logger = logging.getLogger(__name__)
+
+    def get_fullname(self):
+        return 'sonos_http'
+
+
+class TestCommandDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.sent = []
+        self.release = threading.Event()
+        self.release.set()
+        self.dispatcher = CommandDispatcher(PluginStub(), self.send, coalesce_window=0.1)
+        self.dispatcher.start()
+
+    def tearDown(self):
+        self.release.set()
+        self.dispatcher.stop()
+
+    def send(self, request):
+        self.release.wait(5)
+        self.sent.append(request)
+        return {'status': 'success'}
+
+    def wait_sent(self, count):
+        deadline = time.monotonic() + 5
+        while len(self.sent) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+
+    def test_latest_value_wins(self):
+        for volume in (10, 20, 30):
+            self.dispatcher.submit('Kitchen', 'volume', f'Kitchen/volume/{volume}')
+        self.wait_sent(1)
+        self.assertEqual(self.sent, ['Kitchen/volume/30'])
+        self.assertEqual(self.dispatcher.get_stats()['volume']['coalesced'], 2)
+
+    def test_coalesced_command_moves_behind_later_commands(self):
+        self.dispatcher.submit('Kitchen', 'volume', 'Kitchen/volume/10')
+        self.dispatcher.submit('Kitchen', 'mute', 'Kitchen/mute')
+        self.dispatcher.submit('Kitchen', 'volume', 'Kitchen/volume/20')
+        self.wait_sent(2)
+        self.assertEqual(self.sent, ['Kitchen/mute', 'Kitchen/volume/20'])
+
+    def test_order_kept_per_room(self):
+        # hold the worker on the first request, so the following ones are queued
+        self.release.clear()
+        self.dispatcher.submit('Kitchen', 'play', 'Kitchen/play')
+        time.sleep(0.05)
+        for request in ('Kitchen/pause', 'Kitchen/next', 'Kitchen/play'):
+            self.dispatcher.submit('Kitchen', request.split('/')[1], request)
+        self.release.set()
+        self.wait_sent(4)
+        self.assertEqual(self.sent, ['Kitchen/play', 'Kitchen/pause', 'Kitchen/next', 'Kitchen/play'])
+
+    def test_callable_request(self):
+        self.dispatcher.submit('Kitchen', 'favorite', lambda: 'Kitchen/favorite/Radio')
+        self.wait_sent(1)
+        self.assertEqual(self.sent, ['Kitchen/favorite/Radio'])
+
+    def test_discarded_when_stopped(self):
+        self.dispatcher.stop()
+        self.dispatcher.submit('Kitchen', 'play', 'Kitchen/play')
+        time.sleep(0.05)
+        self.assertEqual(self.sent, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
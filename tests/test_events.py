@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import json
+import os
+import queue
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools'))
+
+import samples
+from shng_stub import load_plugin_module
+
+load_plugin_module()
+from sonos_http.events import EventBuffer, PayloadDecoder, get_metric_type
+
+
+def drain(buffer):
+    events = []
+    while not buffer.empty():
+        events.append(buffer.get_nowait()[0])
+    return events
+
+
+class TestEventBuffer(unittest.TestCase):
+
+    def test_transport_state_coalesced_per_room(self):
+        buffer = EventBuffer()
+        buffer.put(samples.transport_state(0, elapsedTime=1))
+        buffer.put(samples.volume_change(1, 10))
+        buffer.put(samples.transport_state(1, elapsedTime=1))
+        buffer.put(samples.transport_state(0, elapsedTime=2))
+
+        events = drain(buffer)
+        # the newer event of room 0 replaces the pending one and moves behind the events received before it
+        self.assertEqual([(e['type'], e['data']['uuid']) for e in events],
+                         [('volume-change', samples.room_uuid(1)), ('transport-state', samples.room_uuid(1)),
+                          ('transport-state', samples.room_uuid(0))])
+        self.assertEqual(events[-1]['data']['state']['elapsedTime'], 2)
+        self.assertEqual(buffer.get_stats()['coalesced'], 1)
+
+    def test_other_events_kept_in_order(self):
+        buffer = EventBuffer()
+        for volume in range(5):
+            buffer.put(samples.volume_change(0, volume))
+        self.assertEqual([e['data']['newVolume'] for e in drain(buffer)], list(range(5)))
+        self.assertEqual(buffer.get_stats()['coalesced'], 0)
+
+    def test_topology_coalesced_per_backend_and_source(self):
+        buffer = EventBuffer()
+        webhook = samples.topology_change(2)
+        reconcile = dict(samples.topology_change(2), source='reconcile')
+        other_backend = dict(samples.topology_change(2), backend='second')
+        for event in (webhook, reconcile, other_backend, samples.topology_change(2)):
+            buffer.put(event)
+        events = drain(buffer)
+        self.assertEqual(len(events), 3)
+        self.assertIs(events[0], reconcile)
+        self.assertIs(events[1], other_backend)
+        self.assertIsNot(events[2], webhook)
+
+    def test_overflow_drops_oldest(self):
+        buffer = EventBuffer(maxsize=3, put_timeout=0.01)
+        for volume in range(5):
+            buffer.put(samples.volume_change(0, volume))
+        self.assertEqual([e['data']['newVolume'] for e in drain(buffer)], [2, 3, 4])
+        stats = buffer.get_stats()
+        self.assertEqual(stats['dropped'], 2)
+        self.assertEqual(stats['max_depth'], 3)
+
+    def test_get_empty(self):
+        with self.assertRaises(queue.Empty):
+            EventBuffer().get(timeout=0.01)
+
+
+class TestPayloadDecoder(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = PayloadDecoder()
+
+    def test_valid_payloads(self):
+        for payload in (samples.transport_state(0), samples.topology_change(3, group_size=2),
+                        samples.volume_change(0, 5), samples.mute_change(0, True)):
+            self.assertEqual(self.decoder.decode(json.dumps(payload).encode()), payload)
+
+    def test_invalid_payloads(self):
+        payloads = [b'not json',
+                    b'[1, 2]',
+                    {'type': 'transport-state', 'data': None},
+                    {'type': 'topology-change', 'data': [{'coordinator': {'roomName': 'A'}, 'members': []}]},
+                    {'type': 'topology-change', 'data': [{'coordinator': {'roomName': 'A', 'uuid': 'x'}, 'members': [{'roomName': 'B'}]}]},
+                    {'type': 'volume-change', 'data': {'roomName': 'A'}},
+                    {'type': 'mute-change', 'data': None}]
+        for payload in payloads:
+            raw = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            with self.subTest(payload=payload), self.assertRaises(ValueError):
+                self.decoder.decode(raw)
+
+    def test_metric_type(self):
+        self.assertEqual(get_metric_type({'type': 'volume-change'}), 'volume-change')
+        self.assertEqual(get_metric_type({'type': '<script>'}), 'other')
+        self.assertEqual(get_metric_type({}), 'other')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools'))
+
+from shng_stub import load_plugin_module
+
+load_plugin_module()
+from sonos_http.topology import Topology, ROOM_ADDED, ROOM_REMOVED, ROOM_RENAMED, JOIN, LEAVE, COORDINATOR_CHANGED
+
+
+def zones(*groups, names=None):
+    """:return: zones of groups given as tuples of uuids, coordinator first; room names default to the uuids"""
+    names = names or {}
+    return [{'uuid': group[0],
+             'coordinator': {'uuid': group[0], 'roomName': names.get(group[0], group[0])},
+             'members': [{'uuid': uuid, 'roomName': names.get(uuid, uuid)} for uuid in group]} for group in groups]
+
+
+class TestTopologyDiff(unittest.TestCase):
+
+    def diff(self, before, after, names=None):
+        topology = Topology()
+        topology.update(zones(*before))
+        events, changed_rooms = topology.update(zones(*after, names=names))
+        return sorted((event.kind, event.uuid, event.coordinator, event.previous) for event in events), changed_rooms
+
+    def test_unchanged(self):
+        self.assertEqual(self.diff([('X', 'u')], [('X', 'u')]), ([], set()))
+
+    def test_join(self):
+        events, changed_rooms = self.diff([('X',), ('u',)], [('X', 'u')])
+        self.assertEqual(events, [(JOIN, 'u', 'X', 'u')])
+        self.assertEqual(changed_rooms, {'X', 'u'})
+
+    def test_leave(self):
+        events, _ = self.diff([('X', 'u')], [('X',), ('u',)])
+        self.assertEqual(events, [(LEAVE, 'X', 'X', 'X'), (LEAVE, 'u', 'u', 'X')])
+
+    def test_move_to_other_group(self):
+        events, _ = self.diff([('X', 'u'), ('Y',)], [('X',), ('Y', 'u')])
+        self.assertEqual(events, [(JOIN, 'u', 'Y', 'X'), (LEAVE, 'X', 'X', 'X'), (LEAVE, 'u', 'Y', 'X')])
+
+    def test_leave_to_coordinate_other_rooms(self):
+        events, _ = self.diff([('X', 'u'), ('Z',)], [('X',), ('u', 'Z')])
+        self.assertEqual(events, [(JOIN, 'Z', 'u', 'Z'), (LEAVE, 'X', 'X', 'X'), (LEAVE, 'u', 'u', 'X')])
+
+    def test_coordinator_changed(self):
+        events, _ = self.diff([('X', 'u', 'Z')], [('u', 'Z'), ('X',)])
+        self.assertEqual(events, [(COORDINATOR_CHANGED, 'Z', 'u', 'X'), (COORDINATOR_CHANGED, 'u', 'u', 'X'),
+                                  (LEAVE, 'X', 'X', 'X')])
+
+    def test_rooms_added_removed_renamed(self):
+        events, _ = self.diff([('X',), ('u',)], [('X',), ('v',)], names={'X': 'Kitchen'})
+        self.assertEqual(events, [(ROOM_ADDED, 'v', 'v', None), (ROOM_REMOVED, 'u', None, 'u'), (ROOM_RENAMED, 'X', 'X', 'X')])
+
+    def test_sources_replaced_separately(self):
+        topology = Topology()
+        topology.update(zones(('X',)), source='first')
+        topology.update(zones(('Y',)), source='second')
+        events, _ = topology.update(zones(('X', 'u')), source='first')
+        self.assertEqual(sorted(topology.room_to_uuid), ['X', 'Y', 'u'])
+        self.assertEqual([event.kind for event in events], [ROOM_ADDED])
+        self.assertEqual(topology.get_source('Y'), 'second')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools'))
+
+import samples
+from shng_stub import load_plugin_module, create_items
+
+module = load_plugin_module()
+
+
+class TestWebhook(unittest.TestCase):
+
+    def setUp(self):
+        self.plugin = module.SonosHttp(None)
+        self.plugin.alive = True
+        self.item, = create_items(self.plugin, [samples.room_name(0)], ['volume'], 1)
+        self.loop = None
+
+    def tearDown(self):
+        self.plugin.alive = False
+        if self.loop is not None:
+            self.loop.join(5.0)
+        self.plugin.stop()
+
+    def post(self, body):
+        host, port = self.plugin.client._server.server_address
+        conn = http.client.HTTPConnection(host, port, timeout=5)
+        try:
+            conn.request('POST', '/', body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        finally:
+            conn.close()
+
+    def wait_for(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def test_malformed_payload_rejected(self):
+        invalid = [b'{"type": "volume-change"',
+                   b'[]',
+                   json.dumps({'type': 'volume-change', 'data': {'roomName': samples.room_name(0), 'newVolume': 'loud'}}).encode(),
+                   json.dumps({'type': 'mute-change', 'data': {'roomName': samples.room_name(0), 'newMute': 1}}).encode(),
+                   json.dumps({'type': 'transport-state', 'data': {'roomName': samples.room_name(0)}}).encode(),
+                   json.dumps({'type': 'topology-change', 'data': [{'coordinator': {'roomName': 'A'}, 'members': []}]}).encode(),
+                   json.dumps({'type': 'topology-change', 'data': [{'coordinator': {'roomName': 'A', 'uuid': 'RINCON_A'}, 'members': {}}]}).encode()]
+        for body in invalid:
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body), 400)
+        self.assertEqual(self.plugin.client.get_queue().get_stats()['received'], 0)
+        self.assertEqual(self.post(samples.encode(samples.volume_change(0, 30))), 200)
+        # the event is enqueued after the reply
+        self.assertTrue(self.wait_for(lambda: self.plugin.client.get_queue().get_stats()['received'] == 1))
+
+    def test_failing_event_keeps_loop_running(self):
+        self.loop = threading.Thread(target=self.plugin.get_webhook_data, daemon=True)
+        self.loop.start()
+        # bypasses the validation of the webhook, so handling the event fails
+        self.plugin.client.get_queue().put({'type': 'topology-change', 'data': [{'coordinator': {'roomName': 'A'}, 'members': []}]})
+        self.plugin.client.get_queue().put(samples.volume_change(0, 30))
+        self.assertTrue(self.wait_for(lambda: self.item._value == 30))
+        self.assertTrue(self.loop.is_alive())
+        counters = self.plugin.metrics.to_dict()['counters']
+        self.assertEqual(counters.get('webhook.failed'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
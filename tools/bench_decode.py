@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Benchmark for decoding webhook payloads
+
+Compares parse time, peak memory while parsing and memory retained by the decoded result of a synthetic
+topology-change payload for json.loads, orjson.loads (if installed) and the PayloadDecoder, and for decoding plus
+taking over the room data into room states with a typical item configuration (only the room states are retained).
+
+usage: python3 tools/bench_decode.py [--rooms 30] [--repeat 200]
+"""
+
+import argparse
+import json
+import logging
+import timeit
+import tracemalloc
+
+import samples
+from shng_stub import load_plugin_module
+
+ITEM_CMDS = ['volume', 'mute', 'play', 'bass', 'treble', 'current_title', 'current_artist', 'current_album',
+             'next_title', 'groupVolume', 'shuffle', 'repeat', 'elapsedTime']
+
+
+def measure_memory(decode, raw):
+    tracemalloc.start()
+    result = decode(raw)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=30, help='number of rooms in the topology')
+    parser.add_argument('--repeat', type=int, default=200, help='number of decoded payloads per measurement')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    load_plugin_module()
+    from sonos_http import events, roomstate, SonosHttp
+
+    decoder = events.PayloadDecoder()
+    schema = roomstate.Schema()
+    for cmd in ITEM_CMDS:
+        schema.add_required_path(SonosHttp._compile_accessor(cmd)[0])
+
+    def decode_rooms(raw):
+        rooms = []
+        for zone in decoder.decode(raw)['data']:
+            for member in zone['members']:
+                room = schema.new_room()
+                room.update(member, {})
+                rooms.append(room)
+        return rooms
+
+    raw = samples.encode(samples.topology_change(args.rooms, group_size=3))
+    print(f"topology-change with {args.rooms} rooms: {len(raw) / 1024:.1f} kB, json backend: {'orjson' if events.orjson else 'json'}")
+    print(f"{'decoder':<26} {'time [us]':>10} {'peak [kB]':>10} {'retained [kB]':>14}")
+
+    candidates = [('json.loads (full)', json.loads)]
+    if events.orjson:
+        candidates.append(('orjson.loads (full)', events.orjson.loads))
+    candidates.append(('PayloadDecoder', decoder.decode))
+    candidates.append(('PayloadDecoder + RoomState', decode_rooms))
+
+    for name, decode in candidates:
+        duration = timeit.timeit(lambda: decode(raw), number=args.repeat) / args.repeat * 1e6
+        peak, retained = measure_memory(decode, raw)
+        print(f"{name:<26} {duration:>10.1f} {peak / 1024:>10.1f} {retained / 1024:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Micro benchmark for the event to item dispatch
+
+Compares the cost of dispatching a volume-change and a transport-state event via the (room, cmd) dispatch index
+with the former full scan over all items of the plugin. The transport-state event writes all state items of the
+room (update_item_value_state without changed fields), so both variants do the same number of item writes.
+
+usage: python3 tools/bench_dispatch.py [--repeat N]
+"""
+
+import argparse
+import logging
+import timeit
+
+from shng_stub import load_plugin_module, create_items
+
+ROOMS = [f'Room{i:02d}' for i in range(15)]
+CMDS = ['volume', 'mute', 'play', 'bass', 'treble', 'current_title', 'current_artist', 'next_title', 'groupVolume', 'shuffle']
+
+STATE = {'volume': 10, 'mute': False, 'equalizer': {'bass': 7, 'treble': 8, 'loudness': True},
+         'currentTrack': {'artist': 'Artist', 'title': 'Title', 'duration': 180},
+         'nextTrack': {'artist': '', 'title': 'Next'}, 'trackNo': 1, 'elapsedTime': 0,
+         'playbackState': 'PLAYING', 'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}}
+
+
+def legacy_value_change(plugin, device, cmd, value):
+    """full scan as used before the dispatch index existed"""
+    for item in plugin._item_dict:
+        _sonos_room = plugin._item_dict[item][0]
+        _sonos_cmd = plugin._item_dict[item][1]
+        if _sonos_room == device and _sonos_cmd == cmd:
+            item(value, plugin.get_shortname())
+
+
+def legacy_state(plugin, device):
+    """full scan writing the state of a room to its items as used before the dispatch index existed"""
+    sonos_room_data = plugin.sonos.get(device)
+    for item in plugin._item_dict:
+        _sonos_room = plugin._item_dict[item][0]
+        _sonos_cmd = plugin._item_dict[item][1]
+        if _sonos_room != device:
+            continue
+        accessor = plugin._compile_accessor(_sonos_cmd)
+        if accessor is None:
+            continue
+        _value = plugin._read_state_value(sonos_room_data, accessor)
+        if _value is not None:
+            item(_value, plugin.get_shortname())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000, help='number of dispatched events per measurement')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    module = load_plugin_module()
+
+    print(f"{'items':>7} {'event':<16} {'scan [us]':>11} {'index [us]':>11} {'speedup':>8}")
+    for count in (100, 1000, 10000):
+        plugin = module.SonosHttp(None)
+        plugin.alive = True
+        create_items(plugin, ROOMS, CMDS, count)
+        plugin.sonos[ROOMS[0]] = module.RoomState.from_dict({'uuid': 'RINCON_0', 'coordinator': 'RINCON_0', 'state': STATE,
+                                                             'groupstate': {'volume': 10, 'mute': False}}, plugin._schema)
+
+        measurements = [
+            ('volume-change',
+             lambda: legacy_value_change(plugin, ROOMS[0], 'volume', 10),
+             lambda: plugin.update_item_value_change(ROOMS[0], 'volume', 10)),
+            ('transport-state',
+             lambda: legacy_state(plugin, ROOMS[0]),
+             lambda: plugin.update_item_value_state(ROOMS[0])),
+        ]
+        for name, scan, index in measurements:
+            t_scan = timeit.timeit(scan, number=args.repeat) / args.repeat * 1e6
+            t_index = timeit.timeit(index, number=args.repeat) / args.repeat * 1e6
+            print(f"{count:>7} {name:<16} {t_scan:>11.2f} {t_index:>11.2f} {t_scan / t_index:>7.1f}x")
+
+        plugin.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Replay benchmark of the webhook event pipeline
+
+Replays generated webhook payloads (based on the recorded samples in samples.py) through the full path of the
+plugin: HttpServer.Handler.do_POST -> event buffer -> get_webhook_data -> _decode_state / _decode_zones -> item
+writes, using stub items and SmartHomeNG stand-ins.
+
+Reports processed events/s, p50/p99 end-to-end latency (POST sent until the event is processed), coalesced
+events and, in a separate in-process pass without HTTP, the throughput without receiver and the peak and retained
+memory allocated while processing (traced with tracemalloc, which slows this pass down).
+
+usage: python3 tools/bench_pipeline.py [--rooms 15,30] [--items 200,2000] [--mix ts=70,vol=20,mute=5,topo=5]
+"""
+
+import argparse
+import gc
+import http.client
+import itertools
+import logging
+import random
+import threading
+import time
+import tracemalloc
+
+import samples
+from shng_stub import load_plugin_module, create_items
+
+ITEM_CMDS = ['volume', 'mute', 'play', 'bass', 'treble', 'current_title', 'current_artist', 'next_title',
+             'groupVolume', 'shuffle', 'elapsedTime', 'group_members', 'is_grouped']
+
+EVENT_KINDS = {'ts': 'transport-state', 'vol': 'volume-change', 'mute': 'mute-change', 'topo': 'topology-change'}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, weight = part.split('=')
+        if kind not in EVENT_KINDS:
+            raise argparse.ArgumentTypeError(f"unknown event kind '{kind}', use one of {', '.join(EVENT_KINDS)}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def generate_events(rooms, count, mix, seed=1):
+    """:return: list of encoded payloads, each tagged with a sequence number"""
+    rnd = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    events = []
+    for seq in range(count):
+        kind = rnd.choices(kinds, weights)[0]
+        room = rnd.randrange(rooms)
+        if kind == 'ts':
+            payload = samples.transport_state(room, elapsedTime=seq, playbackState=rnd.choice(('PLAYING', 'PAUSED_PLAYBACK')))
+        elif kind == 'vol':
+            payload = samples.volume_change(room, rnd.randrange(100))
+        elif kind == 'mute':
+            payload = samples.mute_change(room, rnd.random() < 0.5)
+        else:
+            payload = samples.topology_change(rooms, group_size=rnd.choice((1, 2, 3)))
+        payload['_bench_id'] = seq
+        events.append(samples.encode(payload))
+    return events
+
+
+def setup_plugin(module, rooms, items):
+    plugin = module.SonosHttp(None)
+    plugin.alive = True
+    create_items(plugin, [samples.room_name(i) for i in range(rooms)], ITEM_CMDS, items)
+    plugin._decode_zones(samples.topology_change(rooms)['data'])
+
+    processed = {}
+    handle = plugin._handle_webhook_event
+
+    def handle_and_record(event):
+        handle(event)
+        processed[event.get('_bench_id')] = time.perf_counter()
+
+    plugin._handle_webhook_event = handle_and_record
+    return plugin, processed
+
+
+def run_http(module, rooms, items, events, connections):
+    plugin, processed = setup_plugin(module, rooms, items)
+    loop = threading.Thread(target=plugin.get_webhook_data, daemon=True)
+    loop.start()
+    host, port = plugin.client._server.server_address
+
+    sent = {}
+    chunks = [events[i::connections] for i in range(connections)]
+    offsets = [list(range(i, len(events), connections)) for i in range(connections)]
+
+    def sender(chunk, ids):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        for body, seq in zip(chunk, ids):
+            sent[seq] = time.perf_counter()
+            conn.request('POST', '/', body=body, headers={'Content-Type': 'application/json'})
+            conn.getresponse().read()
+        conn.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=sender, args=(chunks[i], offsets[i])) for i in range(connections)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # wait until the event buffer is drained
+    buffer = plugin.client.get_queue()
+    while not buffer.empty():
+        time.sleep(0.001)
+    time.sleep(0.01)
+    duration = max(processed.values(), default=start) - start
+
+    latencies = sorted(processed[seq] - sent[seq] for seq in processed if seq in sent)
+    stats = buffer.get_stats()
+    plugin.stop()
+    loop.join(15)
+    return {'events': len(latencies),
+            'rate': len(latencies) / duration if duration else 0,
+            'p50': latencies[len(latencies) // 2] * 1000 if latencies else 0,
+            'p99': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+            'coalesced': stats['coalesced'],
+            'dropped': stats['dropped'],
+            'writes': plugin._item_writes}
+
+
+def run_in_process(module, rooms, items, events):
+    """decode and process all events in the calling thread, measuring allocations"""
+    plugin, _ = setup_plugin(module, rooms, items)
+    decoder = plugin.client.get_decoder()
+
+    gc.collect()
+    tracemalloc.start()
+    blocks_before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for body in events:
+        plugin._handle_webhook_event(decoder.decode(body))
+    duration = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    plugin.stop()
+    return {'rate': len(events) / duration,
+            'peak_kb': (peak - blocks_before) / 1024,
+            'retained_kb': (current - blocks_before) / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', default='15,30', help='comma separated room counts')
+    parser.add_argument('--items', default='200,2000', help='comma separated item counts')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('ts=70,vol=20,mute=5,topo=5'),
+                        help='event mix as kind=weight, kinds: ts, vol, mute, topo')
+    parser.add_argument('--events', type=int, default=3000, help='number of replayed events per run')
+    parser.add_argument('--connections', type=int, default=4, help='number of concurrent webhook connections')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    module = load_plugin_module()
+
+    print(f"event mix: {args.mix}, {args.events} events, {args.connections} connections")
+    print(f"{'rooms':>5} {'items':>6} | {'events/s':>9} {'p50 [ms]':>9} {'p99 [ms]':>9} {'coalesced':>9} {'dropped':>7} {'writes':>7} |"
+          f" {'in-process/s':>12} {'peak [kB]':>9} {'retained [kB]':>13}")
+    for rooms, items in itertools.product(map(int, args.rooms.split(',')), map(int, args.items.split(','))):
+        events = generate_events(rooms, args.events, args.mix)
+        http_result = run_http(module, rooms, items, events, args.connections)
+        local_result = run_in_process(module, rooms, items, events)
+        print(f"{rooms:>5} {items:>6} | {http_result['rate']:>9.0f} {http_result['p50']:>9.2f} {http_result['p99']:>9.2f} "
+              f"{http_result['coalesced']:>9} {http_result['dropped']:>7} {http_result['writes']:>7} |"
+              f" {local_result['rate']:>12.0f} {local_result['peak_kb']:>9.1f} {local_result['retained_kb']:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
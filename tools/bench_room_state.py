@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Benchmark of the per-room state kept in SonosHttp.sonos
+
+Decodes raw transport-state payloads of all rooms and feeds them into the consumer (PayloadDecoder.decode and
+_handle_webhook_event, like the webhook handler and get_webhook_data do) and reports
+
+- the memory per room: deep size of SonosHttp.sonos divided by the number of rooms, counting objects shared by
+  several rooms (e.g. interned strings) once, and the number of objects per room,
+- the processing time per event (decoding and consumer),
+- the memory allocated per event: peak of the traced memory above the level before the event and the number of
+  blocks still allocated after the event, averaged over all events (traced with tracemalloc),
+- the dicts of the decoded payloads which are still referenced by SonosHttp.sonos after the last event of every
+  room, i.e. kept alive until the next event of the room.
+
+The rooms are grouped by --group-size, so the events of coordinators are propagated to their group members.
+The events alternate between two tracks and playback states, so every event changes the room state.
+
+usage: python3 tools/bench_room_state.py [--rooms 30] [--group-size 3] [--events 3000]
+"""
+
+import argparse
+import gc
+import json
+import logging
+import sys
+import time
+import tracemalloc
+
+import samples
+from bench_pipeline import ITEM_CMDS
+from shng_stub import load_plugin_module, create_items
+
+
+def deep_size(obj, seen):
+    """:return: tuple of (bytes, objects) of obj and all objects reachable from it, which are not in seen"""
+    if id(obj) in seen or obj is None or isinstance(obj, (bool, type)):
+        return 0, 0
+    seen.add(id(obj))
+    size, count = sys.getsizeof(obj), 1
+    if isinstance(obj, dict):
+        children = [value for pair in obj.items() for value in pair]
+    elif isinstance(obj, (list, tuple, set)):
+        children = list(obj)
+    else:
+        children = [getattr(obj, name, None) for cls in type(obj).__mro__ for name in getattr(cls, '__slots__', ())]
+    for child in children:
+        child_size, child_count = deep_size(child, seen)
+        size += child_size
+        count += child_count
+    return size, count
+
+
+def dict_ids(obj):
+    """:return: set of the ids of all dicts in a tree of dicts and lists"""
+    ids = set()
+    if isinstance(obj, dict):
+        ids.add(id(obj))
+        obj = obj.values()
+    if isinstance(obj, (dict, list, type({}.values()))):
+        for child in obj:
+            ids |= dict_ids(child)
+    return ids
+
+
+def generate_events(rooms, count):
+    """:return: list of raw transport-state payloads, round robin over the rooms"""
+    events = []
+    for seq in range(count):
+        room = seq % rooms
+        playing = (seq // rooms) % 2 == 0
+        payload = samples.transport_state(room, elapsedTime=seq, playbackState='PLAYING' if playing else 'PAUSED_PLAYBACK')
+        payload['data']['state']['currentTrack']['title'] = f"Track {seq // rooms % 2}"
+        events.append(json.dumps(payload).encode())
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=30, help='number of rooms')
+    parser.add_argument('--group-size', type=int, default=3, help='number of rooms per group')
+    parser.add_argument('--events', type=int, default=3000, help='number of processed events')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    module = load_plugin_module(state_file='none')
+    plugin = module.SonosHttp(None)
+    create_items(plugin, [samples.room_name(i) for i in range(args.rooms)], ITEM_CMDS, args.rooms * len(ITEM_CMDS))
+    decoder = plugin.client.get_decoder()
+    events = generate_events(args.rooms, args.events + args.rooms)
+
+    # warm up: topology and first event of every room
+    plugin._handle_webhook_event(decoder.validate_event(samples.topology_change(args.rooms, args.group_size)))
+    for event in events[:args.rooms]:
+        plugin._handle_webhook_event(decoder.decode(event))
+    events = events[args.rooms:]
+
+    gc.collect()
+    start = time.perf_counter()
+    for event in events:
+        plugin._handle_webhook_event(decoder.decode(event))
+    duration = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    peak_total = 0
+    blocks_total = 0
+    for event in events:
+        before = tracemalloc.get_traced_memory()[0]
+        blocks = sys.getallocatedblocks()
+        tracemalloc.reset_peak()
+        plugin._handle_webhook_event(decoder.decode(event))
+        peak_total += tracemalloc.get_traced_memory()[1] - before
+        blocks_total += sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+
+    # last event of every room; the decoded payloads are kept to compare the identity of their dicts
+    payloads = [decoder.decode(event) for event in events[-args.rooms:]]
+    for payload in payloads:
+        plugin._handle_webhook_event(payload)
+
+    seen = set()
+    size, count = deep_size(plugin.sonos, seen)
+    retained = len(seen & dict_ids(payloads))
+    plugin.client.shutdown()
+
+    print(f"{args.rooms} rooms in groups of {args.group_size}, {len(ITEM_CMDS)} items per room, {len(events)} transport-state events")
+    print(f"memory per room:         {size / args.rooms:>8.0f} bytes in {count / args.rooms:.1f} objects")
+    print(f"time per event:          {duration / len(events) * 1e6:>8.1f} us")
+    print(f"allocated per event:     {peak_total / len(events):>8.0f} bytes peak, {blocks_total / len(events):.2f} blocks retained")
+    print(f"payload dicts retained:  {retained / args.rooms:>8.1f} per room")
+
+
+if __name__ == '__main__':
+    main()
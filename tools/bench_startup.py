@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Startup benchmark: time until the items have valid values after a (re)start
+
+Starts the plugin against the local node-sonos-http-api emulator, whose responses are delayed by --latency to
+mimic a slow api after a restart of the host, and measures
+
+- the time until run() returns,
+- the time until the first item is written and until all items with a state value are written,
+- the time until the live state of the zones has been applied,
+
+once for a cold start (no snapshot) and once for a warm start from the snapshot written by the cold start run.
+
+usage: python3 tools/bench_startup.py [--rooms 15] [--items 300] [--latency 2000]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import samples
+from shng_stub import load_plugin_module, create_items
+from sonos_api_emulator import start_emulator
+
+ITEM_CMDS = ['volume', 'mute', 'play', 'bass', 'treble', 'current_title', 'current_artist', 'groupVolume',
+             'shuffle', 'group_members', 'is_grouped']
+
+
+def run_once(module, rooms, items, state_file):
+    plugin = module.SonosHttp(None)
+    plugin._state_file = state_file
+    created = create_items(plugin, [samples.room_name(i) for i in range(rooms)], ITEM_CMDS, items)
+
+    start = time.perf_counter()
+    plugin.run()
+    returned = time.perf_counter() - start
+
+    # wait until the zones have been applied
+    while 'first_valid_item' not in plugin._startup_times and time.perf_counter() - start < 60:
+        time.sleep(0.001)
+    live = plugin._startup_times.get('first_valid_item')
+
+    writes = [item.last_write for item in created if item.last_write is not None]
+    plugin.stop()
+    return {'returned': returned * 1000,
+            'first_item': (min(writes) - start) * 1000 if writes else None,
+            'all_items': (max(writes) - start) * 1000 if writes else None,
+            'restored': plugin._startup_times.get('restored', 0) * 1000,
+            'live': live * 1000 if live is not None else None,
+            'written': len(writes)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=15, help='number of rooms')
+    parser.add_argument('--items', type=int, default=300, help='number of items')
+    parser.add_argument('--latency', type=float, default=2000, help='latency of the api in ms')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    server, _, _ = start_emulator(args.rooms, latency=args.latency / 1000)
+    module = load_plugin_module(Api_Port=server.server_address[1])
+    state_file = os.path.join(tempfile.mkdtemp(), 'state.json')
+
+    print(f"{args.rooms} rooms, {args.items} items, api latency {args.latency:.0f} ms; times in ms after calling run()")
+    print(f"{'start':<6} {'run()':>8} {'restored':>9} {'1st item':>9} {'live state':>11} {'written':>8}")
+    for name in ('cold', 'warm'):
+        result = run_once(module, args.rooms, args.items, state_file)
+        print(f"{name:<6} {result['returned']:>8.1f} {result['restored']:>9.1f} {result['first_item'] or 0:>9.1f} "
+              f"{result['live'] or 0:>11.1f} {result['written']:>8}")
+        if name == 'cold':
+            print(f"       snapshot: {os.path.getsize(state_file)} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Load test for the webhook receiver
+
+POSTs recorded webhook payloads at a high rate over several concurrent connections and reports throughput and
+request latency. Without --url, the receiver of the plugin is started locally in both modes (serial HTTP/1.0 and
+threaded HTTP/1.1 keep-alive) for comparison.
+
+usage: python3 tools/load_webhook.py [--url http://host:port/] [--connections 8] [--requests 4000]
+"""
+
+import argparse
+import http.client
+import logging
+import queue
+import statistics
+import threading
+import time
+import urllib.parse
+
+import samples
+from shng_stub import load_plugin_module
+
+
+def build_payloads(rooms):
+    payloads = [samples.encode(samples.topology_change(rooms, group_size=2))]
+    for i in range(rooms):
+        payloads.append(samples.encode(samples.transport_state(i)))
+        payloads.append(samples.encode(samples.volume_change(i, 10 + i)))
+        payloads.append(samples.encode(samples.mute_change(i, bool(i % 2))))
+    return payloads
+
+
+def run_load(host, port, payloads, connections, requests):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    per_connection = requests // connections
+
+    def worker(offset):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        own = []
+        for n in range(per_connection):
+            body = payloads[(offset + n) % len(payloads)]
+            start = time.perf_counter()
+            try:
+                conn.request('POST', '/', body=body, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(str(e))
+                conn.close()
+                continue
+            own.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(connections)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duration = time.perf_counter() - start
+
+    latencies.sort()
+    return {'requests': len(latencies),
+            'errors': len(errors),
+            'rate': len(latencies) / duration,
+            'p50': latencies[len(latencies) // 2] * 1000 if latencies else 0,
+            'p99': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+            'mean': statistics.mean(latencies) * 1000 if latencies else 0}
+
+
+def print_result(name, result):
+    print(f"{name:<24} {result['requests']:>8} {result['errors']:>7} {result['rate']:>10.0f} "
+          f"{result['p50']:>9.2f} {result['p99']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='webhook receiver to test; default: start the plugin receiver locally')
+    parser.add_argument('--connections', type=int, default=8, help='number of concurrent client connections')
+    parser.add_argument('--requests', type=int, default=4000, help='total number of POST requests')
+    parser.add_argument('--rooms', type=int, default=15, help='number of rooms in the generated payloads')
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.rooms)
+    print(f"{'receiver':<24} {'requests':>8} {'errors':>7} {'req/s':>10} {'p50 [ms]':>9} {'p99 [ms]':>9}")
+
+    if args.url:
+        url = urllib.parse.urlparse(args.url)
+        print_result(url.netloc, run_load(url.hostname, url.port or 80, payloads, args.connections, args.requests))
+        return
+
+    logging.disable(logging.CRITICAL)
+    module = load_plugin_module()
+    for name, threaded in (('serial HTTP/1.0', False), ('threaded HTTP/1.1', True)):
+        owner = _ReceiverOwner()
+        owner.metrics = module.Metrics()
+        server = module.HttpServer('127.0.0.1', 0, owner, threaded=threaded)
+        server.startup()
+        host, port = server._server.server_address
+        running = threading.Event()
+        running.set()
+        consumer = threading.Thread(target=_drain, args=(server.get_queue(), running))
+        consumer.start()
+        try:
+            print_result(name, run_load(host, port, payloads, args.connections, args.requests))
+        finally:
+            running.clear()
+            consumer.join()
+            server.stop_server()
+            server.shutdown()
+
+
+class _ReceiverOwner(object):
+    """plugin instance stand-in providing what the receiver needs"""
+
+    logger = logging.getLogger('load_webhook')
+
+    def get_fullname(self):
+        return 'sonos_http'
+
+    def get_backend_by_address(self, address):
+        # single api server: the events are not tagged with their sender
+        return None
+
+
+def _drain(buffer, running):
+    """consume the received events like the event loop of the plugin does"""
+    while running.is_set() or not buffer.empty():
+        try:
+            buffer.get(True, 0.1)
+        except queue.Empty:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Replay of recorded webhook traffic
+
+Reads a recording written by the plugin (parameter webhook_record_file) including its rotated files and feeds the
+raw webhook bodies back in recorded order, either
+
+- in-process into the consumer of a plugin instance loaded with SmartHomeNG stand-ins (default): the bodies are
+  decoded and put into the event buffer like HttpServer.Handler.do_POST does, processed by get_webhook_data and
+  written to stub items of all rooms found in the recording, or
+- as HTTP POSTs to the webhook receiver of a running plugin (--url).
+
+The gaps between the records are reproduced, scaled by --speed; --speed 0 replays as fast as possible.
+
+usage: python3 tools/replay_webhooks.py /path/to/webhooks.rec [--speed 1] [--url http://127.0.0.1:1025/]
+                                        [--items-per-room 13] [--list]
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import threading
+import time
+import urllib.parse
+
+from bench_pipeline import ITEM_CMDS
+from shng_stub import load_plugin_module, create_items
+
+
+def load_records(recorder, filename):
+    """:return: list of (timestamp, body) of the recording file and its rotated files, oldest first"""
+    records = []
+    for name in recorder.get_recording_files(filename) or [filename]:
+        records.extend(recorder.read_records(name))
+    return records
+
+
+def find_rooms(records):
+    rooms = set()
+    for _, body in records:
+        try:
+            event = json.loads(body)
+            if event.get('type') == 'transport-state':
+                rooms.add(event['data']['roomName'])
+            elif event.get('type') == 'topology-change':
+                for zone in event['data']:
+                    rooms.update(member['roomName'] for member in zone.get('members', ()))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            continue
+    return sorted(rooms)
+
+
+def replay(records, speed, max_gap, send):
+    """call send(body) for every record, reproducing the recorded gaps"""
+    start = time.monotonic()
+    offset = 0.0
+    previous = records[0][0] if records else 0.0
+    for timestamp, body in records:
+        # clamp gaps, e.g. between recordings of different runs with an unrelated monotonic clock
+        offset += min(max(timestamp - previous, 0.0), max_gap)
+        previous = timestamp
+        if speed:
+            delay = start + offset / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        send(body)
+    return time.monotonic() - start
+
+
+def replay_in_process(module, records, speed, max_gap, items_per_room):
+    plugin = module.SonosHttp(None)
+    plugin.alive = True
+    rooms = find_rooms(records)
+    if rooms:
+        create_items(plugin, rooms, ITEM_CMDS, len(rooms) * items_per_room)
+    loop = threading.Thread(target=plugin.get_webhook_data, daemon=True)
+    loop.start()
+
+    decoder = plugin.client.get_decoder()
+    buffer = plugin.client.get_queue()
+    malformed = 0
+
+    def send(body):
+        nonlocal malformed
+        try:
+            buffer.put(decoder.decode(body))
+        except ValueError:
+            malformed += 1
+
+    duration = replay(records, speed, max_gap, send)
+    while not buffer.empty():
+        time.sleep(0.001)
+    time.sleep(0.05)
+    metrics = plugin.get_metrics()
+    plugin.stop()
+    loop.join(15)
+
+    print(f"replayed {len(records)} records of {len(rooms)} rooms in {duration:.2f} s, {malformed} malformed")
+    stats = metrics['gauges']['event_buffer']
+    print(f"event buffer: received={stats['received']} coalesced={stats['coalesced']} dropped={stats['dropped']} max_depth={stats['max_depth']}")
+    print(f"item writes: {metrics['gauges']['item_writes']}, suppressed: {metrics['gauges']['item_writes_suppressed']}")
+    print(f"{'histogram':<36} {'count':>7} {'avg':>8} {'p50':>8} {'p99':>8} {'max':>8}")
+    for name, histogram in metrics['histograms'].items():
+        print(f"{name:<36} {histogram['count']:>7} {histogram['avg']:>8.3f} {histogram['p50']:>8.3f} {histogram['p99']:>8.3f} {histogram['max']:>8.3f}")
+
+
+def replay_http(records, speed, max_gap, url):
+    url = urllib.parse.urlparse(url)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    status = {}
+
+    def send(body):
+        conn.request('POST', url.path or '/', body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        status[response.status] = status.get(response.status, 0) + 1
+
+    duration = replay(records, speed, max_gap, send)
+    conn.close()
+    print(f"posted {len(records)} records in {duration:.2f} s, responses: {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recording', help='recording file as configured in webhook_record_file')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed factor; 0 replays as fast as possible')
+    parser.add_argument('--max-gap', type=float, default=10.0, help='maximum replayed gap between two records in s')
+    parser.add_argument('--url', help='post the records to this webhook receiver instead of replaying in-process')
+    parser.add_argument('--items-per-room', type=int, default=len(ITEM_CMDS), help='stub items per room for in-process replay')
+    parser.add_argument('--list', action='store_true', help='only list the records')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    module = load_plugin_module()
+    records = load_records(module.recorder, args.recording)
+
+    if args.list:
+        origin = records[0][0] if records else 0.0
+        for timestamp, body in records:
+            print(f"{timestamp - origin:>10.3f} {len(body):>8} {body[:100]!r}")
+    elif args.url:
+        replay_http(records, args.speed, args.max_gap, args.url)
+    else:
+        replay_in_process(module, records, args.speed, args.max_gap, args.items_per_room)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Recorded node-sonos-http-api webhook payloads and generators for synthetic payloads of any room count.
+
+The samples are the transport-state, topology-change, volume-change and mute-change payloads documented in
+SonosHttp.get_webhook_data.
+"""
+
+import copy
+import json
+
+TRANSPORT_STATE = {'type': 'transport-state',
+                   'data': {'uuid': 'RINCON_7828CAEB625E01400',
+                            'coordinator': 'RINCON_7828CAEB625E01400',
+                            'roomName': 'Esszimmer',
+                            'state': {'volume': 10,
+                                      'mute': False,
+                                      'equalizer': {'bass': 7, 'treble': 8, 'loudness': True},
+                                      'currentTrack': {'artist': 'Antenne Bayern',
+                                                       'albumArtUri': '/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8',
+                                                       'duration': 0,
+                                                       'uri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8',
+                                                       'trackUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8',
+                                                       'type': 'radio',
+                                                       'stationName': 'Antenne Bayern',
+                                                       'absoluteAlbumArtUri': 'http://192.168.2.130:1400/getaa?s=1&u=x-sonosapi-stream%3atop40%3fsid%3d269%26flags%3d32%26sn%3d8'},
+                                      'nextTrack': {'artist': '',
+                                                    'title': '',
+                                                    'album': '',
+                                                    'albumArtUri': '',
+                                                    'duration': 0,
+                                                    'uri': ''},
+                                      'trackNo': 1,
+                                      'elapsedTime': 0,
+                                      'elapsedTimeFormatted': '00:00:00',
+                                      'playbackState': 'STOPPED',
+                                      'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False}},
+                            'groupState': {'volume': 10, 'mute': False},
+                            'avTransportUri': 'x-sonosapi-stream:top40?sid=269&flags=32&sn=8',
+                            'avTransportUriMetadata': '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" '
+                                                      'xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" '
+                                                      'xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" '
+                                                      'xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"><item id="-1" '
+                                                      'parentID="-1" restricted="true"><dc:title>Antenne '
+                                                      'Bayern</dc:title><upnp:class>object.item.audioItem.audioBroadcast</upnp:class><desc '
+                                                      'id="cdudn" '
+                                                      'nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">SA_RINCON68871_</desc></item></DIDL-Lite>'}}
+
+ROOM_STATE_HOME_THEATER = {'uuid': 'RINCON_7828CA59548701400',
+                           'coordinator': 'RINCON_7828CA59548701400',
+                           'roomName': 'TV',
+                           'state': {'volume': 10,
+                                     'mute': False,
+                                     'equalizer': {'bass': 7, 'treble': 6, 'loudness': True, 'speechEnhancement': True, 'nightMode': False},
+                                     'currentTrack': {'title': 'google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3',
+                                                      'duration': 2,
+                                                      'uri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3',
+                                                      'trackUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3',
+                                                      'type': 'track',
+                                                      'stationName': '',
+                                                      'absoluteAlbumArtUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3'},
+                                     'nextTrack': {'artist': '', 'title': '', 'album': '', 'albumArtUri': '', 'duration': 0, 'uri': ''},
+                                     'trackNo': 1,
+                                     'elapsedTime': 0,
+                                     'elapsedTimeFormatted': '00:00:00',
+                                     'playbackState': 'STOPPED',
+                                     'playMode': {'repeat': 'none', 'shuffle': False, 'crossfade': False},
+                                     'sub': {'gain': 7, 'crossover': 0, 'polarity': 0, 'enabled': True}},
+                           'groupState': {'volume': 10, 'mute': False},
+                           'avTransportUri': 'http://192.168.2.12:5005/tts/google-808092f232a9736dfa6447c6e12bfa4f27a74993-de.mp3',
+                           'avTransportUriMetadata': ''}
+
+VOLUME_CHANGE = {'type': 'volume-change',
+                 'data': {'uuid': 'RINCON_7828CAEB625E01400', 'previousVolume': 8, 'newVolume': 8, 'roomName': 'Esszimmer'}}
+
+MUTE_CHANGE = {'type': 'mute-change',
+               'data': {'uuid': 'RINCON_7828CAEB625E01400', 'previousMute': True, 'newMute': True, 'roomName': 'Esszimmer'}}
+
+
+def room_name(index):
+    return f'Room{index:02d}'
+
+
+def room_uuid(index):
+    return f'RINCON_7828CA{index:010d}01400'
+
+
+def room_state(index, coordinator_index=None, home_theater=False):
+    """:return: room data dict as contained in transport-state and topology-change payloads"""
+    data = copy.deepcopy(ROOM_STATE_HOME_THEATER if home_theater else TRANSPORT_STATE['data'])
+    data['uuid'] = room_uuid(index)
+    data['coordinator'] = room_uuid(index if coordinator_index is None else coordinator_index)
+    data['roomName'] = room_name(index)
+    data['state']['volume'] = 10 + index % 20
+    return data
+
+
+def transport_state(index, **changes):
+    """:return: transport-state payload for a room; keyword arguments overwrite fields of the state"""
+    data = room_state(index)
+    data['state'].update(changes)
+    return {'type': 'transport-state', 'data': data}
+
+
+def topology_change(rooms, group_size=1):
+    """
+    :param rooms:       number of rooms
+    :param group_size:  number of rooms per group; the first room of a group is its coordinator
+    :return:            topology-change payload
+    """
+    zones = []
+    for first in range(0, rooms, group_size):
+        indices = range(first, min(first + group_size, rooms))
+        members = [room_state(i, coordinator_index=first, home_theater=(i % 5 == 0)) for i in indices]
+        zones.append({'coordinator': members[0],
+                      'members': members,
+                      'uuid': room_uuid(first),
+                      'id': f'{room_uuid(first)}:{1640192871 + first}'})
+    return {'type': 'topology-change', 'data': zones}
+
+
+def volume_change(index, volume):
+    return {'type': 'volume-change', 'data': {'uuid': room_uuid(index), 'previousVolume': volume, 'newVolume': volume, 'roomName': room_name(index)}}
+
+
+def mute_change(index, mute):
+    return {'type': 'mute-change', 'data': {'uuid': room_uuid(index), 'previousMute': not mute, 'newMute': mute, 'roomName': room_name(index)}}
+
+
+def encode(payload):
+    """:return: payload encoded as sent by node-sonos-http-api"""
+    return json.dumps(payload).encode()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Minimal stand-ins for the SmartHomeNG core, so that the plugin can be loaded by the benchmark and test tools
+in this directory without a running SmartHomeNG instance.
+
+Only the parts of the SmartHomeNG API the plugin actually uses are provided.
+"""
+
+import importlib.util
+import logging
+import os
+import sys
+import time
+import types
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_NAME = 'sonos_http'
+
+
+class StubItem(object):
+    """Callable item object mimicking the parts of lib.item.Item the plugin uses"""
+
+    def __init__(self, path, conf=None, parent=None, value=None):
+        self._path = path
+        self._value = value
+        self._parent = parent
+        self.conf = conf or {}
+        self.property = types.SimpleNamespace(path=path)
+        self.writes = 0
+        self.last_write = None
+
+    def __call__(self, value=None, caller=None, source=None, dest=None):
+        if value is None:
+            return self._value
+        self._value = value
+        self.writes += 1
+        self.last_write = time.perf_counter()
+
+    def __repr__(self):
+        return f"Item: {self._path}"
+
+    def id(self):
+        return self._path
+
+    def return_parent(self):
+        return self._parent if self._parent is not None else StubItem('', {})
+
+
+def _read_parameter_defaults():
+    defaults = {}
+    try:
+        import yaml
+    except ImportError:
+        return defaults
+    with open(os.path.join(PLUGIN_DIR, 'plugin.yaml'), encoding='utf-8') as f:
+        meta = yaml.safe_load(f)
+    for name, definition in (meta.get('parameters') or {}).items():
+        defaults[name] = definition.get('default')
+    return defaults
+
+
+def _install_shng_modules(parameters):
+
+    class SmartPlugin(object):
+        _parameters = {}
+
+        def __init__(self):
+            self.logger = logging.getLogger(f'plugins.{PLUGIN_NAME}')
+            self._itemlist = []
+            self._init_complete = True
+            self.schedulers = {}
+
+        def get_parameter_value(self, name):
+            return self._parameters.get(name)
+
+        def has_iattr(self, conf, attr):
+            return attr in conf
+
+        def get_iattr_value(self, conf, attr):
+            return conf.get(attr)
+
+        def get_shortname(self):
+            return PLUGIN_NAME
+
+        def get_fullname(self):
+            return PLUGIN_NAME
+
+        def get_sh(self):
+            return None
+
+        def init_webinterface(self, webif=None):
+            return True
+
+        def scheduler_add(self, name, obj, prio=3, cron=None, cycle=None, value=None, offset=None, next=None):
+            self.schedulers[name] = {'obj': obj, 'cycle': cycle}
+
+        def scheduler_change(self, name, **kwargs):
+            self.schedulers.setdefault(name, {}).update(kwargs)
+
+        def scheduler_remove(self, name):
+            self.schedulers.pop(name, None)
+
+    class SmartPluginWebIf(object):
+        def init_template_environment(self):
+            return None
+
+    class Utils(object):
+        @staticmethod
+        def get_local_ipv4_address():
+            return '127.0.0.1'
+
+    class Items(object):
+        @staticmethod
+        def get_instance():
+            return Items()
+
+        def return_items(self):
+            return []
+
+    SmartPlugin._parameters = parameters
+
+    lib = types.ModuleType('lib')
+    lib_model = types.ModuleType('lib.model')
+    lib_smartplugin = types.ModuleType('lib.model.smartplugin')
+    lib_smartplugin.SmartPlugin = SmartPlugin
+    lib_smartplugin.SmartPluginWebIf = SmartPluginWebIf
+    lib_utils = types.ModuleType('lib.utils')
+    lib_utils.Utils = Utils
+    lib_item = types.ModuleType('lib.item')
+    lib_item.Items = Items
+    lib.model = lib_model
+    lib.utils = lib_utils
+    lib.item = lib_item
+    lib_model.smartplugin = lib_smartplugin
+    sys.modules.update({'lib': lib, 'lib.model': lib_model, 'lib.model.smartplugin': lib_smartplugin,
+                        'lib.utils': lib_utils, 'lib.item': lib_item})
+
+    # web interface dependencies are part of every SmartHomeNG installation
+    for name in ('cherrypy', 'jinja2'):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            module = types.ModuleType(name)
+            module.expose = lambda f: f
+            module.Environment = module.FileSystemLoader = object
+            sys.modules[name] = module
+
+
+def load_plugin_module(**parameters):
+    """
+    Install the SmartHomeNG stand-ins and import the plugin package
+
+    :param parameters: plugin parameters overriding the defaults from plugin.yaml
+    :return: the imported plugin module
+    """
+    values = _read_parameter_defaults()
+    values.update({'Server_IP': '127.0.0.1', 'Server_Port': 0})
+    values.update(parameters)
+    _install_shng_modules(values)
+
+    if PLUGIN_NAME in sys.modules:
+        return sys.modules[PLUGIN_NAME]
+    spec = importlib.util.spec_from_file_location(PLUGIN_NAME, os.path.join(PLUGIN_DIR, '__init__.py'),
+                                                  submodule_search_locations=[PLUGIN_DIR])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PLUGIN_NAME] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def create_items(plugin, rooms, cmds, count):
+    """
+    Create ``count`` items distributed round robin over rooms and commands and register them at the plugin
+
+    :return: list of created items
+    """
+    items = []
+    for i in range(count):
+        room = rooms[i % len(rooms)]
+        cmd = cmds[(i // len(rooms)) % len(cmds)]
+        parent = StubItem(f'sonos.{room}', {'sonos_room': room})
+        item = StubItem(f'sonos.{room}.{cmd}_{i}', {'sonos_cmd': cmd}, parent=parent)
+        plugin.parse_item(item)
+        items.append(item)
+    return items
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Local stand-in for node-sonos-http-api
+
+Emulates the subset of the node-sonos-http-api used by the plugin, so that command throughput, coalescing and
+topology handling can be measured without a Sonos system:
+
+- GET /zones
+- GET /{room}/{cmd}[/{arg}...]  (volume, groupVolume, mute, unmute, togglemute, play, pause, playpause, next,
+  previous, state, bass, treble, join, leave, favorites, favorite, playlists, playlist, queue, say, clip, ...)
+- GET /{cmd}[/{arg}...] for global commands (pauseall, resumeall, sayall, clipall, favorites, playlists, ...)
+- webhook POSTs of transport-state, volume-change, mute-change and topology-change to the plugin
+
+Latency, error rate and event storms can be injected.
+
+usage: python3 tools/sonos_api_emulator.py --rooms 30 --webhook http://127.0.0.1:1025/ [--port 5005]
+                                           [--latency 20] [--slow-latency 1500] [--error-rate 0.01]
+                                           [--storm 50] [--topology-storm 10] [--first-room 0]
+"""
+
+import argparse
+import copy
+import http.client
+import http.server
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.parse
+
+import samples
+
+logger = logging.getLogger('sonos_api_emulator')
+
+# commands answering slowly in the real api (tts rendering, loading of favorites)
+SLOW_CMDS = {'say', 'sayall', 'saypreset', 'favorite', 'playlist', 'clip', 'clipall', 'clippreset'}
+
+# commands without room
+GLOBAL_CMDS = {'zones', 'pauseall', 'resumeall', 'sayall', 'clipall', 'lockvolumes', 'unlockvolumes', 'favorites', 'playlists'}
+
+FAVORITES = ['Antenne Bayern', 'BR Schlager', 'Bayern 3', 'Deutschlandfunk', 'Klassik Radio', 'Rock Antenne']
+PLAYLISTS = ['Party', 'Chill', 'Kids', 'Workout']
+
+
+class SonosSystem(object):
+    """State of the emulated sonos system"""
+
+    def __init__(self, rooms, group_size=1, queue_length=200, first_room=0):
+        self.lock = threading.RLock()
+        self.rooms = {}                             # {room name: room data}
+        self.coordinator_of = {}                    # {room name: coordinator room name}
+        self.queue_length = queue_length
+        for i in range(first_room, first_room + rooms):
+            data = samples.room_state(i, home_theater=(i % 5 == 0))
+            self.rooms[data['roomName']] = data
+        names = list(self.rooms)
+        for i, name in enumerate(names):
+            self.coordinator_of[name] = names[i - i % group_size]
+        self._sync_coordinators()
+
+    def _sync_coordinators(self):
+        for name, data in self.rooms.items():
+            data['coordinator'] = self.rooms[self.coordinator_of[name]]['uuid']
+
+    def zones(self):
+        with self.lock:
+            zones = []
+            for coordinator in dict.fromkeys(self.coordinator_of.values()):
+                members = [copy.deepcopy(self.rooms[name]) for name, c in self.coordinator_of.items() if c == coordinator]
+                zones.append({'coordinator': copy.deepcopy(self.rooms[coordinator]),
+                              'members': members,
+                              'uuid': self.rooms[coordinator]['uuid'],
+                              'id': f"{self.rooms[coordinator]['uuid']}:{random.randrange(1 << 31)}"})
+            return zones
+
+    def members(self, room):
+        coordinator = self.coordinator_of[room]
+        return [name for name, c in self.coordinator_of.items() if c == coordinator]
+
+    def execute(self, room, cmd, args):
+        """
+        Execute a room command
+
+        :return: tuple of (response, list of webhook events)
+        """
+        with self.lock:
+            data = self.rooms[room]
+            state = data['state']
+            coordinator = self.rooms[self.coordinator_of[room]]
+            events = []
+            response = {'status': 'success'}
+
+            if cmd == 'state':
+                return copy.deepcopy(state), events
+            if cmd == 'volume' and args:
+                previous = state['volume']
+                value = args[0]
+                state['volume'] = max(0, min(100, previous + int(value) if value[0] in '+-' else int(value)))
+                events.append({'type': 'volume-change', 'data': {'uuid': data['uuid'], 'previousVolume': previous, 'newVolume': state['volume'], 'roomName': room}})
+            elif cmd in ('mute', 'unmute', 'togglemute'):
+                previous = state['mute']
+                state['mute'] = not previous if cmd == 'togglemute' else cmd == 'mute'
+                events.append({'type': 'mute-change', 'data': {'uuid': data['uuid'], 'previousMute': previous, 'newMute': state['mute'], 'roomName': room}})
+            elif cmd == 'groupVolume' and args:
+                for member in self.members(room):
+                    self.rooms[member]['groupState']['volume'] = int(args[0])
+                    events.append(self.transport_state(member))
+            elif cmd in ('bass', 'treble') and args:
+                state['equalizer'][cmd] = int(args[0])
+                events.append(self.transport_state(room))
+            elif cmd in ('play', 'pause', 'playpause', 'next', 'previous', 'timeseek', 'trackseek', 'favorite', 'playlist', 'say', 'clip'):
+                coordinator_state = coordinator['state']
+                if cmd == 'playpause':
+                    playing = coordinator_state['playbackState'] == 'PLAYING'
+                    coordinator_state['playbackState'] = 'PAUSED_PLAYBACK' if playing else 'PLAYING'
+                elif cmd == 'pause':
+                    coordinator_state['playbackState'] = 'PAUSED_PLAYBACK'
+                else:
+                    coordinator_state['playbackState'] = 'PLAYING'
+                if cmd in ('next', 'previous'):
+                    coordinator_state['trackNo'] += 1 if cmd == 'next' else -1
+                if cmd == 'timeseek' and args:
+                    coordinator_state['elapsedTime'] = int(args[0])
+                if cmd in ('favorite', 'playlist') and args:
+                    coordinator_state['currentTrack']['title'] = args[0]
+                    coordinator_state['currentTrack']['stationName'] = args[0]
+                for member in self.members(room):
+                    events.append(self.transport_state(member))
+            elif cmd == 'join' and args:
+                target = args[0]
+                if target not in self.rooms:
+                    raise KeyError(target)
+                self.coordinator_of[room] = self.coordinator_of[target]
+                self._sync_coordinators()
+                events.append({'type': 'topology-change', 'data': self.zones()})
+            elif cmd == 'leave':
+                if self.coordinator_of[room] == room:
+                    # the coordinator leaves; the next member takes over
+                    members = self.members(room)[1:]
+                    for member in members:
+                        self.coordinator_of[member] = members[0]
+                self.coordinator_of[room] = room
+                self._sync_coordinators()
+                events.append({'type': 'topology-change', 'data': self.zones()})
+            elif cmd == 'favorites':
+                return list(FAVORITES), events
+            elif cmd == 'playlists':
+                return list(PLAYLISTS), events
+            elif cmd == 'queue':
+                limit = int(args[0]) if args else self.queue_length
+                offset = int(args[1]) if len(args) > 1 else 0
+                return [{'title': f'Track {i}', 'artist': 'Artist', 'album': 'Album', 'albumArtUri': ''}
+                        for i in range(offset, min(offset + limit, self.queue_length))], events
+            return response, events
+
+    def transport_state(self, room):
+        return {'type': 'transport-state', 'data': copy.deepcopy(self.rooms[room])}
+
+    def random_event(self, rnd):
+        """:return: a random transport-state event as sent while music is playing"""
+        with self.lock:
+            room = rnd.choice(list(self.rooms))
+            self.rooms[room]['state']['elapsedTime'] += 1
+            return self.transport_state(room)
+
+
+class WebhookSender(object):
+    """Sends webhook events in the background over a persistent connection"""
+
+    def __init__(self, url):
+        self.url = urllib.parse.urlparse(url) if url else None
+        self.queue = queue.Queue()
+        self.sent = 0
+        self.failed = 0
+        if self.url:
+            threading.Thread(target=self._run, daemon=True, name='WebhookSender').start()
+
+    def send(self, event):
+        if self.url:
+            self.queue.put(event)
+
+    def _run(self):
+        conn = None
+        while True:
+            event = self.queue.get()
+            body = json.dumps(event).encode()
+            for attempt in range(2):
+                try:
+                    if conn is None:
+                        conn = http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=10)
+                    conn.request('POST', self.url.path or '/', body=body, headers={'Content-Type': 'application/json'})
+                    conn.getresponse().read()
+                    self.sent += 1
+                    break
+                except (OSError, http.client.HTTPException) as e:
+                    conn.close()
+                    conn = None
+                    if attempt:
+                        self.failed += 1
+                        logger.warning(f"webhook POST failed: {e}")
+
+
+class Options(object):
+    latency = 0.0
+    jitter = 0.0
+    slow_latency = 0.0
+    error_rate = 0.0
+
+
+def make_handler(system, sender, options):
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+        def reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = [urllib.parse.unquote(p) for p in urllib.parse.urlparse(self.path).path.split('/') if p]
+            if not parts:
+                self.reply(404, {'status': 'error', 'error': 'no command'})
+                return
+
+            if parts[0] in GLOBAL_CMDS:
+                room, cmd, args = None, parts[0], parts[1:]
+            else:
+                room, cmd, args = parts[0], parts[1] if len(parts) > 1 else 'state', parts[2:]
+
+            delay = options.latency + random.uniform(0, options.jitter)
+            if cmd in SLOW_CMDS:
+                delay += options.slow_latency
+            if delay:
+                time.sleep(delay)
+            if random.random() < options.error_rate:
+                self.reply(500, {'status': 'error', 'error': 'injected error'})
+                return
+
+            try:
+                if cmd == 'zones':
+                    response, events = system.zones(), []
+                elif room is None:
+                    rooms = list(system.rooms)
+                    response, events = system.execute(rooms[0], cmd, args) if cmd in ('favorites', 'playlists') else ({'status': 'success'}, [])
+                else:
+                    response, events = system.execute(room, cmd, args)
+            except (KeyError, ValueError, IndexError) as e:
+                self.reply(500, {'status': 'error', 'error': f'{e!r}'})
+                return
+
+            self.reply(200, response)
+            for event in events:
+                sender.send(event)
+
+    return Handler
+
+
+def run_storm(system, sender, rate, topology_interval):
+    """send transport-state events at the given rate and a topology-change every topology_interval seconds"""
+    rnd = random.Random()
+    next_topology = time.monotonic() + topology_interval if topology_interval else None
+    interval = 1 / rate if rate else 1
+    while True:
+        if rate:
+            sender.send(system.random_event(rnd))
+        if next_topology and time.monotonic() >= next_topology:
+            rooms = list(system.rooms)
+            room = rnd.choice(rooms)
+            system.execute(room, 'join' if rnd.random() < 0.5 else 'leave', [rnd.choice(rooms)])
+            sender.send({'type': 'topology-change', 'data': system.zones()})
+            next_topology += topology_interval
+        time.sleep(interval)
+
+
+def start_emulator(rooms=15, port=0, webhook=None, group_size=1, latency=0.0, jitter=0.0, slow_latency=0.0, error_rate=0.0, first_room=0):
+    """
+    Start the emulator in background threads
+
+    :return: tuple of (server, system, sender); server.server_address contains the bound port
+    """
+    options = Options()
+    options.latency, options.jitter, options.slow_latency, options.error_rate = latency, jitter, slow_latency, error_rate
+    system = SonosSystem(rooms, group_size, first_room=first_room)
+    sender = WebhookSender(webhook)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1' if port == 0 else '0.0.0.0', port), make_handler(system, sender, options))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name='SonosApiEmulator').start()
+    return server, system, sender
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=5005, help='port of the emulated api')
+    parser.add_argument('--rooms', type=int, default=15, help='number of rooms')
+    parser.add_argument('--first-room', type=int, default=0, help='index of the first room, e.g. to emulate several api servers with distinct rooms')
+    parser.add_argument('--group-size', type=int, default=1, help='initial number of rooms per group')
+    parser.add_argument('--webhook', help='url of the webhook receiver of the plugin, e.g. http://127.0.0.1:1025/')
+    parser.add_argument('--latency', type=float, default=0, help='latency of every request in ms')
+    parser.add_argument('--jitter', type=float, default=0, help='additional random latency in ms')
+    parser.add_argument('--slow-latency', type=float, default=0, help='additional latency in ms for say, favorite, playlist, clip')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with HTTP 500')
+    parser.add_argument('--storm', type=float, default=0, help='transport-state events per second sent to the webhook')
+    parser.add_argument('--topology-storm', type=float, default=0, help='interval in seconds of random topology changes')
+    parser.add_argument('-v', '--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format='%(asctime)s %(message)s')
+    server, system, sender = start_emulator(args.rooms, args.port, args.webhook, args.group_size, args.latency / 1000,
+                                            args.jitter / 1000, args.slow_latency / 1000, args.error_rate, args.first_room)
+    logger.info(f"emulating node-sonos-http-api with {args.rooms} rooms on port {server.server_address[1]}")
+
+    if args.storm or args.topology_storm:
+        threading.Thread(target=run_storm, args=(system, sender, args.storm, args.topology_storm), daemon=True).start()
+
+    try:
+        while True:
+            time.sleep(10)
+            logger.info(f"webhooks sent={sender.sent}, failed={sender.failed}, pending={sender.queue.qsize()}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import collections
+
+# kinds of topology events
+ROOM_ADDED = 'room-added'
+ROOM_REMOVED = 'room-removed'
+ROOM_RENAMED = 'room-renamed'
+JOIN = 'join'
+LEAVE = 'leave'
+COORDINATOR_CHANGED = 'coordinator-changed'
+
+# uuid:         uuid of the room the event is about
+# room:         current room name (previous room name for ROOM_REMOVED)
+# coordinator:  uuid of the coordinator of the room's group after the change
+# previous:     previous room name (ROOM_RENAMED) or previous coordinator uuid (JOIN, LEAVE, COORDINATOR_CHANGED)
+TopologyEvent = collections.namedtuple('TopologyEvent', 'kind uuid room coordinator previous')
+
+
+class Topology(object):
+    """
+    Model of the sonos topology: rooms, their uuids and the groups they belong to.
+
+    The model is replaced by each zones/topology-change payload, which always describes the full topology.
+    update() diffs the new topology against the previous one and returns the resulting events. All lookups are
+    O(1) and the model only holds the rooms of the latest topology.
+
+    If the rooms are served by several node-sonos-http-api servers, each payload only describes the rooms of its
+    server. update() with a source then only replaces the rooms of that source and keeps the rooms of the others.
+    """
+
+    def __init__(self):
+        self.room_to_uuid = {}                      # {room name: uuid}
+        self.uuid_to_room = {}                      # {uuid: room name}
+        self.coordinator_of = {}                    # {uuid: uuid of the group coordinator}
+        self.groups = {}                            # {coordinator uuid: (coordinator uuid, member uuid, ...)}
+        self.source_of = {}                         # {uuid: source of the zones describing the room}
+
+    def get_uuid(self, room):
+        return self.room_to_uuid.get(room)
+
+    def get_room(self, uuid):
+        return self.uuid_to_room.get(uuid)
+
+    def get_source(self, room):
+        """:return: source of the zones describing the room or None, if unknown"""
+        return self.source_of.get(self.room_to_uuid.get(room))
+
+    def find_source(self, zones):
+        """:return: source of the first known room of the zones or None"""
+        for zone in zones:
+            source = self.source_of.get(zone['coordinator']['uuid'])
+            if source is not None:
+                return source
+
+    def get_coordinator(self, room):
+        """:return: room name of the coordinator of the room's group"""
+        return self.uuid_to_room.get(self.coordinator_of.get(self.room_to_uuid.get(room)))
+
+    def get_members(self, room):
+        """:return: room names of all rooms in the group of the room, coordinator first"""
+        uuids = self.groups.get(self.coordinator_of.get(self.room_to_uuid.get(room)), ())
+        return [self.uuid_to_room[uuid] for uuid in uuids if uuid in self.uuid_to_room]
+
+    def get_group_info(self, room):
+        """:return: dict with the group information of a room as reflected by the group items"""
+        uuid = self.room_to_uuid.get(room)
+        if uuid is None:
+            return None
+        coordinator = self.coordinator_of.get(uuid)
+        members = self.get_members(room)
+        return {'coordinator': self.uuid_to_room.get(coordinator),
+                'members': members,
+                'is_grouped': len(members) > 1,
+                'is_coordinator': coordinator == uuid}
+
+    def update(self, zones, source=None):
+        """
+        Replace the topology by the zones of a zones response or topology-change payload
+
+        :param zones:   list of zones [{'uuid': ..., 'coordinator': {...}, 'members': [{...}, ...]}, ...]
+        :param source:  source of the zones; if given, only the rooms of this source are replaced
+        :return:        tuple of (list of TopologyEvent, set of room names whose group information changed)
+        """
+        room_to_uuid = {}
+        uuid_to_room = {}
+        coordinator_of = {}
+        groups = {}
+        source_of = {}
+
+        for zone in zones:
+            coordinator = zone['coordinator']['uuid']
+            zone_source = source if source is not None else zone.get('source')
+            members = [coordinator]
+            uuid_to_room[coordinator] = zone['coordinator'].get('roomName')
+            for member in zone.get('members', ()):
+                uuid = member['uuid']
+                uuid_to_room[uuid] = member.get('roomName')
+                if uuid != coordinator:
+                    members.append(uuid)
+            for uuid in members:
+                coordinator_of[uuid] = coordinator
+                if zone_source is not None:
+                    source_of[uuid] = zone_source
+            groups[coordinator] = tuple(members)
+
+        if source is not None:
+            # keep the rooms and groups of the other sources
+            for coordinator, members in self.groups.items():
+                if self.source_of.get(coordinator) != source and coordinator not in coordinator_of:
+                    members = tuple(uuid for uuid in members if uuid not in coordinator_of)
+                    if not members:
+                        continue
+                    groups[coordinator] = members
+                    for uuid in members:
+                        uuid_to_room[uuid] = self.uuid_to_room[uuid]
+                        coordinator_of[uuid] = coordinator
+                        if uuid in self.source_of:
+                            source_of[uuid] = self.source_of[uuid]
+
+        for uuid, room in uuid_to_room.items():
+            room_to_uuid[room] = uuid
+
+        previous = Topology()
+        previous.__dict__.update(self.__dict__)
+
+        self.room_to_uuid = room_to_uuid
+        self.uuid_to_room = uuid_to_room
+        self.coordinator_of = coordinator_of
+        self.groups = groups
+        self.source_of = source_of
+
+        return self._diff(previous)
+
+    def _diff(self, previous):
+        events = []
+        changed_rooms = set()
+
+        for uuid, room in self.uuid_to_room.items():
+            coordinator = self.coordinator_of[uuid]
+            old_room = previous.uuid_to_room.get(uuid)
+            old_coordinator = previous.coordinator_of.get(uuid)
+
+            if old_room is None:
+                events.append(TopologyEvent(ROOM_ADDED, uuid, room, coordinator, None))
+            elif old_room != room:
+                events.append(TopologyEvent(ROOM_RENAMED, uuid, room, coordinator, old_room))
+
+            if old_room is not None:
+                old_group = previous.groups.get(old_coordinator, ())
+                group = self.groups[coordinator]
+                if old_coordinator != coordinator:
+                    # the room stays in its group, if the new coordinator was a member of it or the room took over
+                    # the coordination of former members only; otherwise it left its group and/or joined another one
+                    if coordinator != uuid:
+                        stays = coordinator in old_group
+                    else:
+                        stays = len(group) > 1 and set(group).issubset(old_group)
+                    if stays:
+                        events.append(TopologyEvent(COORDINATOR_CHANGED, uuid, room, coordinator, old_coordinator))
+                    else:
+                        if len(old_group) > 1:
+                            events.append(TopologyEvent(LEAVE, uuid, room, coordinator, old_coordinator))
+                        if coordinator != uuid:
+                            events.append(TopologyEvent(JOIN, uuid, room, coordinator, old_coordinator))
+                elif len(old_group) > 1 and len(group) == 1:
+                    # the former coordinator stays coordinator of its own, now single room group
+                    events.append(TopologyEvent(LEAVE, uuid, room, coordinator, old_coordinator))
+
+            if self.get_group_info(room) != previous.get_group_info(old_room):
+                changed_rooms.add(room)
+
+        for uuid, old_room in previous.uuid_to_room.items():
+            if uuid not in self.uuid_to_room:
+                events.append(TopologyEvent(ROOM_REMOVED, uuid, old_room, None, previous.coordinator_of.get(uuid)))
+
+        return events, changed_rooms
+
+    def to_zones(self):
+        """:return: minimal zones list describing the topology, accepted by update()"""
+        zones = []
+        for coordinator, members in self.groups.items():
+            zone = {'uuid': coordinator,
+                    'coordinator': {'uuid': coordinator, 'roomName': self.uuid_to_room.get(coordinator)},
+                    'members': [{'uuid': uuid, 'roomName': self.uuid_to_room.get(uuid)} for uuid in members]}
+            if coordinator in self.source_of:
+                zone['source'] = self.source_of[coordinator]
+            zones.append(zone)
+        return zones
+
+    def to_dict(self):
+        """:return: dict representation of the topology using room names"""
+        return {self.uuid_to_room.get(coordinator, coordinator): [self.uuid_to_room.get(uuid, uuid) for uuid in members]
+                for coordinator, members in self.groups.items()}
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      <AUTHOR>                                  <EMAIL>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import collections
+import concurrent.futures
+import threading
+import time
+import urllib.parse
+
+
+# playback states of a room which pre-warming does not interrupt
+idle_states = ('STOPPED', 'PAUSED_PLAYBACK')
+
+# identity of a rendered clip; node-sonos-http-api caches rendered clips per phrase and language or voice
+TtsKey = collections.namedtuple('TtsKey', 'text language voice')
+
+
+class TtsAnnouncer(object):
+    """
+    Builds and sends text-to-speech announcements.
+
+    - phrases with a configured clip file are played with clip/clipall, without rendering
+    - announcements for all rooms are sent as a single sayall request, which node-sonos-http-api plays
+      synchronized in all rooms
+    - announcements for several rooms are sent in parallel, one request per room
+    - configured phrases can be pre-warmed at startup in an idle room, so node-sonos-http-api has rendered and
+      cached the clips before the first real announcement
+
+    The announcer remembers the most recently rendered clips and records the latency of announcements
+    separately for rendered ('tts.render') and cached ('tts.cached') clips.
+    """
+
+    def __init__(self, plugin_instance, send, language='de', voice='', volume=0, clips=None, metrics=None, max_workers=16, max_clips=500):
+        """
+        :param plugin_instance: instance of the plugin
+        :param send:            callable sending a request to the sonos api, returning the response or None on failure
+        :param language:        default language of the phrases
+        :param voice:           default voice; if given, it is used instead of the language (e.g. for AWS Polly)
+        :param volume:          default announce volume; 0 uses the default of node-sonos-http-api
+        :param clips:           dict {phrase: clip file} of phrases played as clip from the clips folder of the api
+        :param metrics:         Metrics instance
+        :param max_workers:     maximum number of rooms announced to in parallel
+        :param max_clips:       maximum number of remembered rendered clips; the least recently announced are dropped
+        """
+
+        # init instance
+        self._plugin_instance = plugin_instance
+        self._send = send
+        self._language = language
+        self._voice = voice
+        self._volume = volume
+        self._clips = clips or {}
+        self._metrics = metrics
+        self._max_workers = max_workers
+        self._max_clips = max_clips
+        self._executor = None
+        self._lock = threading.Lock()
+        self._rendered = collections.OrderedDict()  # LRU of rendered clips {TtsKey: number of announcements}
+
+    def start(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(self._max_workers, thread_name_prefix=f"plugins.{self._plugin_instance.get_fullname()}.Tts")
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def get_key(self, text, language=None, voice=None):
+        return TtsKey(str(text), language or self._language, self._voice if voice is None else voice)
+
+    def build_request(self, room, text, language=None, voice=None, volume=None, cmd='say'):
+        """
+        :param room:    room name or None for commands without room (sayall, clipall)
+        :return:        tuple of (request path, TtsKey or None for clips)
+        """
+        volume = self._volume if volume is None else volume
+        clip = self._clips.get(str(text))
+        if clip is not None:
+            cmd = 'clipall' if cmd == 'sayall' else 'clip'
+            request, key = f"{cmd}/{urllib.parse.quote(clip, safe='')}", None
+        else:
+            key = self.get_key(text, language, voice)
+            request = f"{cmd}/{urllib.parse.quote(key.text, safe='')}/{urllib.parse.quote(key.voice or key.language, safe='')}"
+        if volume:
+            request = f"{request}/{int(volume)}"
+        return (f"{room}/{request}" if room else request), key
+
+    def say(self, request, key):
+        """Send a prepared say request and record its latency; :return: response or None"""
+        start = time.monotonic()
+        response = self._send(request)
+        if key is not None and response is not None:
+            with self._lock:
+                count = self._rendered.get(key)
+                cached = count is not None
+                if cached:
+                    self._rendered.move_to_end(key)
+                elif len(self._rendered) >= self._max_clips:
+                    self._rendered.popitem(last=False)
+                self._rendered[key] = (count or 0) + 1
+            if self._metrics is not None:
+                self._metrics.observe_time('tts.cached' if cached else 'tts.render', time.monotonic() - start)
+        return response
+
+    def announce(self, text, rooms=None, language=None, voice=None, volume=None, all_rooms=None, wait=False):
+        """
+        Announce a phrase in several rooms
+
+        :param text:        phrase
+        :param rooms:       list of room names; None announces in all rooms
+        :param all_rooms:   list of all known room names; if rooms covers all of them, sayall is used
+        :param wait:        wait for all requests to finish
+        :return:            if wait, dict {room or 'all': response}, otherwise None
+        """
+        if rooms is None or (all_rooms and set(all_rooms).issubset(rooms)):
+            request, key = self.build_request(None, text, language, voice, volume, cmd='sayall')
+            future = self._submit(self.say, request, key)
+            return {'all': future.result()} if wait else None
+
+        futures = {}
+        for room in rooms:
+            request, key = self.build_request(room, text, language, voice, volume)
+            futures[room] = self._submit(self.say, request, key)
+        if wait:
+            return {room: future.result() for room, future in futures.items()}
+
+    def prewarm(self, room, phrases, language=None, voice=None):
+        """
+        Let node-sonos-http-api render and cache the clips of the phrases by saying them at volume 1 in a room
+
+        node-sonos-http-api renders a clip only when it is announced, so the room is muted while the phrases are
+        said and unmuted afterwards, if it was not muted before. Pre-warming is skipped, if the room is not idle
+        (stopped or paused), as the announcements would interrupt the playback.
+
+        :param room:    an idle room
+        :param phrases: list of phrases
+        """
+        def run():
+            state = self._send(f"{room}/state")
+            if not isinstance(state, dict):
+                self._plugin_instance.logger.warning(f"TTS: pre-warming skipped; the state of room {room} is unknown")
+                return
+            if state.get('playbackState') not in idle_states:
+                self._plugin_instance.logger.info(f"TTS: pre-warming skipped; room {room} is not idle ({state.get('playbackState')})")
+                return
+            if not state.get('mute') and self._send(f"{room}/mute") is None:
+                self._plugin_instance.logger.warning(f"TTS: pre-warming skipped; room {room} could not be muted")
+                return
+            try:
+                for text in phrases:
+                    if str(text) in self._clips:
+                        continue
+                    request, key = self.build_request(room, text, language, voice, volume=1)
+                    if self.say(request, key) is None:
+                        self._plugin_instance.logger.warning(f"TTS: pre-warming '{text}' in room {room} failed")
+            finally:
+                if not state.get('mute'):
+                    self._send(f"{room}/unmute")
+        return self._submit(run)
+
+    def _submit(self, func, *args):
+        executor = self._executor
+        if executor is None:
+            future = concurrent.futures.Future()
+            future.set_result(None)
+            self._plugin_instance.logger.warning("TTS announcer not running; announcement discarded")
+            return future
+        return executor.submit(func, *args)
+
+    def get_stats(self):
+        """:return: dict {phrase/language(/voice): number of announcements} of the rendered clips"""
+        with self._lock:
+            return {f"{key.text}/{key.voice or key.language}": count for key, count in self._rendered.items()}
@@ -28,6 +28,7 @@
 import datetime
 import time
 import os
+import json
 
 from lib.item import Items
 from lib.model.smartplugin import SmartPluginWebIf
@@ -58,6 +59,10 @@ class WebInterface(SmartPluginWebIf):
         self.plugin = plugin
         self.items = Items.get_instance()
 
+        # serialized responses of get_rooms for the current state version {since: json}, shared by all clients
+        self._rooms_cache_version = None
+        self._rooms_cache = {}
+
         self.tplenv = self.init_template_environment()
 
 
@@ -72,9 +77,11 @@ class WebInterface(SmartPluginWebIf):
         """
         tmpl = self.tplenv.get_template('index.html')
         # add values to be passed to the Jinja2 template eg: tmpl.render(p=self.plugin, interface=interface, ...)
+        plugin_items = sorted(self.plugin._item_dict.items(), key=lambda entry: str.lower(entry[0].property.path))
         return tmpl.render(p=self.plugin,
-                           items=sorted(self.items.return_items(), key=lambda k: str.lower(k['_path'])),
-                           item_count=0)
+                           items=plugin_items,
+                           item_count=len(plugin_items),
+                           catalog=self.plugin.get_catalog(cached=True))
 
 
     @cherrypy.expose
@@ -87,18 +94,111 @@ class WebInterface(SmartPluginWebIf):
         :param dataSet: Dataset for which the data should be returned (standard: None)
         :return: dict with the data needed to update the web page.
         """
-        if dataSet is None:
-            # get the new data
-            data = {}
-
-            # data['item'] = {}
-            # for i in self.plugin.items:
-            #     data['item'][i]['value'] = self.plugin.getitemvalue(i)
-            #
-            # return it as json the the web page
-            # try:
-            #     return json.dumps(data)
-            # except Exception as e:
-            #     self.logger.error("get_data_html exception: {}".format(e))
+        if dataSet == 'metrics':
+            data = self.plugin.get_metrics()
+            data['profile'] = self.plugin.metrics.get_profile_stats()
+            try:
+                return json.dumps(data)
+            except Exception as e:
+                self.logger.error(f"get_data_html exception: {e}")
         return {}
 
+    @cherrypy.expose
+    def get_rooms(self, since=None):
+        """
+        Return the state of the rooms changed after a state version
+
+        The ETag of the response is the current state version. If the client already knows it (If-None-Match),
+        304 is returned without body, so polling unchanged dashboards costs a version comparison only.
+
+        :param since: state version known to the client; omitted or 0 returns all rooms
+        :return: json with the version, the changed rooms and the topology, if it changed
+        """
+        try:
+            since = int(since or 0)
+        except ValueError:
+            since = 0
+        version = self.plugin.get_state_version()
+        etag = f'"{version}"'
+        cherrypy.response.headers['ETag'] = etag
+        cherrypy.response.headers['Cache-Control'] = 'no-cache'
+        if since and cherrypy.request.headers.get('If-None-Match') == etag:
+            cherrypy.response.status = 304
+            return b''
+
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        if self._rooms_cache_version != version:
+            self._rooms_cache = {}
+            self._rooms_cache_version = version
+        body = self._rooms_cache.get(since)
+        if body is None:
+            data = self.plugin.get_room_states(since)
+            body = json.dumps(data, default=str)
+            if data['version'] == version:
+                self._rooms_cache[since] = body
+        return body
+
+    @cherrypy.expose
+    def get_catalog(self, room=None, offset=None, limit=None):
+        """
+        Return the cached favorites and playlists and optionally the queue of a room
+
+        The ETag of the response is the catalog version; unchanged lists are answered with 304.
+
+        :param room: room whose queue is returned; the queue is fetched page by page as far as requested
+        :param offset: index of the first queue entry
+        :param limit: maximum number of queue entries; omitted returns the whole queue
+        :return: json with the version, favorites, playlists and queue
+        """
+        try:
+            offset = int(offset or 0)
+            limit = int(limit) if limit else None
+        except ValueError:
+            raise cherrypy.HTTPError(400, "offset and limit must be integers")
+        etag = f'"{self.plugin.get_catalog_version()}-{room}-{offset}-{limit}"'
+        if cherrypy.request.headers.get('If-None-Match') == etag:
+            cherrypy.response.headers['ETag'] = etag
+            cherrypy.response.status = 304
+            return b''
+        data = self.plugin.get_catalog(room, offset, limit)
+        cherrypy.response.headers['ETag'] = f'"{data["version"]}-{room}-{offset}-{limit}"'
+        cherrypy.response.headers['Cache-Control'] = 'no-cache'
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        return json.dumps(data)
+
+    @cherrypy.expose
+    def albumart(self, id=None):
+        """
+        Return a cached album art image
+
+        :param id: id of the image as contained in the url of the items with sonos_albumart_cache
+        :return: image data
+        """
+        image = self.plugin.get_albumart(id) if id else None
+        if image is None:
+            raise cherrypy.NotFound()
+        data, content_type, etag = image
+        etag = f'"{etag}"'
+        cherrypy.response.headers['ETag'] = etag
+        cherrypy.response.headers['Cache-Control'] = 'public, max-age=86400'
+        if cherrypy.request.headers.get('If-None-Match') == etag:
+            cherrypy.response.status = 304
+            return b''
+        cherrypy.response.headers['Content-Type'] = content_type
+        return data
+
+    @cherrypy.expose
+    def set_profiling(self, enabled=None):
+        """
+        Enable or disable profiling of the webhook event processing
+
+        :param enabled: 'true' to enable profiling, anything else to disable it
+        """
+        self.plugin.metrics.set_profiling(str(enabled).lower() == 'true')
+        return json.dumps({'profiling': self.plugin.metrics.profiler is not None})
+
+    @cherrypy.expose
+    def reset_metrics(self):
+        """Reset all counters and histograms"""
+        self.plugin.metrics.reset()
+        return json.dumps({})